@@ -0,0 +1,78 @@
+import time
+import sqlite3
+from contextlib import contextmanager
+
+# =========================================================
+# KÖZÖS ALERT-DEDUP TÁR (SQLite)
+# =========================================================
+# Több élő worker (helyi folyamat vagy külön node megosztott kötettel)
+# ugyanabból a tárból foglalja le a (nap, kulcs) párt, így egy meccsre
+# akkor is csak egy riasztás megy ki, ha két shard egyszerre látja.
+# Az INSERT OR IGNORE atomikus; a sikeres foglalás nyeri a küldés jogát.
+#
+# Élesben ugyanez az interfész Redis / Postgres mögé is tehető; a helyi
+# SQLite fájl a stand-in.
+
+ALERT_DEDUP_TIMEOUT = 30
+
+
+class AlertDedupStore:
+    def __init__(self, path):
+        self.path = path
+        with self._conn() as c:
+            c.execute("PRAGMA journal_mode=WAL")
+            c.execute("""CREATE TABLE IF NOT EXISTS alerts (
+                             date  TEXT NOT NULL,
+                             key   TEXT NOT NULL,
+                             shard INTEGER NOT NULL DEFAULT 0,
+                             ts    INTEGER NOT NULL,
+                             PRIMARY KEY (date, key))""")
+
+    @contextmanager
+    def _conn(self):
+        c = sqlite3.connect(self.path, timeout=ALERT_DEDUP_TIMEOUT, isolation_level=None)
+        try:
+            yield c
+        finally:
+            c.close()
+
+    def claim(self, date_str, key, shard=0):
+        """True, ha ez a hívás foglalta le elsőként a (date, key) párt."""
+        with self._conn() as c:
+            cur = c.execute("INSERT OR IGNORE INTO alerts (date, key, shard, ts) VALUES (?, ?, ?, ?)",
+                            (date_str, str(key), shard, int(time.time())))
+            return cur.rowcount == 1
+
+    def keys(self, date_str):
+        with self._conn() as c:
+            return {r[0] for r in c.execute("SELECT key FROM alerts WHERE date = ?", (date_str,))}
+
+    def export(self, since=None):
+        """{date: [kulcsok]} — a sent_alerts.json formátuma."""
+        out = {}
+        with self._conn() as c:
+            q, args = "SELECT date, key FROM alerts", ()
+            if since:
+                q, args = q + " WHERE date >= ?", (since,)
+            for d, k in c.execute(q + " ORDER BY date, ts", args):
+                out.setdefault(d, []).append(k)
+        return out
+
+    def import_dict(self, data):
+        with self._conn() as c:
+            c.executemany("INSERT OR IGNORE INTO alerts (date, key, shard, ts) VALUES (?, ?, 0, 0)",
+                          [(d, str(k)) for d, ks in data.items() for k in ks])
+
+    def prune(self, cutoff):
+        with self._conn() as c:
+            return c.execute("DELETE FROM alerts WHERE date < ?", (cutoff,)).rowcount
+
+    @contextmanager
+    def lock(self):
+        """Folyamatok közötti kritikus szakasz (pl. közös JSON fájl írása)."""
+        with self._conn() as c:
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            finally:
+                c.execute("COMMIT")
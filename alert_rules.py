@@ -0,0 +1,148 @@
+import os
+import json
+import operator
+from collections import Counter
+
+# =========================================================
+# DEKLARATÍV RIASZTÁSI SZABÁLYMOTOR
+# =========================================================
+# A szabályok konfigurációból jönnek (alert_rules.json vagy ALERT_RULES env),
+# egyszer fordulnak le végrehajtási tervvé, és egy ciklus összes élő meccsén
+# kötegben futnak. A terv a szabályokat költség szerint rendezi:
+#
+#   free  → a live feedből / tips fájlból már meglévő mezők (nincs API hívás)
+#   stats → élő statisztika kell (lövések, veszélyes támadások)
+#   odds  → élő odds kell
+#
+# Egy drágább szakasz adatát csak azokra a meccsekre kérjük le (egy kötegben),
+# amelyek az olcsóbb szakaszokon már átmentek.
+#
+# Feltétel formátum:
+#   {"field": "minute", "op": ">=", "value": 33}
+#   {"field": "live_odds", "op": ">=", "ref": "fair_odds", "if_missing": true}
+#   {"field": "minute", "op": "in_windows", "value": [[33, 43], [50, 65]]}
+#   {"any": [<feltétel>, ...]}   /   {"all": [<feltétel>, ...]}
+# Szabály: {"name": "...", "when": <feltétel>}  (a "stage" opcionális, a mezőkből adódik)
+#
+# A mezőket attribútumként olvassuk (records.LiveSnapshot); hiányzó / None
+# mező → if_missing.
+
+ALERT_RULES_FILE = os.environ.get("ALERT_RULES_FILE", "alert_rules.json")
+
+STAGES      = ("free", "stats", "odds")
+FIELD_STAGE = {
+    "shots_on_goal": "stats", "shots_total": "stats", "dangerous_att": "stats",
+    "live_odds": "odds",
+}
+_OPS = {
+    "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+    "==": operator.eq, "!=": operator.ne,
+}
+
+
+def _fields(cond):
+    if "any" in cond or "all" in cond:
+        return {f for c in cond.get("any", cond.get("all")) for f in _fields(c)}
+    return {cond["field"]} | ({cond["ref"]} if "ref" in cond else set())
+
+
+def _compile(cond):
+    """Feltétel → snapshot -> bool függvény (egyszer, a terv építésekor)."""
+    if "any" in cond:
+        parts = [_compile(c) for c in cond["any"]]
+        return lambda ctx: any(p(ctx) for p in parts)
+    if "all" in cond:
+        parts = [_compile(c) for c in cond["all"]]
+        return lambda ctx: all(p(ctx) for p in parts)
+    field, op = cond["field"], cond["op"]
+    missing   = bool(cond.get("if_missing", False))
+    if op == "not_none":
+        return lambda ctx: getattr(ctx, field, None) is not None
+    if op == "in_windows":
+        windows = [tuple(w) for w in cond["value"]]
+        def in_windows(ctx):
+            v = getattr(ctx, field, None)
+            return missing if v is None else any(s <= v <= e for s, e in windows)
+        return in_windows
+    fn = _OPS[op]
+    if "ref" in cond:
+        ref = cond["ref"]
+        def cmp_ref(ctx):
+            v, r = getattr(ctx, field, None), getattr(ctx, ref, None)
+            return missing if v is None or r is None else fn(v, r)
+        return cmp_ref
+    value = cond["value"]
+    def cmp_value(ctx):
+        v = getattr(ctx, field, None)
+        return missing if v is None else fn(v, value)
+    return cmp_value
+
+
+class AlertRuleEngine:
+    def __init__(self, rules):
+        self.rules = rules
+        self.plan  = self._build_plan(rules)
+        self.rejections     = Counter()
+        self.last_rejections = Counter()
+
+    @staticmethod
+    def _build_plan(rules):
+        plan = {st: [] for st in STAGES}
+        for r in rules:
+            stage = r.get("stage") or max(
+                (FIELD_STAGE.get(f, "free") for f in _fields(r["when"])), key=STAGES.index)
+            plan[stage].append((r["name"], _compile(r["when"])))
+        return [(st, plan[st]) for st in STAGES if plan[st]]
+
+    def evaluate(self, contexts, fetchers=None):
+        """
+        Kötegelt kiértékelés. fetchers: {"stats": fn(snapshot_lista), "odds": fn(snapshot_lista)}
+        — a fetcher a túlélő meccsek snapshotjaiba tölti a szakasz mezőit.
+        Visszatér: a minden szabályon átment snapshotok listája.
+        """
+        fetchers  = fetchers or {}
+        survivors = list(contexts)
+        cycle     = Counter()
+        for stage, rules in self.plan:
+            if not survivors:
+                break
+            if stage in fetchers:
+                fetchers[stage](survivors)
+            kept = []
+            for ctx in survivors:
+                for name, check in rules:
+                    if not check(ctx):
+                        cycle[name] += 1
+                        ctx.rejected_by = name
+                        break
+                else:
+                    kept.append(ctx)
+            survivors = kept
+        self.last_rejections = cycle
+        self.rejections.update(cycle)
+        return survivors
+
+
+def default_rules(windows, min_ev, shots_on_min, shots_total_min, dangerous_min):
+    """A korábbi beégetett lánc (in_live_window, is_active_game, EV, value) szabályként."""
+    return [
+        {"name": "goals",   "when": {"field": "goals_total", "op": "<=", "value": 1}},
+        {"name": "window",  "when": {"field": "minute", "op": "in_windows", "value": [list(w) for w in windows]}},
+        {"name": "has_tip", "when": {"field": "ev", "op": "not_none"}},
+        {"name": "min_ev",  "when": {"field": "ev", "op": ">=", "value": min_ev}},
+        {"name": "active",  "when": {"any": [
+            {"field": "shots_on_goal", "op": ">=", "value": shots_on_min},
+            {"field": "shots_total",   "op": ">=", "value": shots_total_min},
+            {"all": [{"field": "dangerous_att", "op": ">=", "value": dangerous_min},
+                     {"field": "shots_on_goal", "op": ">=", "value": 1}]},
+        ]}},
+        {"name": "value",   "when": {"field": "live_odds", "op": ">=", "ref": "fair_odds", "if_missing": True}},
+    ]
+
+
+def load_rule_engine(defaults):
+    raw = os.environ.get("ALERT_RULES")
+    if not raw and os.path.exists(ALERT_RULES_FILE):
+        with open(ALERT_RULES_FILE, "r", encoding="utf-8") as f:
+            raw = f.read()
+    return AlertRuleEngine(json.loads(raw) if raw else defaults)
@@ -1,6 +1,7 @@
 import requests
 import time
 import os
+import json
 from datetime import datetime
 from flask import Flask
 from threading import Thread
@@ -31,6 +32,22 @@ TELEGRAM_TOKEN = "IDE_TELEGRAM_TOKEN"
 CHAT_ID = "IDE_CHAT_ID"
 TG_URL = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
 
+# ========= SZŰRÉS / KVÓTA =========
+# 1. olcsó szűrés (liga, perc, állás) — API hívás nélkül
+# 2. statisztika csak a túlélőkre: fixtures?ids=a-b-c (max 20 / hívás),
+#    ciklusonként legfeljebb STATS_MAX_PER_CYCLE meccs, STATS_TTL mp-es cache-sel
+BANNED_LEAGUE_WORDS = ["friendly", "u21", "u23", "reserve", "youth", "development", "women"]
+MIN_MINUTE          = 20
+MAX_MINUTE          = 70
+MAX_TOTAL_GOALS     = 1
+STATS_BATCH         = 20
+STATS_MAX_PER_CYCLE = 60
+STATS_TTL           = 120
+
+SENT_IDS_FILE      = "sent_ids.json"
+SENT_IDS_MAX       = 2000
+SENT_IDS_KEEP_DAYS = 2
+
 def send_telegram(message: str):
     try:
         requests.post(TG_URL, data={"chat_id": CHAT_ID, "text": message, "parse_mode": "HTML"}, timeout=10)
@@ -45,35 +62,90 @@ def get_live_fixtures():
         print(f"API hiba (fixtures): {e}")
         return []
 
+def combine_stats(stats_data):
+    combined_stats = {"shots": 0}
+    for team_stat in stats_data or []:
+        for stat in team_stat.get("statistics", []):
+            if stat["type"] == "Total Shots":
+                val = stat["value"]
+                combined_stats["shots"] += int(val) if val else 0
+    return combined_stats
+
 def get_match_stats(match_id):
     try:
         r = requests.get(f"{BASE_URL}/fixtures/statistics?fixture={match_id}", headers=HEADERS, timeout=10)
-        stats_data = r.json().get("response", [])
-        combined_stats = {"shots": 0}
-        for team_stat in stats_data:
-            for stat in team_stat.get("statistics", []):
-                if stat["type"] == "Total Shots":
-                    val = stat["value"]
-                    combined_stats["shots"] += int(val) if val else 0
-        return combined_stats
+        return combine_stats(r.json().get("response", []))
     except:
         return None
 
-def should_send_tip(fx):
+def get_match_stats_batch(match_ids):
+    """Egy fixtures?ids= hívás (max 20 ID) -> {match_id: stats}; a válasz tartalmazza a statisztikát is."""
+    try:
+        ids = "-".join(str(m) for m in match_ids)
+        r = requests.get(f"{BASE_URL}/fixtures?ids={ids}", headers=HEADERS, timeout=10)
+        return {fx["fixture"]["id"]: combine_stats(fx.get("statistics"))
+                for fx in r.json().get("response", [])}
+    except Exception as e:
+        print(f"API hiba (stats batch): {e}")
+        return {}
+
+# meccs id -> (lekérés ideje, stats) — ciklusok között megmarad
+stats_cache = {}
+
+def get_stats_for(fixtures, now=None):
+    """
+    Statisztika a jelölt meccsekre: friss cache-ből, a hiányzókat kötegelve.
+    Ciklusonként legfeljebb STATS_MAX_PER_CYCLE meccset kér le (a későbbi
+    percben járók előbb — nekik zárul előbb az ablak); a többi a következő körben.
+    """
+    now = now or time.time()
+    for mid in [m for m, (ts, _) in stats_cache.items() if now - ts > STATS_TTL * 5]:
+        del stats_cache[mid]
+
+    out, missing = {}, []
+    for fx in sorted(fixtures, key=lambda f: -(f["fixture"]["status"]["elapsed"] or 0)):
+        mid = fx["fixture"]["id"]
+        hit = stats_cache.get(mid)
+        if hit and now - hit[0] <= STATS_TTL:
+            out[mid] = hit[1]
+        elif len(missing) < STATS_MAX_PER_CYCLE:
+            missing.append(mid)
+
+    for i in range(0, len(missing), STATS_BATCH):
+        fetched = get_match_stats_batch(missing[i:i + STATS_BATCH])
+        for mid, stats in fetched.items():
+            stats_cache[mid] = (now, stats)
+            out[mid] = stats
+    return out
+
+def score_of(fx):
+    home_score = fx["goals"]["home"] if fx["goals"]["home"] is not None else 0
+    away_score = fx["goals"]["away"] if fx["goals"]["away"] is not None else 0
+    return home_score, away_score
+
+def is_candidate(fx):
+    """Olcsó előszűrés API hívás nélkül: liga, játékidő, állás."""
     minute = fx["fixture"]["status"]["elapsed"] or 0
     league = fx["league"]["name"].lower()
+    if any(bad in league for bad in BANNED_LEAGUE_WORDS):
+        return False
+    if not (MIN_MINUTE <= minute <= MAX_MINUTE):
+        return False
+    return sum(score_of(fx)) <= MAX_TOTAL_GOALS
+
+def should_send_tip(fx, stats=None):
+    minute = fx["fixture"]["status"]["elapsed"] or 0
     match_id = fx["fixture"]["id"]
-    
-    home_score = fx["goals"]["home"] if fx["goals"]["home"] is not None else 0
-    away_score = fx["goals"]["away"] if fx["goals"]["away"] is not None else 0
+
+    home_score, away_score = score_of(fx)
     total_goals = home_score + away_score
     current_score_text = f"{home_score}-{away_score}"
 
-    banned = ["friendly", "u21", "u23", "reserve", "youth", "development", "women"]
-    if any(bad in league for bad in banned) or total_goals >= 2:
+    if not is_candidate(fx):
         return False, None, 0, ""
 
-    stats = get_match_stats(match_id)
+    if stats is None:
+        stats = get_match_stats(match_id)
     if not stats or stats["shots"] < 3:
         return False, None, 0, ""
 
@@ -87,19 +159,51 @@ def should_send_tip(fx):
 
     return False, None, 0, ""
 
+# ========= ELKÜLDÖTT MECCSEK =========
+# sent_ids.json: {"<meccs id>": "YYYY-MM-DD"} — újraindítás után sem megy ki
+# kétszer ugyanaz a tipp; a régi bejegyzések és a SENT_IDS_MAX feletti rész törlődik.
+def load_sent_ids():
+    try:
+        with open(SENT_IDS_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return {int(k): v for k, v in data.items()}
+    except Exception:
+        return {}
+
+def save_sent_ids(sent_ids):
+    cutoff = datetime.fromtimestamp(time.time() - SENT_IDS_KEEP_DAYS * 86400).strftime("%Y-%m-%d")
+    kept = sorted(((d, mid) for mid, d in sent_ids.items() if d >= cutoff), reverse=True)[:SENT_IDS_MAX]
+    sent_ids.clear()
+    sent_ids.update({mid: d for d, mid in kept})
+    try:
+        tmp = SENT_IDS_FILE + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({str(mid): d for mid, d in sent_ids.items()}, f)
+        os.replace(tmp, SENT_IDS_FILE)
+    except Exception as e:
+        print(f"Mentési hiba (sent_ids): {e}")
+
 # ========= FŐ CIKLUS =========
 def main_bot_loop():
-    sent_ids = set()
-    print("Bot motor elindult...")
+    sent_ids = load_sent_ids()
+    save_sent_ids(sent_ids)
+    print(f"Bot motor elindult... ({len(sent_ids)} korábban elküldött meccs)")
     
     while True:
         fixtures = get_live_fixtures()
-        for fx in fixtures:
+        # 1. olcsó szűrés, 2. statisztika csak a túlélőkre (kötegelve, cache-elve)
+        candidates = [fx for fx in fixtures
+                      if fx["fixture"]["id"] not in sent_ids and is_candidate(fx)]
+        stats_by_id = get_stats_for(candidates) if candidates else {}
+
+        changed = False
+        for fx in candidates:
             match_id = fx["fixture"]["id"]
-            if match_id in sent_ids:
+            stats = stats_by_id.get(match_id)
+            if stats is None:
                 continue
 
-            send, tip_text, confidence, score = should_send_tip(fx)
+            send, tip_text, confidence, score = should_send_tip(fx, stats)
             if send:
                 msg = (
                     f"⚽ <b>ÉLŐ FOGADÁSI TIPP</b>\n\n"
@@ -111,7 +215,13 @@ def main_bot_loop():
                     f"<b>Biztonság:</b> {confidence}%"
                 )
                 send_telegram(msg)
-                sent_ids.add(match_id)
+                sent_ids[match_id] = datetime.now().strftime("%Y-%m-%d")
+                changed = True
+
+        if changed:
+            save_sent_ids(sent_ids)
+        print(f"{datetime.now().strftime('%H:%M:%S')} | {len(fixtures)} élő, "
+              f"{len(candidates)} jelölt, {len(stats_by_id)} statisztikával")
         
         time.sleep(30)
 
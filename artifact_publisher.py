@@ -0,0 +1,140 @@
+import os
+import gzip
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import serialization
+
+# =========================================================
+# ARTIFACT PUBLIKÁLÁS — egy kliens, gzip, tartalom-hash, párhuzamos feltöltés
+# =========================================================
+# A builder kimenetei (master JSON, tips JSON) egyetlen publish() hívással
+# mennek fel, fájlonként egy szálon. Feltöltés előtt a nyers tartalom
+# SHA-256-ját összevetjük az utoljára sikeresen feltöltött tartalommal
+# (PUBLISH_STATE_FILE); változatlan fájlhoz nincs hálózati hívás.
+#
+# Alapból a távoli objektum neve és típusa változatlan (<dátum>/<fájl>.json,
+# application/json), így a meglévő olvasók működnek. Tömörítés csak kérésre
+# (PUBLISH_GZIP=1): ekkor a távoli név ".gz" végű, content-type:
+# application/gzip — ezt csak akkor kapcsold be, ha az olvasók is átálltak.
+#
+# Tesztekhez / helyi futáshoz: LocalObjectStore(root) ugyanazt a
+# client.storage.from_(bucket).upload(...) felületet adja, lemezre ír.
+
+PUBLISH_STATE_FILE = os.environ.get("PUBLISH_STATE_FILE", "publish_state.json")
+PUBLISH_GZIP       = os.environ.get("PUBLISH_GZIP", "0") not in ("0", "false", "no", "")
+PUBLISH_WORKERS    = 4
+CACHE_CONTROL      = "3600"
+
+
+def supabase_client_from_env():
+    """Supabase kliens a SUPABASE_URL / SUPABASE_KEY env-ből, vagy None."""
+    url = os.environ.get("SUPABASE_URL")
+    key = os.environ.get("SUPABASE_KEY") or os.environ.get("SUPABASE_SERVICE_KEY")
+    if not url or not key:
+        return None
+    from supabase import create_client
+    return create_client(url, key)
+
+
+class _LocalBucket:
+    def __init__(self, store, bucket):
+        self.store, self.bucket = store, bucket
+
+    def upload(self, path, file, file_options=None):
+        dst = os.path.join(self.store.root, self.bucket, path)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        with open(dst, "wb") as f:
+            f.write(file)
+        with self.store._lock:
+            self.store.uploads.append((self.bucket, path, dict(file_options or {})))
+        return {"Key": f"{self.bucket}/{path}"}
+
+
+class LocalObjectStore:
+    """Supabase storage helyettesítő: root/<bucket>/<path>, a feltöltések listája az uploads-ban."""
+
+    def __init__(self, root):
+        self.root    = root
+        self.uploads = []
+        self._lock   = threading.Lock()
+        self.storage = self
+
+    def from_(self, bucket):
+        return _LocalBucket(self, bucket)
+
+    def read(self, bucket, path):
+        with open(os.path.join(self.root, bucket, path), "rb") as f:
+            data = f.read()
+        return gzip.decompress(data) if path.endswith(".gz") else data
+
+
+class ArtifactPublisher:
+    def __init__(self, client=None, state_path=PUBLISH_STATE_FILE, compress=PUBLISH_GZIP,
+                 max_workers=PUBLISH_WORKERS, client_factory=supabase_client_from_env):
+        self._client         = client
+        self._client_factory = client_factory
+        self.state_path      = state_path
+        self.compress        = compress
+        self.max_workers     = max_workers
+        self._lock           = threading.Lock()
+        try:
+            self.state = serialization.read(state_path, {}) or {}
+        except ValueError:
+            self.state = {}
+
+    @property
+    def client(self):
+        """Lusta, egyszeri kliens létrehozás — minden feltöltés ezt használja."""
+        with self._lock:
+            if self._client is None and self._client_factory is not None:
+                self._client, self._client_factory = self._client_factory(), None
+            return self._client
+
+    def _remote_name(self, local_path, prefix):
+        name = os.path.basename(local_path) + (".gz" if self.compress else "")
+        return f"{prefix}/{name}" if prefix else name
+
+    def _upload_one(self, local_path, bucket, prefix):
+        remote = self._remote_name(local_path, prefix)
+        key    = f"{bucket}/{remote}"
+        with open(local_path, "rb") as f:
+            raw = f.read()
+        digest = hashlib.sha256(raw).hexdigest()
+        if self.state.get(key) == digest:
+            return key, "skipped"
+        if self.compress:
+            body, ctype = gzip.compress(raw, mtime=0), "application/gzip"
+        else:
+            body, ctype = raw, "application/json"
+        self.client.storage.from_(bucket).upload(
+            path=remote, file=body,
+            file_options={"cache-control": CACHE_CONTROL, "content-type": ctype, "upsert": "true"})
+        with self._lock:
+            self.state[key] = digest
+        return key, f"uploaded ({len(raw)} → {len(body)} bájt)"
+
+    def publish(self, items):
+        """
+        items: [(helyi fájl, bucket, távoli prefix)] — párhuzamosan tölt fel.
+        Visszatér: {bucket/távoli név: "uploaded (...)" | "skipped" | "error: ..."}.
+        Kliens nélkül (hiányzó env) üres dict.
+        """
+        if not items or self.client is None:
+            return {}
+        results = {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as pool:
+            futures = {pool.submit(self._upload_one, *it): it for it in items}
+            for fut, (local_path, bucket, prefix) in futures.items():
+                try:
+                    key, status = fut.result()
+                except Exception as e:
+                    key, status = f"{bucket}/{self._remote_name(local_path, prefix)}", f"error: {e}"
+                results[key] = status
+        self.save()
+        return results
+
+    def save(self):
+        with self._lock:
+            return serialization.write(self.state_path, self.state, binary=False)
@@ -0,0 +1,153 @@
+import os
+
+try:
+    import numpy as np
+except ImportError:  # a live bot numpy nélkül is fut — akkor sima ciklus
+    np = None
+
+import serialization
+
+# =========================================================
+# VALÓSZÍNŰSÉG KALIBRÁCIÓ (piaconként)
+# =========================================================
+# A visszamérés (backtest.json) kimeneteiből piaconként binnelt
+# elégséges statisztikát tartunk (bin → darab, nyert). Új bejegyzésnél csak
+# a számlálók nőnek, a "fit" a CALIB_BINS elemű bin-soron fut (PAV izoton
+# regresszió, az identitás felé húzó prior-ral), így nincs teljes újrafit.
+#
+# Az eredmény egy CALIB_GRID pontos táblázat: p → kalibrált p lookup
+# lineáris interpolációval (numpy-val vektorosan is).
+#
+# calibration.json (tömör):
+#   {"over15_live": {"n": [..20..], "w": [..20..]}}
+#
+# Piac: over15_live = in-play P(O1.5) élő riasztáskor. A backtest csak a
+# kiküldött riasztásokat tartalmazza, így a pre-match P-k (over15, over25,
+# btts) kalibrálására nem alkalmas (élő jelekre szűrt minta) — ezeket nem
+# tanuljuk, és a régi fájlokból betöltéskor eldobjuk.
+
+CALIBRATION_FILE  = os.environ.get("CALIBRATION_FILE", "calibration.json")
+CALIB_BINS        = 20
+CALIB_GRID        = 101
+CALIB_PRIOR       = 5.0    # bin-enkénti pszeudo-darab a bin közepén (identitás felé)
+CALIB_MIN_SAMPLES = 30     # ennyi kimenet alatt a kalibráció identitás
+CALIB_MARKETS     = ("over15_live",)
+
+
+def _pav(values, weights):
+    """Pool-adjacent-violators: súlyozott monoton nemcsökkenő illesztés."""
+    blocks = []  # [érték, súly, elemszám]
+    for v, w in zip(values, weights):
+        blocks.append([v, w, 1])
+        while len(blocks) > 1 and blocks[-2][0] > blocks[-1][0]:
+            v2, w2, c2 = blocks.pop()
+            v1, w1, c1 = blocks.pop()
+            wt = w1 + w2
+            blocks.append([(v1 * w1 + v2 * w2) / wt, wt, c1 + c2])
+    out = []
+    for v, _, c in blocks:
+        out.extend([v] * c)
+    return out
+
+
+class MarketCalibrator:
+    def __init__(self, n=None, w=None):
+        self.n = list(n) if n else [0] * CALIB_BINS
+        self.w = list(w) if w else [0] * CALIB_BINS
+        self._table = None
+
+    @property
+    def samples(self):
+        return sum(self.n)
+
+    def add(self, p, won):
+        b = min(int(p * CALIB_BINS), CALIB_BINS - 1)
+        self.n[b] += 1
+        self.w[b] += 1 if won else 0
+        self._table = None
+
+    def _fit(self):
+        if self.samples < CALIB_MIN_SAMPLES:
+            return [i / (CALIB_GRID - 1) for i in range(CALIB_GRID)]
+        centers = [(b + 0.5) / CALIB_BINS for b in range(CALIB_BINS)]
+        rates   = [(self.w[b] + CALIB_PRIOR * centers[b]) / (self.n[b] + CALIB_PRIOR) for b in range(CALIB_BINS)]
+        fitted  = _pav(rates, [self.n[b] + CALIB_PRIOR for b in range(CALIB_BINS)])
+        table = []
+        for i in range(CALIB_GRID):
+            x = i / (CALIB_GRID - 1)
+            if x <= centers[0]:
+                table.append(fitted[0])
+            elif x >= centers[-1]:
+                table.append(fitted[-1])
+            else:
+                j = int(x * CALIB_BINS - 0.5)
+                t = (x - centers[j]) * CALIB_BINS
+                table.append(fitted[j] + (fitted[j + 1] - fitted[j]) * t)
+        return table
+
+    @property
+    def table(self):
+        if self._table is None:
+            self._table = self._fit()
+        return self._table
+
+    def apply(self, p):
+        if p is None:
+            return None
+        x = min(max(p, 0.0), 1.0) * (CALIB_GRID - 1)
+        i = min(int(x), CALIB_GRID - 2)
+        t = self.table
+        return t[i] + (t[i + 1] - t[i]) * (x - i)
+
+    def apply_many(self, ps):
+        """Vektoros lookup; None elemek None-ként jönnek vissza."""
+        if np is not None:
+            arr  = np.array([p if p is not None else np.nan for p in ps], dtype=float)
+            grid = np.linspace(0.0, 1.0, CALIB_GRID)
+            out  = np.interp(np.clip(arr, 0.0, 1.0), grid, np.asarray(self.table))
+            return [None if np.isnan(v) else float(v) for v in np.where(np.isnan(arr), np.nan, out)]
+        return [self.apply(p) for p in ps]
+
+
+class CalibrationStore:
+    def __init__(self, path=CALIBRATION_FILE):
+        self.path    = path
+        self.markets = {}
+        if os.path.exists(path):
+            try:
+                data = serialization.read(path)
+                for m, d in (data or {}).items():
+                    if m in CALIB_MARKETS:
+                        self.markets[m] = MarketCalibrator(d.get("n"), d.get("w"))
+            except (OSError, ValueError, AttributeError):
+                self.markets = {}
+
+    def market(self, name):
+        return self.markets.setdefault(name, MarketCalibrator())
+
+    def update(self, entries):
+        """Új backtest bejegyzések: entry["raw_p"] = {piac: nyers p}, entry["won"]."""
+        added = 0
+        for e in entries:
+            for m, p in (e.get("raw_p") or {}).items():
+                if m not in CALIB_MARKETS or p is None or e.get("won") is None:
+                    continue
+                self.market(m).add(p, bool(e["won"]))
+                added += 1
+        return added
+
+    def apply(self, market, p):
+        cal = self.markets.get(market)
+        if p is None or cal is None:
+            return p
+        return round(cal.apply(p), 4)
+
+    def apply_many(self, market, ps):
+        cal = self.markets.get(market)
+        if cal is None:
+            return list(ps)
+        return [None if v is None else round(v, 4) for v in cal.apply_many(ps)]
+
+    def save(self):
+        data = {m: {"n": c.n, "w": c.w} for m, c in sorted(self.markets.items())}
+        serialization.write(self.path, data)
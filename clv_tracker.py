@@ -0,0 +1,154 @@
+import os
+import csv
+import time
+import threading
+from datetime import datetime, timedelta
+
+# =========================================================
+# CLOSING-LINE VALUE (CLV) KÖVETÉS
+# =========================================================
+# Az élő ciklus által amúgy is lekért oddsokból mintavételez (nincs extra
+# API hívás): kezdőrúgáskor, majd CLV_INTERVAL_MIN percenként egy sor
+# kerül a CSV-be fixture-önként, riasztáskor pedig azonnal.
+#
+#   date,fixture_id,minute,odds,kind,ts,score   kind ∈ {kickoff, interval, alert}
+#
+# Záró ár: az első pont legalább CLV_CLOSE_AFTER_MIN perccel a riasztás
+# után, a riasztáskori állásnál ("score"). Az élő O1.5 ár gól után esik, gól
+# nélkül az idő múlásával nő — a "legutolsó pont" így főleg azt mérné, jött-e
+# gól. Az azonos állás kiszűri a gólt, a rögzített perc-eltolás pedig minden
+# riasztásnál ugyanakkora időhatást hagy benne. Ha közben gól esett (vagy
+# nincs ilyen pont), nincs záró ár és CLV sem. A CLV-t a riport kötegelten
+# számolja: clv = megjátszott odds / záró odds - 1.
+
+CLV_INTERVAL_MIN    = 5
+CLV_KICKOFF_MAX_MIN = 10
+CLV_RETENTION_DAYS  = 14
+CLV_CLOSE_AFTER_MIN = 5
+CLV_FIELDS          = ["date", "fixture_id", "minute", "odds", "kind", "ts", "score"]
+
+
+class ClvTracker:
+    def __init__(self, path):
+        self.path     = path
+        self._buckets = {}
+        self._lock    = threading.Lock()
+        rows = self._read()
+        for row in rows:
+            self._buckets[row["fixture_id"]] = int(row["minute"]) // CLV_INTERVAL_MIN
+        if rows and list(rows[0]) != CLV_FIELDS:
+            self._rewrite(rows)   # régi fejléc (score nélkül): egyszeri átírás az új oszloprendre
+
+    def _rewrite(self, rows):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8", newline="") as f:
+            w = csv.DictWriter(f, fieldnames=CLV_FIELDS, restval="", extrasaction="ignore")
+            w.writeheader()
+            w.writerows(rows)
+        os.replace(tmp, self.path)
+
+    def _read(self, path=None):
+        path = path or self.path
+        if not os.path.exists(path):
+            return []
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            return list(csv.DictReader(f))
+
+    def _write_row(self, row):
+        is_new = not os.path.exists(self.path)
+        with open(self.path, "a", encoding="utf-8", newline="") as f:
+            w = csv.DictWriter(f, fieldnames=CLV_FIELDS)
+            if is_new:
+                w.writeheader()
+            w.writerow(row)
+
+    def due(self, fixture_id, minute):
+        """Kérne-e a tracker új pontot ebben a percben (az odds lekérés eldöntéséhez)."""
+        with self._lock:
+            prev = self._buckets.get(str(fixture_id))
+        return prev is None or int(minute or 0) // CLV_INTERVAL_MIN != prev
+
+    def snapshot(self, date_str, fixture_id, minute, odds, force_kind=None, score=None):
+        """Rögzít egy pontot, ha új intervallumba léptünk (vagy force_kind adott). score: "h-a"."""
+        if odds is None:
+            return False
+        fid    = str(fixture_id)
+        minute = int(minute or 0)
+        bucket = minute // CLV_INTERVAL_MIN
+        with self._lock:
+            prev = self._buckets.get(fid)
+            if force_kind:
+                kind = force_kind
+            elif prev is None:
+                kind = "kickoff" if minute <= CLV_KICKOFF_MAX_MIN else "interval"
+            elif bucket != prev:
+                kind = "interval"
+            else:
+                return False
+            self._buckets[fid] = bucket
+            self._write_row({"date": date_str, "fixture_id": fid, "minute": minute,
+                             "odds": odds, "kind": kind, "ts": int(time.time()), "score": score or ""})
+        return True
+
+    def load_index(self, paths=None):
+        """
+        fixture_id -> időrendben rendezett (minute, odds, kind, score) lista, egyetlen
+        olvasással. paths: több shard fájl összefésülése (alapból a saját fájl).
+        """
+        idx = {}
+        for row in (r for p in (paths or [self.path]) for r in self._read(p)):
+            try:
+                idx.setdefault(row["fixture_id"], []).append(
+                    (int(row["minute"]), float(row["odds"]), row["kind"], row.get("score") or None))
+            except (ValueError, KeyError):
+                continue
+        for pts in idx.values():
+            pts.sort(key=lambda p: p[0])
+        return idx
+
+    def prune(self, today_str):
+        """A CLV_RETENTION_DAYS napnál régebbi sorokat eldobja."""
+        cutoff = (datetime.strptime(today_str, "%Y-%m-%d")
+                  - timedelta(days=CLV_RETENTION_DAYS)).strftime("%Y-%m-%d")
+        with self._lock:
+            rows = self._read()
+            kept = [r for r in rows if r.get("date", "") >= cutoff]
+            if len(kept) == len(rows):
+                return 0
+            self._rewrite(kept)
+            return len(rows) - len(kept)
+
+
+def compute_clv(entries, index):
+    """
+    Kötegelt CLV számítás a backtest bejegyzésekre (records.BacktestEntry, helyben módosít).
+
+    Megjátszott ár: a riasztás live oddsa, ennek hiányában a riasztás
+    perce utáni első rögzített pont. Záró ár: a riasztás után legalább
+    CLV_CLOSE_AFTER_MIN perccel az első pont, ha az állás addig nem változott.
+    """
+    for e in entries:
+        pts = index.get(str(e.id))
+        if not pts:
+            continue
+        minute = e.minute or 0
+        taken = e.live_odds
+        if taken is None:
+            taken = next((o for m, o, _, _ in pts if m >= minute), None)
+        kickoff = next((o for m, o, k, _ in pts if k == "kickoff"), None)
+        alert   = next((p for p in pts if p[2] == "alert" and p[0] >= minute), None) \
+            or next((p for p in pts if p[0] >= minute), None)
+        closing = None
+        if alert is not None and alert[3]:
+            for m, o, _, score in pts:
+                if m <= alert[0]:
+                    continue
+                if score != alert[3]:
+                    break          # gól (vagy ismeretlen állás) a záró pont előtt
+                if m >= alert[0] + CLV_CLOSE_AFTER_MIN:
+                    closing = o
+                    break
+        e.kickoff_odds = kickoff
+        e.closing_odds = closing
+        e.clv = round(taken / closing - 1.0, 4) if taken and closing else None
+    return entries
@@ -4,12 +4,18 @@ import csv
 import re
 import time
 import requests
-from datetime import datetime
-from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from collections import Counter
 
 import pytz
 from dotenv import load_dotenv
 
+from telegram_queue import get_queue
+from fixture_stats_cache import FixtureStatsCache
+from records import Fixture
+from event_log import EventLog
+from outcome_cache import FixtureOutcomeCache
+
 load_dotenv()
 
 TIMEZONE = os.getenv("TIMEZONE", "Europe/Budapest")
@@ -28,6 +34,14 @@ RAPIDAPI_HOST = (os.getenv("RAPIDAPI_HOST") or "api-football-v1.p.rapidapi.com")
 BASE_URL = "https://api-football-v1.p.rapidapi.com/v3"
 HEADERS  = {"x-rapidapi-key": RAPIDAPI_KEY, "x-rapidapi-host": RAPIDAPI_HOST}
 
+# Végleges, fixture-kulcsos stat cache (közös a livemesterbot-tal)
+FIXTURE_STATS = FixtureStatsCache(os.getenv("FIXTURE_STATS_FILE", "fixture_stats.jsonl"))
+FINAL_STATUSES = ("FT","AET","PEN","ABD","AWD","WO")
+# Napi partíciók (data/<date>/events.csv), különben a logs/events.csv indexen át
+EVENT_LOG = EventLog()
+# Végleges meccs-eredmények (fixture_outcomes.jsonl); a hiányzók ids= kötegekben
+OUTCOMES = FixtureOutcomeCache(final_statuses=FINAL_STATUSES)
+
 # --- segédek ---
 def now_str():
     return datetime.now(tz).strftime("%Y-%m-%d %H:%M:%S")
@@ -41,18 +55,13 @@ def ensure_dir(p):
 def read_events_for_date(datestr: str):
     """
     Visszaadja a kiválasztott nap tippsorait és a forrás-fájlt.
-    Elsődlegesen a data/<date>/events.csv-t keresi, másodsorban a logs/events.csv-t.
+    Elsődlegesen a data/<date>/events.csv-t olvassa, másodsorban a logs/events.csv
+    adott napi sorait (bájt-offset indexszel, a többi nap sorai nem töltődnek be).
     """
-    candidates = [f"data/{datestr}/events.csv", "logs/events.csv"]
-    for path in candidates:
-        if os.path.exists(path):
-            rows = []
-            with open(path, "r", encoding="utf-8") as f:
-                r = csv.DictReader(f)
-                for row in r:
-                    rows.append(row)
-            return rows, path
-    return [], None
+    src = EVENT_LOG.source(datestr)
+    if src is None:
+        return [], None
+    return list(EVENT_LOG.iter_events(datestr)), src
 
 def pick_to_bucket(pick: str) -> str:
     # "Over 2.5 (live)" -> "Over 2.5"
@@ -73,47 +82,28 @@ def _get(path, params, timeout=15):
     except Exception:
         return None
 
-def fetch_fixture_final(fid: str):
+def fetch_fixtures_final_batch(fids):
     """
-    Visszaadja: {"status": "FT/...", "home": int, "away": int}
+    Egy fixtures?ids=a-b-c hívás (legfeljebb 20 ID).
+    Visszaadja: records.Fixture lista (status, home_goals, away_goals), hiba esetén None
     """
-    if not fid or fid.lower() == "none":
-        return None
-    resp = _get("fixtures", {"id": fid})
-    if not resp:
+    resp = _get("fixtures", {"ids": "-".join(fids)})
+    if resp is None:
         return None
-    fx = resp[0]
-    status = (fx.get("fixture",{}).get("status",{}).get("short") or "").upper()
-    g = fx.get("goals", {}) or {}
-    return {"status": status, "home": int(g.get("home") or 0), "away": int(g.get("away") or 0)}
+    return [Fixture.from_api(fx) for fx in resp]
 
-def fetch_fixture_corners_final(fid: str):
+def resolve_outcomes(fids):
+    """{fixture_id: Fixture} — cache-ből, a hiányzók kötegelt, párhuzamos hívásokkal."""
+    return OUTCOMES.resolve(fids, fetch_fixtures_final_batch)
+
+def fetch_fixture_corners_final(fid: str, final: bool = True):
     """
-    Össz-corner szám lekérdezése a fixture statistics-ból.
+    Össz-corner szám a fixture statistics-ból (végleges cache-en keresztül).
     """
     if not fid or fid.lower() == "none":
         return None
-    resp = _get("fixtures/statistics", {"fixture": fid})
-    if not resp:
-        return None
-    total = 0
-    found_any = False
-    try:
-        for team_block in resp:
-            for item in team_block.get("statistics", []) or []:
-                if item.get("type") in ("Corner Kicks", "Corners", "Total Corners"):
-                    val = item.get("value")
-                    if isinstance(val, str):
-                        try:
-                            val = float(val)
-                        except Exception:
-                            continue
-                    if isinstance(val, (int, float)):
-                        total += int(val)
-                        found_any = True
-        return (total if found_any else None)
-    except Exception:
-        return None
+    split = FIXTURE_STATS.corners(fid, lambda f: _get("fixtures/statistics", {"fixture": f}), final=final)
+    return sum(split.values()) if split else None
 
 # --- piac-specifikus kiértékelés ---
 OVER_RE   = re.compile(r"^over\s+(\d+(?:\.\d+)?)$", re.IGNORECASE)
@@ -125,58 +115,65 @@ def eval_over(fi, pick_bucket: str):
     if not m:
         return "unsupported"
     line = float(m.group(1))
-    if not fi:
-        return "pending"
-    st = (fi.get("status") or "").upper()
-    if st not in ("FT","AET","PEN","ABD","AWD","WO"):
+    if not fi or not fi.is_final(FINAL_STATUSES):
         return "pending"
-    total = (fi.get("home",0) or 0) + (fi.get("away",0) or 0)
-    return "win" if total > line else "loss"
+    return "win" if fi.total_goals > line else "loss"
 
 def eval_btts(fi):
-    if not fi:
-        return "pending"
-    st = (fi.get("status") or "").upper()
-    if st not in ("FT","AET","PEN","ABD","AWD","WO"):
+    if not fi or not fi.is_final(FINAL_STATUSES):
         return "pending"
-    return "win" if (fi.get("home",0)>=1 and fi.get("away",0)>=1) else "loss"
+    return "win" if (fi.home_goals>=1 and fi.away_goals>=1) else "loss"
 
 def eval_team_over(fi, pick_bucket: str):
     m = TEAM_OVR.match(pick_bucket or "")
     if not m:
         return "unsupported"
     side, line = m.group(1).lower(), float(m.group(2))
-    if not fi:
-        return "pending"
-    st = (fi.get("status") or "").upper()
-    if st not in ("FT","AET","PEN","ABD","AWD","WO"):
+    if not fi or not fi.is_final(FINAL_STATUSES):
         return "pending"
-    goals = fi.get("home",0) if side=="home" else fi.get("away",0)
+    goals = fi.home_goals if side=="home" else fi.away_goals
     return "win" if goals > line else "loss"
 
-def eval_corners(fid: str, pick_bucket: str):
+def eval_corners(fid: str, pick_bucket: str, fi=None):
     m = CORN_OVR.match(pick_bucket or "")
     if not m:
         return "unsupported"
     line = float(m.group(1))
-    total = fetch_fixture_corners_final(fid)
+    final = bool(fi) and fi.is_final(FINAL_STATUSES)
+    total = fetch_fixture_corners_final(fid, final=final)
     if total is None:
         return "pending"
     return "win" if total > line else "loss"
 
-def evaluate_rows(rows):
+def dedup_rows(rows_in):
+    """
+    Napi duplikációk kiszűrése (ugyanaz a pick_bucket ugyanarra a fixture-re):
+    időrendi rendezés után az első előfordulást tartjuk meg.
+    """
+    def parse_ts(s):
+        try: return datetime.strptime(s, "%Y-%m-%d %H:%M:%S")
+        except: return datetime.min
+    rows_sorted = sorted(rows_in, key=lambda r: parse_ts(r.get("time","")))
+    out, seen = [], set()
+    for r in rows_sorted:
+        key = (str(r.get("fixture_id","")).strip(),
+               (r.get("market") or "").upper().strip(),
+               pick_to_bucket(r.get("pick") or ""))
+        if key in seen:
+            continue
+        seen.add(key)
+        out.append(r)
+    return out
+
+def evaluate_rows(rows, fixture_outcomes=None):
     """
     Soronként kiértékel: outcome ∈ {win, loss, pending, void, unsupported}
+    fixture_outcomes: előre feloldott {fixture_id: Fixture} (range módban az
+    egész időszakra egyszer); ha nincs megadva, a sorok meccseire oldjuk fel.
     Visszaad: (összesítő stat, kiértékelt sorok listája)
     """
-    # fixture részletek cache-hez
-    by_fixture = defaultdict(list)
-    for r in rows:
-        by_fixture[str(r.get("fixture_id","")).strip()].append(r)
-
-    fixture_outcomes = {}
-    for fid in by_fixture.keys():
-        fixture_outcomes[fid] = fetch_fixture_final(fid) if fid and fid.lower()!="none" else None
+    if fixture_outcomes is None:
+        fixture_outcomes = resolve_outcomes(str(r.get("fixture_id","")).strip() for r in rows)
 
     evaluated = []
     for r in rows:
@@ -192,7 +189,7 @@ def evaluate_rows(rows):
         elif market == "TEAM_OVER":
             outcome = eval_team_over(fixture_outcomes.get(fid), pb)
         elif market == "CORNERS":
-            outcome = eval_corners(fid, pb)
+            outcome = eval_corners(fid, pb, fixture_outcomes.get(fid))
         else:
             # egyéb piacok most pending/unsupported
             outcome = "pending"
@@ -202,6 +199,10 @@ def evaluate_rows(rows):
         r2["outcome"] = outcome
         evaluated.append(r2)
 
+    return summarize_evaluated(evaluated), evaluated
+
+def summarize_evaluated(evaluated):
+    """Összesítő stat kiértékelt sorokból (napi és időszakos összesítőhöz is)."""
     total = len(evaluated)
     counts = Counter([r["outcome"] for r in evaluated])
     won = counts.get("win",0); lost = counts.get("loss",0); void = counts.get("void",0); pend = counts.get("pending",0)
@@ -224,24 +225,24 @@ def evaluate_rows(rows):
         "top_markets": top_k(markets, 3),
         "top_leagues": top_k(leagues, 3),
     }
-    return stats, evaluated
+    return stats
 
 # --- Telegram ---
 def send_telegram(text: str):
+    """A közös Telegram sorba teszi az üzenetet; a main() végén flush-oljuk."""
     if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
         print(f"[{now_str()}] Telegram token/chat hiányzik → nem küldtem el.")
         return False
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {"chat_id": TELEGRAM_CHAT_ID, "text": text, "parse_mode": "HTML", "disable_web_page_preview": True}
-    try:
-        r = requests.post(url, json=payload, timeout=20)
-        if r.status_code != 200:
-            print(f"[{now_str()}] Telegram hiba: {r.status_code} {r.text}")
-            return False
-        return True
-    except Exception as e:
-        print(f"[{now_str()}] Telegram kivétel: {e}")
-        return False
+    return get_queue(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID).send(text, chat_id=TELEGRAM_CHAT_ID)
+
+def flush_telegram():
+    if not TELEGRAM_BOT_TOKEN:
+        return
+    tg = get_queue(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID)
+    tg.flush(timeout=60)
+    m = tg.metrics()
+    if m["failed"]:
+        print(f"[{now_str()}] Telegram hiba: {m}")
 
 def format_summary_message(date_str: str, stats: dict):
     def fmt_top(items):
@@ -313,34 +314,87 @@ def append_history_evaluated(evaluated_rows: list):
             write_cnt += 1
     return hist_path
 
+# --- időszakos (range / backfill) mód ---
+PERIOD_FIELDS = ["date","total","win","loss","void","pending","success_rate"]
+
+def date_range(date_from: str, date_to: str):
+    d, end = datetime.strptime(date_from, "%Y-%m-%d"), datetime.strptime(date_to, "%Y-%m-%d")
+    while d <= end:
+        yield d.strftime("%Y-%m-%d")
+        d += timedelta(days=1)
+
+def write_period_summary(date_from: str, date_to: str, per_day: list, stats: dict):
+    """
+    Időszakos összesítő: data/summary_<from>_<to>.csv — naponként egy sor + ÖSSZESEN sor.
+    """
+    ensure_dir("data")
+    path = f"data/summary_{date_from}_{date_to}.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=PERIOD_FIELDS, extrasaction="ignore")
+        w.writeheader()
+        for day, st in per_day:
+            w.writerow({"date": day, **st})
+        w.writerow({"date": "ÖSSZESEN", **stats})
+    return path
+
+def format_period_message(date_from: str, date_to: str, per_day: list, stats: dict):
+    head = format_summary_message(f"{date_from} → {date_to}", stats).replace("Napi összesítő", "Időszakos összesítő", 1)
+    lines = [f"{day}: {st['win']}/{st['win'] + st['loss']} ({st['success_rate']}%)" for day, st in per_day]
+    return head + ("\n📅 Napok:\n" + "\n".join(lines) if lines else "")
+
+def run_range(date_from: str, date_to: str):
+    """
+    Több nap kiértékelése egy futásban. Először az időszak összes egyedi
+    fixture ID-ja oldódik fel egyszerre (cache + kötegelt, párhuzamos
+    ids= hívások), utána naponként kiértékelés és data/<date>/events_evaluated.csv.
+    """
+    days = list(date_range(date_from, date_to))
+    # 1. menet: csak az ID-k (streamelve, a sorok nem maradnak a memóriában)
+    fids = {str(r.get("fixture_id","")).strip() for d in days for r in EVENT_LOG.iter_events(d)}
+    outcomes = resolve_outcomes(fids)
+    print(f"[{now_str()}] {date_from} → {date_to}: {len(fids)} meccs | cache: {OUTCOMES.hits} találat, "
+          f"{OUTCOMES.misses} hiányzó, {OUTCOMES.calls} ids= hívás")
+
+    # 2. menet: naponkénti kiértékelés a már feloldott eredményekkel
+    per_day, all_evaluated = [], []
+    for d in days:
+        rows, _ = read_events_for_date(d)
+        if not rows:
+            continue
+        stats, evaluated = evaluate_rows(dedup_rows(rows), outcomes)
+        write_day_evaluated(d, evaluated)
+        per_day.append((d, stats))
+        all_evaluated.extend(evaluated)
+
+    if not per_day:
+        send_telegram(f"🧾 <b>Időszakos összesítő – {date_from} → {date_to}</b>\nNincs napló az időszakban.")
+        flush_telegram()
+        return None
+
+    stats = summarize_evaluated(all_evaluated)
+    hist_file   = append_history_evaluated(all_evaluated)
+    period_file = write_period_summary(date_from, date_to, per_day, stats)
+    footer = f"\n🗂️ Mentve:\n• {len(per_day)} napi events_evaluated.csv\n• {period_file}\n• {hist_file}"
+    send_telegram(format_period_message(date_from, date_to, per_day, stats) + footer)
+    flush_telegram()
+    return period_file
+
 # --- main ---
 def main():
+    # range / backfill: SUMMARY_FROM (+ SUMMARY_TO, alapból ma) — minden nap egy futásban
+    if os.getenv("SUMMARY_FROM"):
+        run_range(os.getenv("SUMMARY_FROM"), os.getenv("SUMMARY_TO") or today_date_str())
+        return
+
     # dátum kiválasztás: env-ből (SUMMARY_DATE) vagy a mai nap
     date_str = os.getenv("SUMMARY_DATE") or today_date_str()
     rows, src = read_events_for_date(date_str)
 
     if not rows:
         send_telegram(f"🧾 <b>Napi összesítő – {date_str}</b>\nMa nem keletkezett napló (nincs data).")
+        flush_telegram()
         return
 
-    # opcionális: napi duplikációk kiszűrése (ugyanaz a pick_bucket ugyanarra a fixture-re):
-    # időrendi rendezés után az első előfordulást tartjuk meg
-    def dedup_rows(rows_in):
-        def parse_ts(s):
-            try: return datetime.strptime(s, "%Y-%m-%d %H:%M:%S")
-            except: return datetime.min
-        rows_sorted = sorted(rows_in, key=lambda r: parse_ts(r.get("time","")))
-        out, seen = [], set()
-        for r in rows_sorted:
-            key = (str(r.get("fixture_id","")).strip(),
-                   (r.get("market") or "").upper().strip(),
-                   pick_to_bucket(r.get("pick") or ""))
-            if key in seen:
-                continue
-            seen.add(key)
-            out.append(r)
-        return out
-
     rows_dedup = dedup_rows(rows)
     stats, evaluated = evaluate_rows(rows_dedup)
 
@@ -352,6 +406,7 @@ def main():
     header = format_summary_message(date_str, stats)
     footer = f"\n🗂️ Mentve:\n• {day_file}\n• {hist_file}"
     send_telegram(header + footer)
+    flush_telegram()
 
     # debug infó
     try:
@@ -0,0 +1,184 @@
+import io
+import os
+import csv
+import hashlib
+import threading
+
+import serialization
+
+# =========================================================
+# ESEMÉNYNAPLÓ — napi partíciók + bájt-offset index a régi egyfájlos logra
+# =========================================================
+# Írás: data/<YYYY-MM-DD>/events.csv (a sor "time" mezőjének dátuma szerint).
+# Olvasás: iter_events(dátum) generátor — soronként ad, a memóriában csak
+# az aktuális sor van.
+#
+# A régi logs/events.csv minden nap sorát tartalmazza; ehhez egy
+# inkrementális index készül (logs/events.csv.idx.json):
+#
+#   {"size": <indexelt bájtok>, "mtime_ns": ..., "fp": {"ino": ..., "head": ..., "tail": ...},
+#    "header": [...], "dates": {"<dátum>": [[kezdő offset, záró offset], ...]}}
+#
+# Az index csak a legutóbb indexelt méret utáni új bájtokat olvassa be
+# (append-only napló). Változáskor az "fp" ujjlenyomat (inode + az indexelt
+# rész első és utolsó FP_BYTES bájtjának hash-e) dönti el, hogy a fájl
+# tényleg csak bővült-e; rotálás / felülírás (akár nagyobb fájllal) esetén
+# az index újraépül. Egy nap lekérdezése az adott tartományokra seek-el, a
+# többi napot nem parse-olja.
+
+EVENT_DIR    = "data"
+LEGACY_LOG   = os.path.join("logs", "events.csv")
+FP_BYTES     = 4096
+EVENT_FIELDS = ["time", "league", "match", "minute", "score", "pick", "prob", "odds",
+                "fixture_id", "details", "market"]
+
+
+def partition_path(date_str, directory=EVENT_DIR):
+    return os.path.join(directory, date_str, "events.csv")
+
+
+def _records(f, start):
+    """(kezdő offset, záró offset, nyers bájtok) CSV rekordonként — idézőjelben lévő sortörés is egy rekord."""
+    f.seek(start)
+    pos, buf, rec_start = start, b"", start
+    for line in f:
+        if not buf:
+            rec_start = pos
+        buf += line
+        pos += len(line)
+        if buf.endswith(b"\n") and buf.count(b'"') % 2 == 0:   # lezárt sor, kiegyensúlyozott idézőjelek
+            yield rec_start, pos, buf
+            buf = b""
+    # félig kiírt utolsó sor: nem indexeljük, a következő frissítés veszi fel
+
+
+def _fingerprint(f, st, size):
+    """Az indexelt [0, size) rész azonosítója: inode + első / utolsó FP_BYTES bájt hash-e."""
+    f.seek(0)
+    head = f.read(min(size, FP_BYTES))
+    f.seek(max(0, size - FP_BYTES))
+    tail = f.read(size - max(0, size - FP_BYTES))
+    return {"ino": st.st_ino,
+            "head": hashlib.sha1(head).hexdigest(),
+            "tail": hashlib.sha1(tail).hexdigest()}
+
+
+def _parse(raw):
+    return next(csv.reader(io.StringIO(raw.decode("utf-8"))), [])
+
+
+class EventLogIndex:
+    def __init__(self, log_path=LEGACY_LOG, index_path=None):
+        self.log_path   = log_path
+        self.index_path = index_path or log_path + ".idx.json"
+        self._lock      = threading.Lock()
+        try:
+            self.data = serialization.read(self.index_path) or {}
+        except ValueError:
+            self.data = {}
+        if not isinstance(self.data.get("dates"), dict):
+            self.data = {}
+
+    def _reset(self):
+        self.data = {"size": 0, "mtime_ns": None, "fp": None, "header": None, "dates": {}}
+
+    def refresh(self):
+        """Az index hozzáigazítása a log aktuális állapotához; visszatér: új rekordok száma."""
+        with self._lock:
+            try:
+                st = os.stat(self.log_path)
+            except OSError:
+                self._reset()
+                return 0
+            if (self.data and st.st_size == self.data.get("size")
+                    and st.st_mtime_ns == self.data.get("mtime_ns")):
+                return 0
+            with open(self.log_path, "rb") as f:
+                size = self.data.get("size", 0) if self.data else 0
+                if (not self.data or st.st_size < size
+                        or (size and self.data.get("fp") != _fingerprint(f, st, size))):
+                    self._reset()           # rotálás / felülírás: a régi offsetek érvénytelenek
+                dates, added = self.data["dates"], 0
+                header = self.data["header"]
+                col    = header.index("time") if header and "time" in header else 0
+                end = self.data["size"]
+                for start, end, raw in _records(f, self.data["size"]):
+                    row = _parse(raw)
+                    if header is None:
+                        header = self.data["header"] = row
+                        col    = header.index("time") if "time" in header else 0
+                        continue
+                    date_str = row[col][:10] if len(row) > col else ""
+                    ranges = dates.setdefault(date_str, [])
+                    if ranges and ranges[-1][1] == start:
+                        ranges[-1][1] = end           # összefüggő tartomány bővítése
+                    else:
+                        ranges.append([start, end])
+                    added += 1
+                self.data["size"] = end
+                self.data["fp"]   = _fingerprint(f, st, end) if end else None
+            self.data["mtime_ns"] = st.st_mtime_ns
+            serialization.write(self.index_path, self.data, binary=False)
+            return added
+
+    def dates(self):
+        return sorted(d for d in self.data.get("dates", {}) if d)
+
+    def iter_date(self, date_str):
+        """Egy nap sorai dict-ként, csak az indexelt tartományokból olvasva."""
+        ranges = self.data.get("dates", {}).get(date_str)
+        if not ranges:
+            return
+        header = self.data["header"]
+        with open(self.log_path, "rb") as f:
+            for start, end in ranges:
+                for _, stop, raw in _records(f, start):
+                    row = _parse(raw)
+                    if row:
+                        yield dict(zip(header, row))
+                    if stop >= end:
+                        break
+
+
+class EventLog:
+    """Napi partícionált írás + olvasás (partíció, különben a régi log az indexen át)."""
+
+    def __init__(self, directory=EVENT_DIR, legacy_path=LEGACY_LOG, fields=EVENT_FIELDS):
+        self.directory   = directory
+        self.legacy_path = legacy_path
+        self.fields      = fields
+        self._lock       = threading.Lock()
+        self._index      = None
+
+    def append(self, row):
+        """Egy esemény a sor "time" dátumának partíciójába."""
+        path = partition_path(str(row.get("time", ""))[:10], self.directory)
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            is_new = not os.path.exists(path)
+            with open(path, "a", newline="", encoding="utf-8") as f:
+                w = csv.DictWriter(f, fieldnames=self.fields, extrasaction="ignore")
+                if is_new:
+                    w.writeheader()
+                w.writerow(row)
+        return path
+
+    def source(self, date_str):
+        """A napot kiszolgáló fájl (partíció vagy régi log), vagy None."""
+        p = partition_path(date_str, self.directory)
+        if os.path.exists(p):
+            return p
+        return self.legacy_path if os.path.exists(self.legacy_path) else None
+
+    def iter_events(self, date_str):
+        p = partition_path(date_str, self.directory)
+        if os.path.exists(p):
+            with open(p, "r", newline="", encoding="utf-8") as f:
+                yield from csv.DictReader(f)
+            return
+        if not os.path.exists(self.legacy_path):
+            return
+        if self._index is None:
+            self._index = EventLogIndex(self.legacy_path)
+        self._index.refresh()
+        yield from self._index.iter_date(date_str)
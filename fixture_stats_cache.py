@@ -0,0 +1,113 @@
+import os
+import json
+import threading
+
+# =========================================================
+# FIXTURE STATISZTIKA CACHE — végleges, fixture-kulcsos
+# =========================================================
+# Egy lezárt meccs statisztikája már nem változik, ezért egyetlen szűretlen
+# /fixtures/statistics hívás mindkét csapat teljes blokkját eltároljuk, és
+# innen szolgáljuk ki a szögletet, lövéseket stb. a scan-nek, a napi
+# riportnak és a daily_summary-nek is.
+#
+# fixture_stats.jsonl (csak hozzáfűzés, soronként egy meccs):
+#   {"id": <fixture_id>, "teams": {"<team_id>": {"<stat típus>": érték, ...}, ...}}
+#
+# Üres válasz nem kerül be: a statisztika később is megjelenhet (késve
+# publikált adat), ezért azt a következő igény újra lekéri.
+
+FIXTURE_STATS_FILE = "fixture_stats.jsonl"
+CORNER_TYPES       = ("Corner Kicks", "Corners", "Total Corners")
+
+
+def _to_int(val):
+    if val is None:
+        return 0
+    try:
+        if isinstance(val, str):
+            val = val.replace("%", "").strip()
+        return int(float(val))
+    except (ValueError, TypeError):
+        return 0
+
+
+def corner_split(teams):
+    """{team_id(str): {típus: érték}} → {team_id(int): szöglet} (csak ahol van szöglet adat)."""
+    out = {}
+    for tid, block in (teams or {}).items():
+        for t in CORNER_TYPES:
+            if t in block:
+                out[int(tid)] = _to_int(block[t])
+                break
+    return out
+
+
+def parse_statistics(response):
+    """API-Football /fixtures/statistics válasz → {team_id: {típus: érték}}."""
+    teams = {}
+    for block in response or []:
+        tid = (block.get("team") or {}).get("id")
+        if tid is None:
+            continue
+        teams[str(tid)] = {s.get("type"): s.get("value") for s in block.get("statistics") or []}
+    return teams
+
+
+class FixtureStatsCache:
+    def __init__(self, path=FIXTURE_STATS_FILE):
+        self.path  = path
+        self._lock = threading.Lock()
+        self._data = {}
+        self.hits = self.misses = 0
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                        if rec.get("teams"):   # régi fájlok üres bejegyzései: újra lekérendők
+                            self._data[str(rec["id"])] = rec["teams"]
+                    except (ValueError, KeyError, TypeError):
+                        continue
+
+    def get(self, fixture_id):
+        return self._data.get(str(fixture_id))
+
+    def put(self, fixture_id, teams):
+        with self._lock:
+            self._data[str(fixture_id)] = teams
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"id": fixture_id, "teams": teams}, ensure_ascii=False,
+                                   separators=(",", ":")) + "\n")
+
+    def fetch(self, fixture_id, fetch_fn, final=True):
+        """
+        Cache-ből vagy egyetlen szűretlen hívásból adja a statisztikát.
+        fetch_fn(fixture_id) -> nyers API válasz lista, hiba esetén None.
+        Csak lezárt (final=True) meccs nem üres statisztikája kerül a végleges cache-be.
+        """
+        teams = self.get(fixture_id)
+        if teams is not None:
+            self.hits += 1
+            return teams
+        self.misses += 1
+        raw = fetch_fn(fixture_id)
+        if raw is None:
+            return None
+        teams = parse_statistics(raw)
+        if final and teams:
+            self.put(fixture_id, teams)
+        return teams
+
+    def team_stat(self, fixture_id, team_id, types, fetch_fn, final=True):
+        teams = self.fetch(fixture_id, fetch_fn, final)
+        if not teams or str(team_id) not in teams:
+            return None
+        block = teams[str(team_id)]
+        for t in types:
+            if t in block:
+                return _to_int(block[t])
+        return None
+
+    def corners(self, fixture_id, fetch_fn, final=True):
+        """{team_id(int): szöglet}; üres dict, ha nincs adat."""
+        return corner_split(self.fetch(fixture_id, fetch_fn, final))
@@ -5,9 +5,17 @@ from math import exp, factorial
 
 import requests
 import numpy as np
-from supabase import create_client, Client
 from typing import List, Dict, Any, Optional
 
+from telegram_queue import get_queue
+from team_history_cache import TeamHistoryCache
+from team_form_store import TeamFormStore
+from team_ratings import TeamRatings, collect_matches
+from league_baselines import LeagueBaselines
+from records import Fixture, Tip
+import serialization
+from artifact_publisher import ArtifactPublisher
+
 # =========================================================
 # GLOBÁLIS KONSTANSOK
 # =========================================================
@@ -18,6 +26,10 @@ GLOBAL_AVG_GOALS = 2.65
 # Hazai pálya előny szorzó (meta-analízis: ~12% gól-többlet)
 HOME_ADVANTAGE = 1.12
 
+# Ligánkénti / szezononkénti felülírás a tárolt eredményekből (naponta
+# frissül a main()-ben); ismeretlen ligánál a fenti két érték marad.
+LEAGUE_BASELINES = LeagueBaselines(GLOBAL_AVG_GOALS, HOME_ADVANTAGE)
+
 # =========================================================
 # EV SZŰRŐ KÜSZÖBÖK — piaconként
 # =========================================================
@@ -131,24 +143,8 @@ def fetch_team_last_matches(api_key, base_url, team_id, last_n=15):
 # =========================================================
 # STATISZTIKA SZÁMÍTÁS — HAZAI/IDEGENBELI BONTÁSSAL
 # =========================================================
-def compute_basic_stats_from_matches(
-    matches: List[Dict],
-    team_id: int,
-    side: str = "all",   # 'home' | 'away' | 'all'
-) -> Dict[str, Any]:
-    """
-    Kiszámítja az alap statisztikákat a csapat elmúlt meccsei alapján.
-
-    Paraméterek:
-        side='home'  -> csak a hazai meccseket veszi figyelembe
-        side='away'  -> csak az idegenbeli meccseket veszi figyelembe
-        side='all'   -> minden meccset (legacy mód, visszafelé kompatibilis)
-
-    Visszatér:
-        goals_for_per_match, goals_against_per_match,
-        over15_rate, over25_rate, btts_rate, avg_corners
-    """
-    empty = {
+def _empty_stats() -> Dict[str, Any]:
+    return {
         "goals_for_per_match":     0.0,
         "goals_against_per_match": 0.0,
         "over15_rate":             0.0,
@@ -157,57 +153,78 @@ def compute_basic_stats_from_matches(
         "avg_corners":             None,
         "sample_size":             0,
     }
-    if not matches:
-        return empty
 
-    total_for, total_against = 0, 0
-    over15, over25, btts = 0, 0, 0
-    total_corners, corners_count = 0, 0
-    n = 0
 
-    for m in matches:
-        home_id    = m["teams"]["home"]["id"]
-        away_id    = m["teams"]["away"]["id"]
+def compute_split_stats_from_matches(
+    matches: List[Dict],
+    team_id: int,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Hazai / idegenbeli / összes bontás egyetlen bejárással.
+
+    Visszatér: {"home": {...}, "away": {...}, "all": {...}}, ahol minden
+    blokk: goals_for_per_match, goals_against_per_match,
+    over15_rate, over25_rate, btts_rate, avg_corners, sample_size
+    """
+    # side -> [gól_for, gól_against, over15, over25, btts, n]
+    acc = {"home": [0, 0, 0, 0, 0, 0], "away": [0, 0, 0, 0, 0, 0]}
+
+    for m in matches or []:
         goals_home = m["goals"]["home"]
         goals_away = m["goals"]["away"]
-
         if goals_home is None or goals_away is None:
             continue
 
-        is_home_match = (team_id == home_id)
-        is_away_match = (team_id == away_id)
-
-        if side == "home" and not is_home_match:
-            continue
-        if side == "away" and not is_away_match:
-            continue
-        if not is_home_match and not is_away_match:
+        if team_id == m["teams"]["home"]["id"]:
+            a = acc["home"]
+            a[0] += goals_home; a[1] += goals_away
+        elif team_id == m["teams"]["away"]["id"]:
+            a = acc["away"]
+            a[0] += goals_away; a[1] += goals_home
+        else:
             continue
 
-        g_for     = goals_home if is_home_match else goals_away
-        g_against = goals_away if is_home_match else goals_home
+        total_goals = goals_home + goals_away
+        if total_goals >= 2: a[2] += 1
+        if total_goals >= 3: a[3] += 1
+        if goals_home > 0 and goals_away > 0: a[4] += 1
+        a[5] += 1
 
-        total_for     += g_for
-        total_against += g_against
-        n += 1
+    acc["all"] = [h + w for h, w in zip(acc["home"], acc["away"])]
 
-        total_goals = goals_home + goals_away
-        if total_goals >= 2: over15 += 1
-        if total_goals >= 3: over25 += 1
-        if goals_home > 0 and goals_away > 0: btts += 1
+    out = {}
+    for side, (g_for, g_against, over15, over25, btts, n) in acc.items():
+        if n == 0:
+            out[side] = _empty_stats()
+            continue
+        out[side] = {
+            "goals_for_per_match":     g_for / n,
+            "goals_against_per_match": g_against / n,
+            "over15_rate":             over15 / n,
+            "over25_rate":             over25 / n,
+            "btts_rate":               btts / n,
+            "avg_corners":             None,
+            "sample_size":             n,
+        }
+    return out
 
-    if n == 0:
-        return empty
 
-    return {
-        "goals_for_per_match":     total_for / n,
-        "goals_against_per_match": total_against / n,
-        "over15_rate":             over15 / n,
-        "over25_rate":             over25 / n,
-        "btts_rate":               btts / n,
-        "avg_corners":             (total_corners / corners_count) if corners_count else None,
-        "sample_size":             n,
-    }
+def compute_basic_stats_from_matches(
+    matches: List[Dict],
+    team_id: int,
+    side: str = "all",   # 'home' | 'away' | 'all'
+) -> Dict[str, Any]:
+    """
+    Kiszámítja az alap statisztikákat a csapat elmúlt meccsei alapján.
+
+    Paraméterek:
+        side='home'  -> csak a hazai meccseket veszi figyelembe
+        side='away'  -> csak az idegenbeli meccseket veszi figyelembe
+        side='all'   -> minden meccset (legacy mód, visszafelé kompatibilis)
+
+    Több bontás kell? → compute_split_stats_from_matches (egy bejárás).
+    """
+    return compute_split_stats_from_matches(matches, team_id)[side]
 
 
 # =========================================================
@@ -216,16 +233,21 @@ def compute_basic_stats_from_matches(
 def dixon_coles_lambda(
     attack_avg: float,
     defence_avg: float,
-    global_avg: float = GLOBAL_AVG_GOALS,
+    global_avg: Optional[float] = None,
     home: bool = False,
+    league_id: Optional[int] = None,
+    season: Optional[int] = None,
 ) -> float:
     """
     Dixon-Coles alapú várható gólszám (lambda) kiszámítása.
     Képlet: lambda = attack_avg * defence_avg / global_avg
+    A gólátlag és a hazai előny a liga (szezon) alapszintjéből jön;
+    explicit global_avg felülírja az átlagot.
     """
-    raw = (attack_avg * defence_avg) / max(global_avg, 0.01)
+    league_avg, home_adv = LEAGUE_BASELINES.lookup(league_id, season)
+    raw = (attack_avg * defence_avg) / max(global_avg or league_avg, 0.01)
     if home:
-        raw *= HOME_ADVANTAGE
+        raw *= home_adv
     return max(raw, 0.05)
 
 
@@ -274,8 +296,15 @@ def simple_model_probabilities(
     home_stats_a: Dict,
     away_stats_a: Dict,
     away_stats_h: Dict,
+    lambdas: Optional[tuple] = None,
+    league_id: Optional[int] = None,
+    season: Optional[int] = None,
 ) -> Dict[str, Any]:
-    """Dixon-Coles korrigált lambda + Monte Carlo hibrid modell."""
+    """
+    Dixon-Coles korrigált lambda + Monte Carlo hibrid modell.
+    lambdas: (hazai, vendég) a team_ratings fitből; ha nincs, az átlagokból
+    számolunk a liga (league_id, season) alapszintjével.
+    """
     h_att = home_stats_h.get("goals_for_per_match") or 0.0
     h_def = home_stats_h.get("goals_against_per_match") or 0.0
     a_att = away_stats_a.get("goals_for_per_match") or 0.0
@@ -290,8 +319,11 @@ def simple_model_probabilities(
         a_att = away_stats_h.get("goals_for_per_match") or a_att
         a_def = away_stats_h.get("goals_against_per_match") or a_def
 
-    home_lambda = dixon_coles_lambda(h_att, a_def, GLOBAL_AVG_GOALS, home=True)
-    away_lambda = dixon_coles_lambda(a_att, h_def, GLOBAL_AVG_GOALS, home=False)
+    if lambdas:
+        home_lambda, away_lambda = lambdas
+    else:
+        home_lambda = dixon_coles_lambda(h_att, a_def, home=True,  league_id=league_id, season=season)
+        away_lambda = dixon_coles_lambda(a_att, h_def, home=False, league_id=league_id, season=season)
 
     mc = run_monte_carlo_simulation(home_lambda, away_lambda)
 
@@ -411,7 +443,7 @@ def generate_multi_market_tips_from_fixtures(
     fixtures: List[Dict[str, Any]],
     max_tips: int = 10,
     allowed_leagues: Optional[List[str]] = None,
-) -> List[Dict[str, Any]]:
+) -> List[Tip]:
     """
     Tipp generálás MARKET_CONFIG alapú EV szűrővel.
 
@@ -421,8 +453,11 @@ def generate_multi_market_tips_from_fixtures(
     3. min_ev emelve piacon: over15: 0.04, over25: 0.05, btts: 0.06
     4. MAX_TIPS_PER_FIXTURE=2: egy meccsen 2 különböző piac is bekerülhet,
        ha mindkettő átmegy a szűrőn (pl. over15 + over25 egyszerre)
+
+    A jelöltek records.Tip példányok, csak a tipp mezőivel (a teljes
+    fixture dict nem másolódik be minden jelöltbe).
     """
-    raw_candidates: List[Dict[str, Any]] = []
+    raw_candidates: List[Tip] = []
 
     for fx in fixtures:
         league_name = fx.get("league")
@@ -469,38 +504,47 @@ def generate_multi_market_tips_from_fixtures(
                     and cfg["min_o"] <= o <= cfg["max_o"]):
                 continue
 
-            raw_candidates.append({
-                **fx,
-                "market":               market,
-                "model_p":              p,
-                "odds":                 o,
-                "ev":                   round(ev, 4),
-                "safe_over_candidate":  safe,
-                "match_profile":        profile,
-            })
+            raw_candidates.append(Tip(
+                fx["fixture_id"],
+                market              = market,
+                model_p             = p,
+                odds                = o,
+                ev                  = round(ev, 4),
+                model_p_raw         = p,
+                league              = league_name,
+                country             = fx.get("country"),
+                kickoff             = fx.get("kickoff"),
+                home_team           = fx.get("home_team"),
+                away_team           = fx.get("away_team"),
+                league_id           = fx.get("league_id"),
+                lambda_home         = probs.get("_home_lambda"),
+                lambda_away         = probs.get("_away_lambda"),
+                safe_over_candidate = safe,
+                match_profile       = profile,
+            ))
 
     # ── DEDUPLIKÁCIÓ — max MAX_TIPS_PER_FIXTURE tipp/meccs ─────────────
     # Meccsenként a legjobb EV-jű tipppeket tartjuk meg,
     # de legfeljebb MAX_TIPS_PER_FIXTURE darabot.
     # Azonos piacon belül csak a legjobb marad (nincs duplikált over15).
     from collections import defaultdict
-    fixture_markets: Dict[Any, Dict[str, Dict]] = defaultdict(dict)
+    fixture_markets: Dict[Any, Dict[str, Tip]] = defaultdict(dict)
 
     for c in raw_candidates:
-        fid    = c["fixture_id"]
-        market = c["market"]
+        fid    = c.fixture_id
+        market = c.market
         # Ugyanolyan piacból csak a legmagasabb EV marad
-        if market not in fixture_markets[fid] or c["ev"] > fixture_markets[fid][market]["ev"]:
+        if market not in fixture_markets[fid] or c.ev > fixture_markets[fid][market].ev:
             fixture_markets[fid][market] = c
 
     # Meccsenként EV szerint rendezve, legfeljebb MAX_TIPS_PER_FIXTURE tipp
-    deduped: List[Dict] = []
+    deduped: List[Tip] = []
     for fid, markets in fixture_markets.items():
-        top = sorted(markets.values(), key=lambda x: x["ev"], reverse=True)
+        top = sorted(markets.values(), key=lambda x: x.ev, reverse=True)
         deduped.extend(top[:MAX_TIPS_PER_FIXTURE])
 
     # Végső rendezés: safe_over_candidate előre, azon belül EV szerint
-    deduped.sort(key=lambda x: (x["safe_over_candidate"], x["ev"]), reverse=True)
+    deduped.sort(key=lambda x: (x.safe_over_candidate, x.ev), reverse=True)
     return deduped[:max_tips]
 
 
@@ -528,10 +572,9 @@ def send_telegram_message_with_json(token, chat_id, tips_payload):
         market_display = market_lk.get((t.get("market") or "").lower(), (t.get("market") or "").upper())
         profile_emoji  = {"A": "🏆", "B": "⚡", "C": "🔒", "D": "🔀"}.get(t.get("match_profile"), "❓")
 
-        mp = t.get("model_probabilities", {})
         lam_str = ""
-        if mp.get("_home_lambda") and mp.get("_away_lambda"):
-            lam_str = f"\n   λ hazai: {mp['_home_lambda']} | λ vendég: {mp['_away_lambda']}"
+        if t.get("lambda_home") and t.get("lambda_away"):
+            lam_str = f"\n   λ hazai: {t['lambda_home']} | λ vendég: {t['lambda_away']}"
 
         lines.append(
             f"{emoji} <b>{t.get('home_team')} – {t.get('away_team')}</b>\n"
@@ -542,33 +585,37 @@ def send_telegram_message_with_json(token, chat_id, tips_payload):
         )
 
     text = header + "\n".join(lines) if lines else header + "<i>Nincs mai tipp a szűrők alapján.</i>"
-    url  = f"https://api.telegram.org/bot{token}/sendMessage"
-    try:
-        requests.post(url, json={"chat_id": chat_id, "text": text, "parse_mode": "HTML", "disable_web_page_preview": True}, timeout=15)
+    tg   = get_queue(token, chat_id)
+    tg.send(text, chat_id=chat_id)
+    if tg.flush(timeout=60) and not tg.metrics()["failed"]:
         print("✅ Telegram üzenet elküldve.")
-    except Exception as e:
-        print(f"❌ Telegram hiba: {e}")
+    else:
+        print(f"❌ Telegram hiba: {tg.metrics()}")
 
 
 # =========================================================
 # SUPABASE FELTÖLTÉS
 # =========================================================
-def upload_to_supabase(output_file, date_str, bucket_key="foci-master"):
-    url = os.environ.get("SUPABASE_URL")
-    key = os.environ.get("SUPABASE_KEY") or os.environ.get("SUPABASE_SERVICE_KEY")
-    bucket = os.environ.get("FOCI_MASTER_BUCKET", bucket_key)
-    if not url or not key:
+def upload_to_supabase(artifacts, date_str, publisher=None):
+    """
+    artifacts: [(helyi fájl, alap bucket)] — egy kliensen, párhuzamosan (gzip csak PUBLISH_GZIP=1 esetén);
+    a változatlan tartalmú fájlok kimaradnak (artifact_publisher).
+    """
+    publisher = publisher or ArtifactPublisher()
+    if publisher.client is None:
         print("⚠️ Supabase URL vagy KEY hiányzik.")
-        return
-    supabase: Client = create_client(url, key)
-    path = f"{date_str}/{os.path.basename(output_file)}"
-    with open(output_file, "rb") as f:
-        data = f.read()
-    try:
-        supabase.storage.from_(bucket).upload(path=path, file=data, file_options={"cache-control": "3600", "upsert": "true"})
-        print(f"✅ Supabase: {bucket}/{path}")
-    except Exception as e:
-        print(f"❌ Supabase hiba: {e}")
+        return {}
+    results = publisher.publish([
+        (path, os.environ.get("FOCI_MASTER_BUCKET", bucket_key), date_str) for path, bucket_key in artifacts
+    ])
+    for key, status in sorted(results.items()):
+        if status.startswith("error"):
+            print(f"❌ Supabase hiba: {key} — {status[7:]}")
+        elif status == "skipped":
+            print(f"⏭ Supabase: {key} változatlan, kihagyva")
+        else:
+            print(f"✅ Supabase: {key} {status[8:]}")
+    return results
 
 
 # =========================================================
@@ -588,48 +635,68 @@ def main():
     print(f"▶ Napi foci master build: {date_str}")
 
     fixtures_raw = fetch_fixtures_for_date(api_key, base_url, leagues_cfg, date_str)
-
-    team_stats_cache: Dict[int, Dict[str, Dict]] = {}
+    fixtures_sel = [fx for fx in map(Fixture.from_api, fixtures_raw) if fx.league_id in allowed_league_ids]
+
+    # Az összes érintett csapat előzménye egyszerre, korlátos párhuzamossággal;
+    # a napi lemez-cache-t a livemesterbot scan is használja.
+    # A gördülő formatárban (livemesterbot napi zárása frissíti) már ismert
+    # csapatokhoz nem kell letöltés.
+    history = TeamHistoryCache()
+    form    = TeamFormStore()
+    team_ids = [tid for fx in fixtures_sel for tid in (fx.home_id, fx.away_id)]
+    team_matches = {tid: form.matches(tid, 15) for tid in team_ids if form.knows(tid)}
+    team_matches.update(history.prefetch(
+        [tid for tid in team_ids if tid not in team_matches],
+        lambda tid, n: fetch_team_last_matches(api_key, base_url, tid, last_n=n),
+        last_n=15,
+        on_error=lambda tid, e: print(f"⚠️ Előzmény lekérés hiba ({tid}): {e}"),
+    ))
+    history.save()
+    for tid, matches in team_matches.items():
+        if not form.knows(tid):
+            form.seed(tid, matches)
+    form.save()
+
+    # Ligánkénti csapaterősség (a livemesterbot scannel közös team_ratings.json, warm start)
+    stored  = collect_matches(form, history)
+    ratings = TeamRatings()
+    ratings.fit(stored)
+    ratings.save()
+    LEAGUE_BASELINES.refresh_if_stale(lambda: stored)
+
+    team_stats_cache: Dict[int, Dict[str, Dict]] = {
+        tid: compute_split_stats_from_matches(matches, tid)
+        for tid, matches in team_matches.items()
+    }
     fixtures_out: List[Dict[str, Any]] = []
 
-    for fx in fixtures_raw:
-        if fx["league"]["id"] not in allowed_league_ids:
-            continue
+    for fx in fixtures_sel:
+        home_id, away_id = fx.home_id, fx.away_id
 
-        fixture = fx["fixture"]
-        league  = fx["league"]
-        teams   = fx["teams"]
-        home_id, away_id = teams["home"]["id"], teams["away"]["id"]
-
-        for tid in (home_id, away_id):
-            if tid not in team_stats_cache:
-                raw_matches = fetch_team_last_matches(api_key, base_url, tid, last_n=15)
-                team_stats_cache[tid] = {
-                    "home": compute_basic_stats_from_matches(raw_matches, tid, side="home"),
-                    "away": compute_basic_stats_from_matches(raw_matches, tid, side="away"),
-                    "all":  compute_basic_stats_from_matches(raw_matches, tid, side="all"),
-                }
-
-        h_stats = team_stats_cache[home_id]
-        a_stats = team_stats_cache[away_id]
+        h_stats = team_stats_cache.get(home_id) or compute_split_stats_from_matches([], home_id)
+        a_stats = team_stats_cache.get(away_id) or compute_split_stats_from_matches([], away_id)
 
         model_probs = simple_model_probabilities(
             home_stats_h = h_stats["home"],
             home_stats_a = h_stats["all"],
             away_stats_a = a_stats["away"],
             away_stats_h = a_stats["all"],
+            lambdas      = ratings.lambdas(home_id, away_id, fx.league_id),
+            league_id    = fx.league_id,
+            season       = fx.season,
         )
 
-        odds    = fetch_odds_for_fixture(api_key, base_url, fixture["id"])
+        odds    = fetch_odds_for_fixture(api_key, base_url, fx.id)
         derived = derive_profile(h_stats["all"], a_stats["all"], model_probs)
 
         fixtures_out.append({
-            "fixture_id": fixture["id"],
-            "league":     league["name"],
-            "country":    league["country"],
-            "kickoff":    fixture["date"],
-            "home_team":  teams["home"]["name"],
-            "away_team":  teams["away"]["name"],
+            "fixture_id": fx.id,
+            "league_id":  fx.league_id,
+            "league":     fx.league_name,
+            "country":    fx.country,
+            "kickoff":    fx.date,
+            "home_team":  fx.home_name,
+            "away_team":  fx.away_name,
             "stats": {
                 "home_last15_home_goals_for":     h_stats["home"]["goals_for_per_match"],
                 "home_last15_home_goals_against": h_stats["home"]["goals_against_per_match"],
@@ -649,24 +716,22 @@ def main():
             "derived_profile": derived,
         })
 
+    # Publikált fájlok: olvasható JSON marad (serialization csak a gyors enkóder miatt)
     output = {"date": date_str, "fixtures": fixtures_out}
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(output, f, ensure_ascii=False, indent=2)
+    serialization.write(output_file, output, binary=False, pretty=True)
     print(f"✅ Mentés kész: {output_file} ({len(fixtures_out)} meccs)")
 
-    upload_to_supabase(output_file, date_str, bucket_key="foci-master")
-
     tips = generate_multi_market_tips_from_fixtures(fixtures_out)
     tips_payload = {
         "date":         date_str,
         "generated_at": datetime.now(timezone.utc).isoformat(),
-        "tips":         tips,
+        "tips":         [t.to_dict() for t in tips],
     }
     tips_file = f"tips_{date_str}.json"
-    with open(tips_file, "w", encoding="utf-8") as f:
-        json.dump(tips_payload, f, ensure_ascii=False, indent=2)
+    serialization.write(tips_file, tips_payload, binary=False, pretty=True)
 
-    upload_to_supabase(tips_file, date_str, bucket_key="foci-tips")
+    # Master és tips egyszerre, közös klienssel
+    upload_to_supabase([(output_file, "foci-master"), (tips_file, "foci-tips")], date_str)
     send_telegram_message_with_json(
         os.environ.get("TELEGRAM_BOT_TOKEN"),
         os.environ.get("TELEGRAM_CHAT_ID"),
@@ -0,0 +1,116 @@
+import math
+from array import array
+
+# =========================================================
+# IN-PLAY GÓLMODELL — előre számolt táblák
+# =========================================================
+# A pre-match lambdákat (teljes meccsre várható gól) a hátralévő idő és az
+# állás szerint skálázzuk, majd P(legalább k további gól) egy előre
+# kiszámolt (lambda, hátralévő perc, szükséges gól) rácsból jön lineáris
+# interpolációval — ciklusonként meccsenként csak néhány szorzás.
+#
+# Időprofil: a gólintenzitás a meccs során nő (w(t) = 1 + INTENSITY_SLOPE·t/90),
+# a hosszabbítást MATCH_MINUTES tartalmazza. W(rem) = a hátralévő rem perc
+# súlya a teljes meccshez képest, így a várható hátralévő gól = lambda · W(rem).
+#
+# Állás szerinti szorzók (a hátrányban lévő csapat többet támad):
+#   vezet → STATE_LEADING, döntetlen → 1.0, hátrányban → STATE_TRAILING
+
+MATCH_MINUTES     = 93
+INTENSITY_SLOPE   = 0.30
+STATE_LEADING     = 0.90
+STATE_TRAILING    = 1.15
+LAMBDA_MAX        = 6.0
+LAMBDA_STEP       = 0.02
+MAX_GOALS_NEEDED  = 3
+
+
+def _remaining_weights(match_minutes, slope):
+    """W[rem] rem = 0..match_minutes: a hátralévő idő relatív gólsúlya."""
+    w     = [1.0 + slope * (t + 0.5) / 90.0 for t in range(match_minutes)]
+    total = sum(w)
+    out, acc = [0.0], 0.0
+    for t in range(match_minutes - 1, -1, -1):
+        acc += w[t]
+        out.append(acc / total)
+    return out
+
+
+class InPlayModel:
+    def __init__(self, lambda_max=LAMBDA_MAX, lambda_step=LAMBDA_STEP,
+                 match_minutes=MATCH_MINUTES, max_goals=MAX_GOALS_NEEDED):
+        self.lambda_step   = lambda_step
+        self.n_lambda      = int(round(lambda_max / lambda_step)) + 1
+        self.match_minutes = match_minutes
+        self.max_goals     = max_goals
+        self.weights       = _remaining_weights(match_minutes, INTENSITY_SLOPE)
+        self._n_rem        = match_minutes + 1
+        self._table        = self._build()
+
+    def _build(self):
+        """Lapos tábla: [(k-1) * n_rem + rem] * n_lambda + li → P(N ≥ k)."""
+        tab = array("d")
+        for k in range(1, self.max_goals + 1):
+            for rem in range(self._n_rem):
+                wr = self.weights[rem]
+                for li in range(self.n_lambda):
+                    mu   = li * self.lambda_step * wr
+                    term = math.exp(-mu)
+                    cdf  = term
+                    for i in range(1, k):
+                        term *= mu / i
+                        cdf  += term
+                    tab.append(max(0.0, 1.0 - cdf))
+        return tab
+
+    def prob_at_least(self, lam, minutes_remaining, goals_needed):
+        """P(legalább goals_needed gól a hátralévő időben), lam = teljes meccsre várható gól."""
+        if goals_needed <= 0:
+            return 1.0
+        if goals_needed > self.max_goals:
+            raise ValueError(f"goals_needed > {self.max_goals}")
+        rem = min(max(minutes_remaining, 0.0), self.match_minutes)
+        x   = min(max(lam, 0.0) / self.lambda_step, self.n_lambda - 1)
+        li  = min(int(x), self.n_lambda - 2)
+        ri  = min(int(rem), self._n_rem - 2)
+        fx, fr = x - li, rem - ri
+        base = (goals_needed - 1) * self._n_rem
+        t, n = self._table, self.n_lambda
+        r0, r1 = (base + ri) * n, (base + ri + 1) * n
+        p0 = t[r0 + li] + (t[r0 + li + 1] - t[r0 + li]) * fx
+        p1 = t[r1 + li] + (t[r1 + li + 1] - t[r1 + li]) * fx
+        return p0 + (p1 - p0) * fr
+
+    def effective_lambda(self, lam_home, lam_away, home_goals, away_goals):
+        """Állás szerint skálázott teljes-meccs lambda (a két csapat összege)."""
+        if home_goals > away_goals:
+            fh, fa = STATE_LEADING, STATE_TRAILING
+        elif home_goals < away_goals:
+            fh, fa = STATE_TRAILING, STATE_LEADING
+        else:
+            fh = fa = 1.0
+        return lam_home * fh + lam_away * fa
+
+    def over_prob(self, lam_home, lam_away, minute, home_goals, away_goals, line=1.5):
+        """P(összgól > line) a meccs végére, az aktuális perc és állás mellett."""
+        needed = int(math.floor(line)) + 1 - (home_goals + away_goals)
+        lam    = self.effective_lambda(lam_home, lam_away, home_goals, away_goals)
+        return self.prob_at_least(lam, self.match_minutes - (minute or 0), needed)
+
+
+_model = None
+
+
+def get_model():
+    """Folyamatonként egyszer épül fel a tábla."""
+    global _model
+    if _model is None:
+        _model = InPlayModel()
+    return _model
+
+
+def tip_lambdas(tip):
+    """(hazai, vendég) lambda egy records.Tip-ből (régi fájlnál a Tip.from_dict felezi az összeget)."""
+    if tip is None or tip.lambda_home is None or tip.lambda_away is None:
+        return None, None
+    return tip.lambda_home, tip.lambda_away
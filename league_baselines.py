@@ -0,0 +1,100 @@
+import os
+from datetime import datetime
+
+import serialization
+
+# =========================================================
+# LIGA ALAPSZINTEK — gólátlag és hazai előny ligánként / szezononként
+# =========================================================
+# A helyben tárolt lezárt meccsekből (formatár + előzmény cache) egyetlen
+# bejárással számoljuk; naponta egyszer frissül, addig fájlból olvasunk.
+#
+#   avg_goals = meccsenkénti összgól átlag
+#   home_adv  = hazai gólátlag / csapatonkénti gólátlag (a régi HOME_ADVANTAGE megfelelője)
+#
+# Kevés meccsnél a globális alapértékek felé húzunk (BASELINE_PRIOR meccs
+# súllyal); a szezon-szint csak BASELINE_MIN_SEASON meccstől él, különben a
+# liga összesített értéke jön.
+#
+# league_baselines.json:
+#   {"date": "...", "leagues": {"<league_id>": {"all": {"n", "avg_goals", "home_adv"},
+#                                               "seasons": {"<season>": {...}}}}}
+
+LEAGUE_BASELINES_FILE = "league_baselines.json"
+BASELINE_PRIOR        = 30
+BASELINE_MIN_SEASON   = 20
+FINISHED              = ("FT", "AET", "PEN")
+
+
+def _baseline(n, goals, home_goals, default_avg, default_home):
+    avg = (goals + BASELINE_PRIOR * default_avg) / (n + BASELINE_PRIOR)
+    # hazai gól arány a meccs gólokból, a default hazai előnyből adódó prior-ral
+    prior_share = default_home / 2
+    share = (home_goals + BASELINE_PRIOR * default_avg * prior_share) / (goals + BASELINE_PRIOR * default_avg)
+    return {"n": n, "avg_goals": round(avg, 4), "home_adv": round(share * 2, 4)}
+
+
+class LeagueBaselines:
+    def __init__(self, default_avg, default_home, path=LEAGUE_BASELINES_FILE):
+        self.path         = path
+        self.default_avg  = default_avg
+        self.default_home = default_home
+        self.date         = None
+        self.leagues      = {}
+        if os.path.exists(path):
+            try:
+                data = serialization.read(path)
+                self.date, self.leagues = data.get("date"), data.get("leagues", {})
+            except (OSError, ValueError, AttributeError):
+                pass
+
+    def is_stale(self, today=None):
+        return self.date != (today or datetime.now()).strftime("%Y-%m-%d")
+
+    def refresh(self, matches, today=None):
+        """Újraszámolás a lezárt tömör meccsekből (fixture ID szerint deduplikálva)."""
+        acc  = {}   # (liga, szezon) -> [n, gól, hazai gól]
+        seen = set()
+        for m in matches:
+            fx  = m.get("fixture") or {}
+            g   = m.get("goals") or {}
+            lg  = m.get("league") or {}
+            if fx.get("id") in seen or lg.get("id") is None:
+                continue
+            if g.get("home") is None or g.get("away") is None:
+                continue
+            if (fx.get("status") or {}).get("short") not in (None,) + FINISHED:
+                continue
+            seen.add(fx.get("id"))
+            a = acc.setdefault((str(lg["id"]), str(lg.get("season"))), [0, 0, 0])
+            a[0] += 1; a[1] += g["home"] + g["away"]; a[2] += g["home"]
+        leagues = {}
+        for (lid, season), (n, goals, hg) in acc.items():
+            e = leagues.setdefault(lid, {"sum": [0, 0, 0], "seasons": {}})
+            e["seasons"][season] = _baseline(n, goals, hg, self.default_avg, self.default_home)
+            e["sum"] = [e["sum"][0] + n, e["sum"][1] + goals, e["sum"][2] + hg]
+        self.leagues = {
+            lid: {"all": _baseline(*e.pop("sum"), self.default_avg, self.default_home), **e}
+            for lid, e in leagues.items()
+        }
+        self.date = (today or datetime.now()).strftime("%Y-%m-%d")
+        return self
+
+    def refresh_if_stale(self, matches_fn, today=None):
+        """Napi frissítés: matches_fn() csak akkor fut, ha a cache nem mai."""
+        if self.is_stale(today):
+            self.refresh(matches_fn(), today)
+            self.save()
+        return self
+
+    def lookup(self, league_id, season=None):
+        """(avg_goals, home_adv) — szezon, liga, végül a globális alapértékek."""
+        e = self.leagues.get(str(league_id)) if league_id is not None else None
+        if e is None:
+            return self.default_avg, self.default_home
+        s = e["seasons"].get(str(season)) if season is not None else None
+        b = s if s and s["n"] >= BASELINE_MIN_SEASON else e["all"]
+        return b["avg_goals"], b["home_adv"]
+
+    def save(self):
+        return serialization.write(self.path, {"date": self.date, "leagues": self.leagues})
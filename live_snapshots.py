@@ -0,0 +1,106 @@
+import os
+import csv
+import glob
+import threading
+
+# =========================================================
+# ÉLŐ SNAPSHOT NAPLÓ (a küszöb-sweep visszajátszásához)
+# =========================================================
+# Ciklusonként azok a meccsek kerülnek ide, amelyekre a szabálymotor már
+# élő statisztikát kért — vagyis átmentek az ingyenes szakaszon (gól ≤ 1,
+# élő ablak, tipp, EV ≥ az élő EV padló) —, valamint a már riasztott,
+# ablakban lévő meccsek (fixture-önként percenként legfeljebb egy sor);
+# a napi riport a végeredményt külön fájlba írja. A sweep ezért csak az
+# élőnél nem lazább ablakot / EV küszöböt tud értelmesen visszajátszani.
+#
+#   live_snapshots/<YYYY-MM-DD><shard>.csv          → snapshotok
+#   live_snapshots/<YYYY-MM-DD>_outcomes.csv        → fixture_id,home,away
+#
+# Üres mező = nem volt lekérve (pl. odds csak az aktív meccsekre jön), a
+# sweep ezt "nincs adat"-ként kezeli.
+
+SNAPSHOT_DIR       = "live_snapshots"
+SNAPSHOT_KEEP_DAYS = 60
+SNAPSHOT_FIELDS    = ["fixture_id", "minute", "h", "a", "ev", "model_p", "fair_odds",
+                      "shots_on", "shots_tot", "dangerous", "live_odds", "chg_5m"]
+OUTCOME_FIELDS     = ["fixture_id", "home", "away"]
+
+
+class SnapshotRecorder:
+    def __init__(self, directory=SNAPSHOT_DIR, suffix=""):
+        self.directory = directory
+        self.suffix    = suffix
+        self._last     = {}   # fixture_id -> utoljára rögzített perc
+        self._lock     = threading.Lock()
+
+    def _path(self, date_str):
+        return os.path.join(self.directory, f"{date_str}{self.suffix}.csv")
+
+    def record(self, date_str, ctxs):
+        """ctxs: records.LiveSnapshot lista; csak a stat szakaszig jutottak kerülnek be."""
+        rows = []
+        with self._lock:
+            for c in ctxs:
+                if not c.has_stats or self._last.get(c.id) == c.minute:
+                    continue
+                self._last[c.id] = c.minute
+                rows.append({
+                    "fixture_id": c.id, "minute": c.minute, "h": c.h, "a": c.a,
+                    "ev": c.ev, "model_p": c.model_p, "fair_odds": c.fair_odds,
+                    "shots_on": c.shots_on_goal, "shots_tot": c.shots_total,
+                    "dangerous": c.dangerous_att, "live_odds": c.live_odds, "chg_5m": c.chg_5m,
+                })
+            if not rows:
+                return 0
+            os.makedirs(self.directory, exist_ok=True)
+            path   = self._path(date_str)
+            is_new = not os.path.exists(path)
+            with open(path, "a", encoding="utf-8", newline="") as f:
+                w = csv.DictWriter(f, fieldnames=SNAPSHOT_FIELDS)
+                if is_new:
+                    w.writeheader()
+                w.writerows(rows)
+        return len(rows)
+
+    def write_outcomes(self, date_str, outcomes):
+        """outcomes: {fixture_id: (hazai gól, vendég gól)}"""
+        if not outcomes:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{date_str}_outcomes.csv")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(OUTCOME_FIELDS)
+            for fid, (h, a) in sorted(outcomes.items()):
+                w.writerow([fid, h, a])
+        return path
+
+    def prune(self, cutoff_date):
+        self._last.clear()
+        for p in glob.glob(os.path.join(self.directory, "*.csv")):
+            if os.path.basename(p)[:10] < cutoff_date:
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+
+
+def snapshot_dates(directory=SNAPSHOT_DIR):
+    """Azok a napok, amelyekhez snapshot és végeredmény is van."""
+    return sorted(os.path.basename(p)[:10]
+                  for p in glob.glob(os.path.join(directory, "*_outcomes.csv")))
+
+
+def load_day(date_str, directory=SNAPSHOT_DIR):
+    """(snapshot sorok, {fixture_id: (h, a)}) egy napra, az összes shard fájlból."""
+    outcomes = {}
+    with open(os.path.join(directory, f"{date_str}_outcomes.csv"), "r", encoding="utf-8", newline="") as f:
+        for r in csv.DictReader(f):
+            outcomes[r["fixture_id"]] = (int(r["home"]), int(r["away"]))
+    rows = []
+    for p in sorted(glob.glob(os.path.join(directory, f"{date_str}*.csv"))):
+        if p.endswith("_outcomes.csv"):
+            continue
+        with open(p, "r", encoding="utf-8", newline="") as f:
+            rows.extend(csv.DictReader(f))
+    return rows, outcomes
@@ -1,15 +1,42 @@
-import subprocess, requests, time, os, json, math, logging
+import subprocess, requests, time, os, math, logging, zlib
+import multiprocessing, glob
 from datetime import datetime, timedelta
 import pytz
 import pandas as pd
 from flask import Flask
 from threading import Thread
 
+from telegram_queue import get_queue
+from odds_series import OddsSeriesStore
+from clv_tracker import ClvTracker, compute_clv
+from team_history_cache import TeamHistoryCache
+from team_form_store import TeamFormStore
+from fixture_stats_cache import FixtureStatsCache
+from log_counters import LogCounterHandler, read_day, merge_days
+from log_pipeline import QueueLogging, SampledDebugFilter, CompressingRotatingFileHandler
+from alert_dedup import AlertDedupStore
+from subscriptions import load_subscriptions
+from alert_rules import load_rule_engine, default_rules
+from inplay_model import get_model as get_inplay_model, tip_lambdas
+from calibration import CalibrationStore, CALIBRATION_FILE
+from live_snapshots import SnapshotRecorder, SNAPSHOT_DIR, SNAPSHOT_KEEP_DAYS
+from team_ratings import TeamRatings, collect_matches, TEAM_RATINGS_FILE
+from records import Fixture, LiveSnapshot, OddsQuote, Tip, BacktestEntry
+import serialization
+from master_cache import MasterCache, MASTER_CACHE_DIR, MASTER_CACHE_KEEP_DAYS
+from event_log import EventLog
+
 # ========= RENDER ÉBREN TARTÓ =========
 app = Flask('')
 @app.route('/')
 def home(): return "LiveMesterBot EXPERT v5.9: Dashboard"
 
+@app.route('/stats')
+def stats():
+    today = datetime.now(pytz.timezone(TIMEZONE)).strftime('%Y-%m-%d')
+    return {"date": today, "log": log_counter.get(today), "telegram": tg.metrics(),
+            "rules": {"total": dict(rule_engine.rejections), "last_cycle": dict(rule_engine.last_rejections)}}
+
 def run_web_server():
     port = int(os.environ.get("PORT", 10000))
     app.run(host='0.0.0.0', port=port)
@@ -27,13 +54,34 @@ BASE_URL          = "https://v3.football.api-sports.io"
 HEADERS           = {"x-apisports-key": API_KEY}
 TIMEZONE          = "Europe/Budapest"
 
-CACHE_FILE            = "foci_master_cache.json"
+# ========= SHARDOLT ÉLŐ MÓD =========
+# LIVE_SHARD_COUNT > 1 esetén a napi meccslista liga (vagy fixture) hash
+# szerint szétoszlik; minden worker csak a saját szeletét figyeli, saját
+# API kulccsal (FOOTBALL_API_KEYS, vesszővel elválasztva). Külön node-on a
+# LIVE_SHARD_INDEX adja a sorszámot, helyben a --shards N kapcsoló indít
+# N folyamatot. A riasztás-dedup közös SQLite tárban (ALERT_DEDUP_DB) van.
+LIVE_SHARD_COUNT  = int(os.environ.get("LIVE_SHARD_COUNT", 1))
+LIVE_SHARD_INDEX  = int(os.environ.get("LIVE_SHARD_INDEX", 0))
+LIVE_SHARD_BY     = os.environ.get("LIVE_SHARD_BY", "league")
+API_KEYS          = [k.strip() for k in (os.environ.get("FOOTBALL_API_KEYS") or API_KEY or "").split(",") if k.strip()]
+
+CACHE_FILE            = "foci_master_cache.json"   # régi egyfájlos cache — csak a migrációhoz
 MASTER_TIPS_PREFIX    = "tips_"
 LIVE_HISTORY_FILE     = "live_history.json"
 SENT_ALERTS_FILE      = "sent_alerts.json"
-TEAM_STATS_CACHE_FILE = "team_stats_cache.json"
-ODDS_DRIFT_FILE       = "odds_drift.json"
-LOG_FILE              = "bot.log"
+TEAM_FORM_FILE        = "team_form.json"
+FIXTURE_STATS_FILE    = "fixture_stats.jsonl"
+ALERT_DEDUP_DB        = os.environ.get("ALERT_DEDUP_DB", "sent_alerts.db")
+SHARD_SUFFIX          = f"_w{LIVE_SHARD_INDEX}" if LIVE_SHARD_COUNT > 1 else ""
+LOG_FILE              = f"bot{SHARD_SUFFIX}.log"
+LOG_COUNTER_FILE      = f"log_counters{SHARD_SUFFIX}.json"
+# Shardonként saját odds idősor és CLV fájl: minden folyamat csak a sajátjába
+# ír, napváltáskor a sajátját archiválja / ritkítja (roll_daily_series), a
+# riport a CLV fájlokat összefésüli (shard_paths). Külön node-on a shard
+# fájloknak a log_counters_w<i>.json-hoz hasonlóan el kell jutniuk a 0. shardhoz.
+ODDS_SERIES_FILE      = f"odds_series{SHARD_SUFFIX}.csv"
+ODDS_HISTORY_DIR      = "odds_history"
+CLV_FILE              = f"clv_snapshots{SHARD_SUFFIX}.csv"
 BACKTEST_FILE         = "backtest.json"
 
 # ========= LIVE LÖVÉS-SZŰRÉS KÜSZÖBÖK =========
@@ -51,6 +99,8 @@ LIVE_MIN_EV = 0.02
 DRIFT_DROP_THRESHOLD = 0.05
 DRIFT_RISE_THRESHOLD = 0.05
 
+LIVE_IDS_BATCH = 20   # fixtures?ids= felső korlát hívásonként
+
 # ========= RETRY KONFIGURÁCIÓ =========
 RETRY_MAX     = 3
 RETRY_BACKOFF = 4
@@ -59,21 +109,44 @@ RETRY_TIMEOUT = 10
 
 # ========= LOGGER =========
 
+log_counter  = LogCounterHandler(LOG_COUNTER_FILE, tz=pytz.timezone(TIMEZONE))
+log_file     = None
+log_pipeline = None
+
 def setup_logger():
+    """
+    A hívó szálon a számlálók (mintavétel előtt, minden rekordra) és a
+    QueueHandler fut (DEBUG mintavételezéssel); a fájlba írás, a rotálás és a
+    tömörítés a háttér listener szálon.
+    """
+    global log_file, log_pipeline
     logger = logging.getLogger("livemester")
     logger.setLevel(logging.DEBUG)
     if logger.handlers:
         return logger
     fmt = logging.Formatter(fmt="%(asctime)s | %(levelname)-7s | %(message)s",
                              datefmt="%Y-%m-%d %H:%M:%S")
-    fh = logging.FileHandler(LOG_FILE, encoding="utf-8", mode="a")
-    fh.setLevel(logging.DEBUG); fh.setFormatter(fmt)
+    log_file = CompressingRotatingFileHandler(LOG_FILE, tz=pytz.timezone(TIMEZONE))
+    log_file.setLevel(logging.DEBUG); log_file.setFormatter(fmt)
     ch = logging.StreamHandler()
     ch.setLevel(logging.INFO); ch.setFormatter(fmt)
-    logger.addHandler(fh); logger.addHandler(ch)
+    log_pipeline = QueueLogging(logger, [log_file, ch], SampledDebugFilter(), direct=[log_counter])
     return logger
 
 log = setup_logger()
+tg  = get_queue(TELEGRAM_TOKEN, CHAT_ID)
+odds_series = OddsSeriesStore(ODDS_SERIES_FILE)
+clv         = ClvTracker(CLV_FILE)
+fixture_stats = FixtureStatsCache(FIXTURE_STATS_FILE)
+alert_dedup   = AlertDedupStore(ALERT_DEDUP_DB)
+calib         = CalibrationStore(CALIBRATION_FILE)
+snapshots     = SnapshotRecorder(SNAPSHOT_DIR, SHARD_SUFFIX)
+master_cache  = MasterCache(MASTER_CACHE_DIR)
+event_log     = EventLog()   # data/<dátum>/events.csv — a daily_summary ebből értékel
+subscribers   = load_subscriptions(CHAT_ID, LIVE_MIN_EV, LIVE_WINDOWS)
+# A riasztási lánc deklaratív szabályokból (alert_rules.json felülírja az alapokat)
+rule_engine   = load_rule_engine(default_rules(subscribers.windows, subscribers.min_ev_floor,
+                                               SHOTS_ON_GOAL_MIN, SHOTS_TOTAL_MIN, DANGEROUS_ATT_MIN))
 
 
 # =========================================================
@@ -134,7 +207,6 @@ def calc_fair_odds(model_p):
 def init_state_files():
     fixes = [
         (SENT_ALERTS_FILE,  {},  dict),
-        (ODDS_DRIFT_FILE,   {},  dict),
         (LIVE_HISTORY_FILE, [],  list),
         (BACKTEST_FILE,     {"entries": []}, dict),
     ]
@@ -145,18 +217,27 @@ def init_state_files():
             needs_fix = True; reason = "hiányzik"
         else:
             try:
-                with open(fname, 'r') as f: data = json.load(f)
+                data = serialization.read(fname)
                 if not isinstance(data, expected_type):
                     needs_fix = True
                     reason = f"hibás típus ({type(data).__name__} helyett {expected_type.__name__} kell)"
             except Exception as e:
                 needs_fix = True; reason = f"parse hiba: {e}"
         if needs_fix:
-            with open(fname, 'w') as f: json.dump(default, f)
+            serialization.write(fname, default)
             log.warning(f"[init] {fname} → {reason}, alapértékre állítva")
             fixed_files.append(fname)
         else:
             log.debug(f"[init] {fname} OK")
+    # A szinkronizált sent_alerts.json visszatöltése a dedup tárba (pl. új Render példány)
+    alert_dedup.import_dict(load_json(SENT_ALERTS_FILE, {}, dict))
+    # Egyszeri átállás a napi partíciós master cache-re
+    migrated = master_cache.migrate(CACHE_FILE)
+    if migrated:
+        os.remove(CACHE_FILE)
+        log.info(f"[init] {CACHE_FILE} → {MASTER_CACHE_DIR}/ ({len(master_cache.dates())} nap)")
+        sync_to_github(migrated, f"[init] master cache partitioned ({len(master_cache.dates())} dates)",
+                       delete_files=[CACHE_FILE])
     if fixed_files:
         log.info(f"[init] Javított fájlok GitHub-ra szinkronizálva: {fixed_files}")
         sync_to_github(fixed_files, f"[init] state files migrated: {', '.join(fixed_files)}")
@@ -164,27 +245,22 @@ def init_state_files():
 
 # ========= SEGÉDFÜGGVÉNYEK =========
 
-def send_telegram(message, file_path=None):
+def send_telegram(message, file_path=None, chat_id=None):
+    """Nem blokkol: a közös Telegram sorba teszi az üzenetet (háttérszál küldi)."""
     try:
-        if file_path:
-            url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendDocument"
-            with open(file_path, 'rb') as f:
-                requests.post(url, data={"chat_id": CHAT_ID, "caption": message, "parse_mode": "HTML"},
-                              files={"document": f}, timeout=45)
-        else:
-            url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-            requests.post(url, data={"chat_id": CHAT_ID, "text": message, "parse_mode": "HTML"}, timeout=20)
+        tg.send(message, chat_id=chat_id, file_path=file_path)
     except Exception as e:
         log.error(f"[send_telegram] Hiba: {e}")
 
 def load_json(file, default, expected_type=None):
+    """Állapot/cache fájl betöltése — JSON vagy bináris cache formátum (serialization)."""
     if os.path.exists(file):
         try:
-            with open(file, 'r') as f: data = json.load(f)
+            data = serialization.read(file)
             if expected_type is not None and not isinstance(data, expected_type):
                 log.error(f"[load_json] {file} hibás típus: várt={expected_type.__name__}, "
                           f"kapott={type(data).__name__} → felülírva default értékkel")
-                with open(file, 'w') as fw: json.dump(default, fw)
+                serialization.write(file, default)
                 return default
             return data
         except Exception as e:
@@ -192,8 +268,9 @@ def load_json(file, default, expected_type=None):
             return default
     return default
 
-def save_json(file, data):
-    with open(file, 'w') as f: json.dump(data, f)
+def save_json(file, data, published=False):
+    """Belső állapot: CACHE_FORMAT szerint; published=True → mindig olvasható JSON."""
+    serialization.write(file, data, binary=False if published else None, pretty=published)
 
 def sync_to_github(file_list, commit_message, delete_files=None):
     if not GITHUB_TOKEN: return
@@ -231,76 +308,131 @@ def clean_int(val):
 # ========= SENT ALERTS =========
 
 def load_sent_alerts(date_str):
-    data = load_json(SENT_ALERTS_FILE, {}, dict)
-    return data.get(date_str, [])
+    return alert_dedup.keys(date_str)
 
 def save_sent_alert(date_str, fixture_id):
     """
-    Módosítva: Helyi mentés azonnal, de nincs GitHub push minden tippnél.
-    Ez megakadályozza a Render felesleges újraindulását.
+    Atomikus foglalás a közös dedup tárban — True, ha ez a worker küldheti
+    a riasztást. A sent_alerts.json csak export (GitHub szinkronhoz), nincs
+    GitHub push minden tippnél (Render auto-deploy loop elkerülése).
     """
-    data = load_json(SENT_ALERTS_FILE, {}, dict)
-    day_list = data.get(date_str, [])
     fid_str = str(fixture_id)
-    
-    if fid_str not in day_list:
-        day_list.append(fid_str)
-        data[date_str] = day_list
-        save_json(SENT_ALERTS_FILE, data)
-        # sync_to_github kiveve innen, hogy ne legyen Auto-Deploy loop
-        log.info(f"✅ Alert mentve helyileg: {date_str}/{fid_str}")
+    if not alert_dedup.claim(date_str, fid_str, LIVE_SHARD_INDEX):
+        log.info(f"[dedup] {date_str}/{fid_str} már foglalt (másik shard), kihagyva")
+        return False
+    with alert_dedup.lock():
+        save_json(SENT_ALERTS_FILE, alert_dedup.export())
+    log.info(f"✅ Alert mentve helyileg: {date_str}/{fid_str}")
+    return True
 
 def cleanup_sent_alerts(today_str):
     """
     A napi takarítás során elmentjük a végleges állapotot a GitHubra is.
     """
-    data = load_json(SENT_ALERTS_FILE, {}, dict)
     tz = pytz.timezone(TIMEZONE)
     cutoff = (datetime.now(tz) - timedelta(days=2)).strftime('%Y-%m-%d')
-    
-    cleaned = {k: v for k, v in data.items() if k >= cutoff}
-    if cleaned != data: 
-        save_json(SENT_ALERTS_FILE, cleaned)
+    if alert_dedup.prune(cutoff):
+        with alert_dedup.lock():
+            save_json(SENT_ALERTS_FILE, alert_dedup.export())
         # Csak naponta egyszer szinkronizálunk a repóba
         sync_to_github([SENT_ALERTS_FILE], f"daily_cleanup_sent_alerts: {today_str}")
         log.info("🧹 Régi riasztások takarítása és GitHub szinkronizáció kész.")
 
+# ========= SHARDING =========
+
+def shard_of(entry, shard_count):
+    """Stabil shard index egy napi cache bejegyzéshez (liga vagy fixture szerint)."""
+    if shard_count <= 1:
+        return 0
+    if LIVE_SHARD_BY == "league":
+        key = entry.get("LIGA_ID") if entry.get("LIGA_ID") is not None else entry.get("BAJNOKSÁG")
+    else:
+        key = entry.get("ID")
+    return zlib.crc32(str(key if key is not None else entry.get("ID")).encode("utf-8")) % shard_count
+
+def shard_paths(name_fmt):
+    """Egy shardolt állapotfájl összes shard példánya, pl. shard_paths("clv_snapshots{}.csv")."""
+    if LIVE_SHARD_COUNT <= 1:
+        return [name_fmt.format("")]
+    return [name_fmt.format(f"_w{i}") for i in range(LIVE_SHARD_COUNT)]
+
+def roll_daily_series(today_str):
+    """
+    Napváltáskor (és induláskor) a saját odds idősor a legutóbbi írás napjára
+    archiválódik, a CLV fájl régi sorai törlődnek. Mivel minden shard csak a
+    saját fájlját kezeli, nincs folyamatok közötti olvasás-csere verseny.
+    """
+    tz = pytz.timezone(TIMEZONE)
+    if os.path.exists(ODDS_SERIES_FILE):
+        day = datetime.fromtimestamp(os.path.getmtime(ODDS_SERIES_FILE), tz).strftime('%Y-%m-%d')
+        if day < today_str:
+            odds_series.rotate(os.path.join(ODDS_HISTORY_DIR, f"{day}{SHARD_SUFFIX}.csv"))
+            log.info(f"[odds] Idősor archiválva: {day}{SHARD_SUFFIX}")
+    clv.prune(today_str)
+
+def use_shard_api_key(shard_index):
+    if API_KEYS:
+        HEADERS["x-apisports-key"] = API_KEYS[shard_index % len(API_KEYS)]
+
+def run_shard_worker(shard_index, shard_count):
+    use_shard_api_key(shard_index)
+    main_loop(shard_index, shard_count)
+
+def run_local_shards(shard_count):
+    """shard_count élő worker folyamat indítása (spawn: mindegyik saját loggal)."""
+    ctx = multiprocessing.get_context("spawn")
+    procs = []
+    for i in range(shard_count):
+        os.environ["LIVE_SHARD_INDEX"] = str(i)
+        os.environ["LIVE_SHARD_COUNT"] = str(shard_count)
+        p = ctx.Process(target=run_shard_worker, args=(i, shard_count), name=f"live-shard-{i}", daemon=True)
+        p.start(); procs.append(p)
+        log.info(f"[shard] Worker {i}/{shard_count} elindult (pid={p.pid})")
+    for p in procs:
+        p.join()
+
 # ========= LOG ÖSSZEFOGLALÓ =========
 
 def send_daily_log_summary():
     tz = pytz.timezone(TIMEZONE)
     yest = (datetime.now(tz) - timedelta(days=1)).strftime('%Y-%m-%d')
-    if not os.path.exists(LOG_FILE): return
-    error_count = warning_count = alert_count = drift_count = 0
-    try:
-        with open(LOG_FILE, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        for line in lines:
-            if '| ERROR   |' in line: error_count   += 1
-            if '| WARNING |' in line: warning_count += 1
-            if '[ALERT]'  in line:    alert_count   += 1
-            if '[DRIFT]'  in line:    drift_count   += 1
-    except Exception as e:
-        log.error(f"[log_summary] Olvasási hiba: {e}"); return
+    # A rotálást (éjfél / méret) és a 7 napos megőrzést a log handler végzi;
+    # itt csak kiürítjük a sort és lezárjuk a napot, ha még nem történt meg.
+    log_pipeline.drain()
+    log_file.force_rollover_if_due()
+    archives, _ = log_file.archive_paths(yest)
+    # A számlálókat a logger menet közben vezeti — nem kell a bot.log-ot beolvasni
+    log_counter.flush()
+    day = log_counter.get(yest)
+    if LIVE_SHARD_COUNT > 1:
+        others = [read_day(f"log_counters_w{i}.json", yest)
+                  for i in range(LIVE_SHARD_COUNT) if i != LIVE_SHARD_INDEX]
+        day = merge_days([day] + others)
+    error_count   = day["levels"].get("ERROR", 0)
+    warning_count = day["levels"].get("WARNING", 0)
+    alert_count   = day["tags"].get("ALERT", 0)
+    drift_count   = day["tags"].get("DRIFT", 0)
+    top_stages = sorted(
+        ((st, c.get("ERROR", 0) + c.get("WARNING", 0)) for st, c in day["stages"].items()),
+        key=lambda x: -x[1])
+    stage_str = ", ".join(f"{st}: {n}" for st, n in top_stages[:3] if n) or "—"
+    tm = tg.metrics()
+    lat_str = f"{tm['lat_avg']}s átlag / {tm['lat_p95']}s p95" if tm["lat_avg"] is not None else "—"
     summary = (
         f"📝 <b>Bot.log — {yest}</b>\n"
         f"━━━━━━━━━━━━━━━━━━━━\n"
         f"🚨 Hibák: <b>{error_count}</b>\n"
         f"⚠️ Figyelmeztetések: {warning_count}\n"
         f"📲 Előriadók: <b>{alert_count}</b>\n"
-        f"📉 Drift jelzések: {drift_count}"
+        f"📉 Drift jelzések: {drift_count}\n"
+        f"🧩 Hiba/figy. szakaszonként: {stage_str}\n"
+        f"📨 Telegram: {tm['sent']} küldve, {tm['failed']} hiba, {tm['coalesced']} összevonva | {lat_str}"
     )
-    send_telegram(summary, LOG_FILE) if lines else send_telegram(summary)
-    archive_name = f"bot_{yest}.log"
-    try: os.rename(LOG_FILE, archive_name)
-    except Exception as e: log.error(f"[log_summary] Archiválás hiba: {e}")
-    cutoff_dt = datetime.now() - timedelta(days=7)
-    for f in os.listdir('.'):
-        if f.startswith("bot_") and f.endswith(".log"):
-            try:
-                if datetime.strptime(f[4:14], '%Y-%m-%d') < cutoff_dt:
-                    os.remove(f)
-            except: pass
+    if not archives:
+        send_telegram(summary); return
+    send_telegram(summary, archives[0])
+    for i, part in enumerate(archives[1:], start=2):
+        send_telegram(f"📝 Bot.log — {yest} ({i}/{len(archives)})", part)
 
 # ========= VISSZAMÉRÉS DASHBOARD =========
 
@@ -324,19 +456,23 @@ def update_backtest(live_history_entries, date_str):
         try:
             r = resp.json().get("response", [])
             if r:
-                gh = r[0]["goals"]["home"] or 0
-                ga = r[0]["goals"]["away"] or 0
-                won = (gh + ga) > 1.5
+                won = Fixture.from_api(r[0]).total_goals > 1.5
         except Exception as e:
             log.warning(f"[backtest] JSON parse hiba ({fid}): {e}"); continue
         fair_odds = calc_fair_odds(model_p)
         value_bet = (lo is not None and fair_odds is not None and lo >= fair_odds)
-        entry = {"date": date_str, "id": fid, "minute": minute, "ev": round(ev, 4),
-                 "live_odds": lo, "fair_odds": fair_odds, "value_bet": value_bet, "won": won}
-        new_entries.append(entry)
+        new_entries.append(BacktestEntry(date_str, fid, minute, round(ev, 4), model_p, lt.get("raw_p"),
+                                         lo, fair_odds, value_bet, won))
         log.info(f"[backtest] {fid} | ev={ev*100:.1f}% | value={value_bet} | won={won}")
+    new_entries = [e.to_dict() for e in compute_clv(new_entries, clv.load_index(shard_paths("clv_snapshots{}.csv")))]
     bt["entries"].extend(new_entries)
     save_json(BACKTEST_FILE, bt)
+    # Kalibráció: csak az új kimenetek kerülnek a bin-számlálókba
+    added = calib.update(new_entries)
+    if added:
+        calib.save()
+        log.info(f"[calibration] +{added} kimenet | " + ", ".join(
+            f"{m}: n={c.samples}" for m, c in sorted(calib.markets.items())))
     return new_entries
 
 def build_dashboard_message(new_entries):
@@ -376,6 +512,15 @@ def build_dashboard_message(new_entries):
         if bd and bd["total"] > 0:
             pct = bd["won"] / bd["total"] * 100
             ev_lines += f"  EV {bname}: {bd['won']}/{bd['total']} ({pct:.0f}%)\n"
+    clv_e = [e["clv"] for e in all_e if e.get("clv") is not None]
+    if clv_e:
+        beat    = sum(1 for c in clv_e if c > 0)
+        v_clv   = [e["clv"] for e in value_e if e.get("clv") is not None]
+        v_str   = f" | VALUE átlag: {sum(v_clv)/len(v_clv)*100:+.1f}%" if v_clv else ""
+        clv_line = (f"📐 CLV átlag: <b>{sum(clv_e)/len(clv_e)*100:+.1f}%</b> | "
+                    f"piacot verte: {beat}/{len(clv_e)} ({beat/len(clv_e)*100:.0f}%){v_str}\n\n")
+    else:
+        clv_line = ""
     today_won  = sum(1 for e in new_entries if e.get("won"))
     today_tot  = len(new_entries)
     today_line = f"Ma: {today_won}/{today_tot}" if today_tot else "Ma: nincs tipp"
@@ -388,6 +533,7 @@ def build_dashboard_message(new_entries):
         f"⚠️ Nem-VALUE:      {nv_wins}/{len(no_value_e)} ({nv_hit:.1f}%)\n\n"
         f"⏱ Ablak 33–43\u2019:  {sum(1 for e in w1_e if e.get('won'))}/{len(w1_e)} ({w1_hit:.1f}%)\n"
         f"⏱ Ablak 50–65\u2019:  {sum(1 for e in w2_e if e.get('won'))}/{len(w2_e)} ({w2_hit:.1f}%)\n\n"
+        f"{clv_line}"
         f"🔬 EV kalibáció:\n{ev_lines}"
     )
     return msg.strip()
@@ -421,32 +567,43 @@ def load_master_tips_for_today(date_str):
     if not isinstance(data, dict):
         log.error(f"[load_master_tips] {fname} hibás típus: {type(data).__name__} → üres dict")
         return {}
-    return {int(t["fixture_id"]): t for t in data.get("tips", []) if t.get("fixture_id") is not None}
+    out = {}
+    for t in (Tip.from_dict(t) for t in data.get("tips", []) if t.get("fixture_id") is not None):
+        # Az élő riasztás Over 1.5 — ha a builder több piacot ad egy meccsre, az over15 tipp nyer
+        if t.fixture_id not in out or t.market == "over15":
+            out[t.fixture_id] = t
+    return out
 
 def get_ev_for_fixture(master_tips, fixture_id):
     tip = master_tips.get(int(fixture_id))
-    return (tip.get("ev"), tip.get("model_p")) if tip else (None, None)
+    return (tip.ev, tip.model_p) if tip else (None, None)
 
 def get_prematch_odds_for_fixture(master_tips, fixture_id):
     tip = master_tips.get(int(fixture_id))
-    return (tip.get("odds") or {}).get("over15") if tip else None
+    return tip.odds if tip else None
 
 # =========================================================
 # LIVE API HÍVÁSOK
 # =========================================================
 
-def fetch_live_fixtures():
-    resp = api_get_with_retry(f"{BASE_URL}/fixtures", params={"live": "all"})
+def fetch_live_fixtures(league_ids=None):
+    """
+    Élő meccsek. league_ids megadásakor csak ezekből a ligákból (live=39-61-...),
+    így nem töltjük le és parse-oljuk a világ összes élő meccsét.
+    """
+    live = "-".join(str(l) for l in sorted(league_ids)) if league_ids else "all"
+    resp = api_get_with_retry(f"{BASE_URL}/fixtures", params={"live": live})
     if resp is None:
         log.error("[fetch_live] Minden próbálkozás sikertelen.")
         return []
     try:
-        return resp.json().get("response", [])
+        return [Fixture.from_api(fx) for fx in resp.json().get("response", [])]
     except Exception as e:
         log.error(f"[fetch_live] JSON parse hiba: {e}")
         return []
 
 def fetch_live_odds(mid):
+    """Élő Over 1.5 ár OddsQuote-ként (Bet365 előnyben), vagy None."""
     params = {"fixture": mid, "bet": 11} # Over/Under
     for _ in range(2):
         try:
@@ -458,51 +615,75 @@ def fetch_live_odds(mid):
                     if bm['id'] == 8:
                         for bet in bm.get('bets', []):
                             for val in bet.get('values', []):
-                                if val['value'] == 'Over 1.5': return float(val['odd'])
+                                if val['value'] == 'Over 1.5': return OddsQuote(mid, "over15", float(val['odd']), 8)
                 
                 # Ha nincs Bet365, jó bármelyik másik iroda (pl. 1xBet, Marathonbet stb.)
                 for bm in res[0].get('bookmakers', []):
                     for bet in bm.get('bets', []):
                         for val in bet.get('values', []):
-                            if val['value'] == 'Over 1.5': return float(val['odd'])
+                            if val['value'] == 'Over 1.5': return OddsQuote(mid, "over15", float(val['odd']), bm['id'])
             time.sleep(1)
         except: continue
     return None
 
+def shot_stats_from_blocks(blocks):
+    """Csapatonkénti statisztika blokkok ([{team, statistics: [...]}]) → meccs összesítő."""
+    stats = {"shots_on_goal": 0, "shots_total": 0, "dangerous_att": 0}
+    for team_data in blocks or []:
+        for s in team_data.get('statistics', []):
+            t = s.get('type')
+            v = clean_int(s.get('value')) # Itt használjuk a javított függvényt
+            if t == 'Shots on Goal': stats["shots_on_goal"] += v
+            if t in ['Shots on Goal', 'Shots off Goal']: stats["shots_total"] += v
+            if t == 'Dangerous Attacks': stats["dangerous_att"] += v
+    return stats
+
 def get_live_shot_stats(mid):
     try:
         r = requests.get(f"{BASE_URL}/fixtures/statistics?fixture={mid}", headers=HEADERS, timeout=12)
-        res = r.json().get("response", [])
-        stats = {"shots_on_goal": 0, "shots_total": 0, "dangerous_att": 0}
-        if not res: return stats
-        for team_data in res:
-            for s in team_data.get('statistics', []):
-                t = s.get('type')
-                v = clean_int(s.get('value')) # Itt használjuk a javított függvényt
-                if t == 'Shots on Goal': stats["shots_on_goal"] += v
-                if t in ['Shots on Goal', 'Shots off Goal']: stats["shots_total"] += v
-                if t == 'Dangerous Attacks': stats["dangerous_att"] += v
-        return stats
+        return shot_stats_from_blocks(r.json().get("response", []))
     except Exception as e:
         log.warning(f"[shot_stats] Hiba ({mid}): {e}")
         return {"shots_on_goal": 0, "shots_total": 0, "dangerous_att": 0}
 
-def fetch_fixture_corners(fixture_id):
-    """Lezárt meccs szögletszámát kéri le az /fixtures/statistics endpointról."""
+def fetch_fixture_details(fixture_ids):
+    """
+    fixtures?ids=a-b-c kötegekben (LIVE_IDS_BATCH/hívás); a válasz meccsenként
+    a beágyazott statisztikát és eseményeket is tartalmazza.
+    Visszatér: {fixture_id: fixture} — a sikertelen köteg meccsei hiányoznak.
+    """
+    ids, out = list(dict.fromkeys(fixture_ids)), {}
+    for i in range(0, len(ids), LIVE_IDS_BATCH):
+        chunk = ids[i:i + LIVE_IDS_BATCH]
+        resp  = api_get_with_retry(f"{BASE_URL}/fixtures", params={"ids": "-".join(str(x) for x in chunk)},
+                                   max_retries=2)
+        if resp is None:
+            log.warning(f"[details] ids köteg sikertelen ({len(chunk)} meccs)"); continue
+        try:
+            for fx in resp.json().get("response", []):
+                out[fx["fixture"]["id"]] = fx
+        except Exception as e:
+            log.warning(f"[details] Parse hiba: {e}")
+    return out
+
+def fetch_fixture_statistics_raw(fixture_id):
+    """Szűretlen /fixtures/statistics (mindkét csapat) — a fixture_stats cache tölti."""
     resp = api_get_with_retry(f"{BASE_URL}/fixtures/statistics", params={"fixture": fixture_id}, max_retries=2)
     if resp is None:
-        log.warning(f"[corners] Stat nem elérhető ({fixture_id})")
-        return 0
+        log.warning(f"[stats] Stat nem elérhető ({fixture_id})")
+        return None
     try:
-        total = 0
-        for team_stat in resp.json().get("response", []):
-            for stat in team_stat.get("statistics", []):
-                if stat.get("type") == "Corner Kicks":
-                    total += int(stat.get("value") or 0)
-        return total
+        return resp.json().get("response", [])
     except Exception as e:
-        log.warning(f"[corners] Parse hiba ({fixture_id}): {e}")
-        return 0
+        log.warning(f"[stats] Parse hiba ({fixture_id}): {e}")
+        return None
+
+def fetch_fixture_corner_split(fixture_id, final=True):
+    """
+    Meccs szögletei csapatonként: {team_id: szöglet} (hiba esetén üres dict).
+    Csak final=True (lezárt meccs) esetén kerül a végleges cache-be.
+    """
+    return fixture_stats.corners(fixture_id, fetch_fixture_statistics_raw, final=final)
 
 def build_odds_line(live_odds, prematch_odds, model_p, drift_info=None):
     fair_odds = calc_fair_odds(model_p)
@@ -519,81 +700,128 @@ def build_odds_line(live_odds, prematch_odds, model_p, drift_info=None):
             lines.append(f"📉 <b>Odds esett:</b> {drift_info['prev']} → {live_odds} (-{drift_info['pct']:.1f}%) — smart money!")
         else:
             lines.append(f"📈 Odds nőtt: {drift_info['prev']} → {live_odds} (+{drift_info['pct']:.1f}%) — gyengülő piac")
+        lines.append(format_drift_windows(drift_info))
     return "\n".join(lines)
 
 # ========= ODDS DRIFT =========
 
 def check_odds_drift(fixture_id, current_odds, now_str):
+    """
+    Az új pontot hozzáfűzi az idősorhoz, és az 5 perces ablak referenciájához
+    mér. Csak akkor jelez, ha az utolsó poll ténylegesen mozdított az oddson,
+    így ugyanaz a mozgás nem riaszt minden ciklusban újra.
+    """
     if current_odds is None: return None
-    dc = load_json(ODDS_DRIFT_FILE, {}, dict)
-    key = str(fixture_id)
-    prev = dc.get(key)
-    dc[key] = {"last_odds": current_odds, "ts": now_str}
-    save_json(ODDS_DRIFT_FILE, dc)
-    if not prev: return None
-    po = prev.get("last_odds")
-    if not po or po <= 0: return None
-    chg = (po - current_odds) / po
-    if chg >= DRIFT_DROP_THRESHOLD:  return {"prev": po, "pct": chg * 100, "direction": "drop"}
-    if chg <= -DRIFT_RISE_THRESHOLD: return {"prev": po, "pct": abs(chg) * 100, "direction": "rise"}
+    odds_series.append(fixture_id, current_odds)
+    m = odds_series.metrics(fixture_id)
+    if not m or m["prev"] is None or m["prev"] == current_odds: return None
+    ref = m["ref_5m"]
+    if not ref or ref <= 0: return None
+    chg = (ref - current_odds) / ref
+    info = {"prev": ref, "pct": abs(chg) * 100, "chg_5m": m["chg_5m"], "chg_15m": m["chg_15m"],
+            "velocity": m["velocity"], "min": m["min"], "max": m["max"]}
+    if chg >= DRIFT_DROP_THRESHOLD:  return {**info, "direction": "drop"}
+    if chg <= -DRIFT_RISE_THRESHOLD: return {**info, "direction": "rise"}
     return None
 
+def format_drift_windows(di):
+    def pct(v): return f"{v*100:+.1f}%" if v is not None else "—"
+    vel = f" | {di['velocity']:+.2f}%/perc" if di.get("velocity") is not None else ""
+    return f"⏱ 5p: {pct(di.get('chg_5m'))} | 15p: {pct(di.get('chg_15m'))}{vel} | sáv: {di['min']}–{di['max']}"
+
 # ========= CSAPAT ADATOK =========
 
-def get_team_detailed_data(team_id):
-    cache = load_json(TEAM_STATS_CACHE_FILE, {}, dict)
-    if str(team_id) in cache:
-        return cache[str(team_id)]
-    resp = api_get_with_retry(f"{BASE_URL}/fixtures", params={"team": team_id, "last": 10})
+def fetch_team_history(team_id, last_n=10):
+    resp = api_get_with_retry(f"{BASE_URL}/fixtures", params={"team": team_id, "last": last_n})
     if resp is None:
         log.warning(f"[team_data] Meccs adat nem elérhető ({team_id}).")
         return None
     try:
-        matches = resp.json().get("response", [])
+        return resp.json().get("response", [])
     except Exception as e:
         log.warning(f"[team_data] JSON parse hiba ({team_id}): {e}")
         return None
+
+def get_team_detailed_data(team_id, history=None, form=None):
+    """
+    Csapat forma-összegzés. Ismert csapatnál a gördülő formatárból jön
+    (nincs API hívás); új csapatnál letöltjük az előzményt és betöltjük a tárba.
+    """
+    form = form if form is not None else TeamFormStore(TEAM_FORM_FILE)
+    if form.knows(team_id):
+        # a seed / napi ingest óta szöglet nélkül bekerült meccsek pótlása (egyszer, cache-elve)
+        form.fill_corners(team_id, fixture_stats, fetch_fixture_statistics_raw)
+        return form.summary(team_id)
+    matches = history.get(team_id, 10) if history is not None else None
+    if matches is None:
+        matches = fetch_team_history(team_id, 10)
+        if matches and history is not None:
+            history.put(team_id, matches, 10)
     if not matches: return None
-    s = c = btts_count = 0
-    corn_list = []
-    for i, m in enumerate(matches):
-        is_h = m['teams']['home']['id'] == team_id
-        scored   = (m['goals']['home'] if is_h else m['goals']['away']) or 0
-        conceded = (m['goals']['away'] if is_h else m['goals']['home']) or 0
-        s += scored; c += conceded
-        if i < 5 and scored > 0 and conceded > 0: btts_count += 1
-        if i < 5:
-            st_resp = api_get_with_retry(
-                f"{BASE_URL}/fixtures/statistics",
-                params={"fixture": m['fixture']['id'], "team": team_id},
-                max_retries=2,
-            )
-            if st_resp is not None:
-                try:
-                    st = st_resp.json().get("response", [])
-                    if st:
-                        for stat in st[0].get('statistics', []):
-                            if stat['type'] == 'Corner Kicks':
-                                corn_list.append(stat['value'] or 0)
-                except Exception as e:
-                    log.debug(f"[team_data] Corner parse hiba ({team_id}): {e}")
-    res = {
-        "avg_scored":   s / 10,
-        "avg_conceded": c / 10,
-        "btts_trend":   btts_count,
-        "corner_avg":   sum(corn_list) / len(corn_list) if len(corn_list) >= 3 else None,
-    }
-    cache[str(team_id)] = res
-    save_json(TEAM_STATS_CACHE_FILE, cache)
-    return res
-
-def is_active_game(s):
-    return (s["shots_on_goal"] >= SHOTS_ON_GOAL_MIN or
-            s["shots_total"]   >= SHOTS_TOTAL_MIN or
-            (s["dangerous_att"] >= DANGEROUS_ATT_MIN and s["shots_on_goal"] >= 1))
-
-def in_live_window(e):
-    return any(s <= e <= en for s, en in LIVE_WINDOWS)
+    # Egy szűretlen stat-hívás meccsenként mindkét csapat blokkját adja és
+    # véglegesen cache-elődik — az ellenfél és a riport már cache-ből olvas.
+    corners = {}
+    for m in matches[:5]:
+        final = (m['fixture'].get('status') or {}).get('short') in ("FT", "AET", "PEN")
+        split = fixture_stats.corners(m['fixture']['id'], fetch_fixture_statistics_raw, final=final)
+        if split:
+            corners[m['fixture']['id']] = {
+                "home": split.get(m['teams']['home']['id']),
+                "away": split.get(m['teams']['away']['id']),
+            }
+    form.seed(team_id, matches, corners)
+    return form.summary(team_id)
+
+# ========= SZABÁLYMOTOR SZAKASZ-FETCHEREK =========
+# Kötegelt interfész (LiveSnapshot lista → mezők kitöltése), hogy a szakasz
+# egyetlen hívássá vonható össze, amint az API oldal engedi.
+
+def inplay_over15_prob(tip, minute, h, a):
+    """A tipp pre-match lambdáiból az aktuális percre és állásra skálázott P(O1.5)."""
+    lam_h, lam_a = tip_lambdas(tip)
+    if lam_h is None: return None
+    return round(get_inplay_model().over_prob(lam_h, lam_a, minute, h, a, line=1.5), 4)
+
+def build_live_context(fx, master_tips, sent_today):
+    tip = master_tips.get(int(fx.id))
+    ev, prematch_p = get_ev_for_fixture(master_tips, fx.id)
+    # Nyers in-play P (a kalibráció ebből tanul és erre alkalmazódik)
+    raw_p = {"over15_live": inplay_over15_prob(tip, fx.elapsed, fx.home_goals, fx.away_goals)}
+    ctx = LiveSnapshot(fx, ev=ev, prematch_p=prematch_p,
+                       raw_p={m: p for m, p in raw_p.items() if p is not None},
+                       got_alert=[sub for sub in subscribers.subs if sub.dedup_key(fx.id) in sent_today])
+    ctx.fair_odds = calc_fair_odds(prematch_p)
+    return ctx
+
+def calibrate_contexts(ctxs):
+    """Élő fair ár: a kalibrált in-play P egy vektoros lookuppal; lambda nélkül a pre-match P marad."""
+    live = [c for c in ctxs if "over15_live" in c.raw_p]
+    for ctx, p in zip(live, calib.apply_many("over15_live", [c.raw_p["over15_live"] for c in live])):
+        ctx.model_p   = p
+        ctx.fair_odds = calc_fair_odds(p)
+
+def fetch_stats_batch(ctxs):
+    """Stat szakasz: ⌈N/20⌉ fixtures?ids= hívás; csak a kimaradt meccsek mennek egyenként."""
+    need    = [c for c in ctxs if not c.has_stats]
+    details = fetch_fixture_details(c.id for c in need) if need else {}
+    for ctx in need:
+        fx = details.get(ctx.id)
+        ctx.set_stats(shot_stats_from_blocks(fx.get("statistics")) if fx is not None
+                      else get_live_shot_stats(ctx.id))
+
+def fetch_odds_batch(ctxs, today_str, now_str):
+    """Élő odds + idősor + CLV pont + drift; ciklusonként fixture-önként egyszer."""
+    for ctx in ctxs:
+        if ctx.odds_fetched: continue
+        quote = fetch_live_odds(ctx.id)
+        lo    = quote.odds if quote else None
+        clv.snapshot(today_str, ctx.id, ctx.minute, lo, score=f"{ctx.h}-{ctx.a}")
+        ctx.odds_fetched = True
+        ctx.live_odds    = lo
+        ctx.live_ev      = calc_ev(ctx.model_p, lo)
+        ctx.drift        = check_odds_drift(ctx.id, lo, now_str)
+        m = odds_series.metrics(ctx.id) if lo is not None else None
+        ctx.chg_5m       = m["chg_5m"] if m else None
 
 # =========================================================
 # SZKENNER
@@ -612,25 +840,42 @@ def scan_next_day():
         if resp is None:
             send_telegram("⚠️ Scan sikertelen — API nem válaszolt.")
             return
-        matches = resp.json().get("response", [])
+        matches = [Fixture.from_api(fx) for fx in resp.json().get("response", [])]
         log.info(f"[scan] {len(matches)} meccs")
+        # A még nem ismert csapatok előzményei párhuzamosan, a builderrel közös napi cache-be
+        history = TeamHistoryCache(date_str=datetime.now(tz).strftime('%Y-%m-%d'))
+        form    = TeamFormStore(TEAM_FORM_FILE)
+        history.prefetch(
+            [tid for m in matches for tid in (m.home_id, m.away_id) if not form.knows(tid)],
+            fetch_team_history, last_n=10, max_workers=4,
+        )
+        history.save()
+        # Ellenfél-erősséggel korrigált lambdák: ligánkénti fit a tárolt meccsekből (warm start)
+        ratings = TeamRatings(TEAM_RATINGS_FILE)
+        fitted  = ratings.fit(collect_matches(form, history))
+        ratings.save()
+        log.info(f"[scan] Csapaterősség: {len(fitted)} liga újrafitelve "
+                 f"({sum(p['iter'] for p in fitted.values())} iteráció)")
         valid = []
         tips_entries = []
         for m in matches:
-            hd = get_team_detailed_data(m['teams']['home']['id'])
-            ad = get_team_detailed_data(m['teams']['away']['id'])
+            hd = get_team_detailed_data(m.home_id, history, form)
+            ad = get_team_detailed_data(m.away_id, history, form)
             if not hd or not ad: continue
-            lam_h = (hd['avg_scored'] + ad['avg_conceded']) / 2
-            lam_a = (ad['avg_scored'] + hd['avg_conceded']) / 2
+            rl = ratings.lambdas(m.home_id, m.away_id, m.league_id)
+            if rl:
+                lam_h, lam_a = rl
+            else:
+                lam_h = (hd['avg_scored'] + ad['avg_conceded']) / 2
+                lam_a = (ad['avg_scored'] + hd['avg_conceded']) / 2
             lam   = lam_h + lam_a
             p_over15 = poisson_over_prob(lam, 1.5)
             p_over25 = poisson_over_prob(lam, 2.5)
             fair_o15 = calc_fair_odds(p_over15)
-            fair_o25 = calc_fair_odds(p_over25)
             prematch_o15 = None
             odds_resp = api_get_with_retry(
                 f"{BASE_URL}/odds",
-                params={"fixture": m['fixture']['id'], "bookmaker": 1},
+                params={"fixture": m.id, "bookmaker": 1},
                 max_retries=2,
             )
             if odds_resp is not None:
@@ -644,7 +889,7 @@ def scan_next_day():
                                     try: prematch_o15 = float(val["odd"])
                                     except (ValueError, TypeError): pass
                 except Exception as e:
-                    log.debug(f"[scan] Pre-match odds parse hiba ({m['fixture']['id']}): {e}")
+                    log.debug(f"[scan] Pre-match odds parse hiba ({m.id}): {e}")
             ev_o15 = calc_ev(p_over15, prematch_o15)
             tips = []
             op = p_over25 * 100
@@ -660,33 +905,33 @@ def scan_next_day():
                 elif ec >= 9.2: tips.append("Corners Over 7.5")
             if not tips: continue
             ev_str = f"+{ev_o15*100:.1f}%" if ev_o15 is not None and ev_o15 > 0 else ""
-            kick   = (datetime.fromisoformat(m['fixture']['date'][:19])
+            kick   = (datetime.fromisoformat(m.date[:19])
                       .replace(tzinfo=pytz.utc).astimezone(tz).strftime('%H:%M'))
             valid.append({
-                "ID":              m['fixture']['id'],
+                "ID":              m.id,
                 "ÍDŐPONT":          kick,
-                "BAJNOKSÁG":       m['league']['name'].upper(),
-                "MECCS":           f"{m['teams']['home']['name']} - {m['teams']['away']['name']}",
+                "BAJNOKSÁG":       m.league_name.upper(),
+                "LIGA_ID":         m.league_id,
+                "MECCS":           f"{m.home_name} - {m.away_name}",
                 "OVER 2.5 ESÉLY":  f"{round(op, 1)}%",
                 "VÁRHATÓ SZÖGLET": ci,
                 "TIPP JAVASLAT":   " | ".join(tips),
                 "EV":              ev_str,
             })
-            tips_entries.append({
-                "fixture_id": m['fixture']['id'],
-                "model_p":    round(p_over15, 4),
-                "ev":         ev_o15,
-                "odds":       {"over15": prematch_o15, "over25": calc_fair_odds(p_over25)},
-                "fair_odds":  {"over15": fair_o15, "over25": fair_o25},
-                "lambda":     round(lam, 3),
-            })
-        log.info(f"[scan] {len(valid)} tipp: {target}")
+            tips_entries.append(Tip(
+                m.id, market="over15", model_p=round(p_over15, 4), odds=prematch_o15, ev=ev_o15,
+                league_id=m.league_id, league=m.league_name, country=m.country, kickoff=m.date,
+                home_team=m.home_name, away_team=m.away_name, model_p_raw=round(p_over15, 4),
+                fair_odds=fair_o15, lambda_home=round(lam_h, 3), lambda_away=round(lam_a, 3),
+            ).to_dict())
+        history.save()
+        form.save()
+        log.info(f"[scan] {len(valid)} tipp: {target} | stat cache: "
+                 f"{fixture_stats.hits} találat / {fixture_stats.misses} hívás")
         if valid:
-            cache = load_json(CACHE_FILE, {}, dict)
-            cache[target] = valid
-            save_json(CACHE_FILE, cache)
+            cache_files = master_cache.put(target, valid)
             tips_fname = f"{MASTER_TIPS_PREFIX}{target}.json"
-            save_json(tips_fname, {"date": target, "tips": tips_entries})
+            save_json(tips_fname, {"date": target, "tips": tips_entries}, published=True)
             log.info(f"[scan] Tips JSON mentve: {tips_fname} ({len(tips_entries)} bejegyzés)")
             lines = []
             for v in valid[:5]:
@@ -707,7 +952,7 @@ def scan_next_day():
             pd.DataFrame(valid).to_excel(fn, index=False)
             send_telegram(msg, fn)
             sync_to_github(
-                [CACHE_FILE, fn, TEAM_STATS_CACHE_FILE, tips_fname],
+                cache_files + [fn, TEAM_FORM_FILE, tips_fname, history.path, TEAM_RATINGS_FILE],
                 f"v5.9 Scan: {target}"
             )
         else:
@@ -718,16 +963,31 @@ def scan_next_day():
 
 # ========= JELENTÉS =========
 
+def update_team_form_from_day(form, date_str):
+    """
+    A nap összes lezárt meccse egyetlen hívással; az ismert csapatok formája
+    ebből frissül, így a következő scan-nek nem kell újra letöltenie őket.
+    """
+    resp = api_get_with_retry(f"{BASE_URL}/fixtures", params={"date": date_str, "timezone": TIMEZONE})
+    if resp is None:
+        log.warning(f"[form] Napi meccslista nem elérhető ({date_str}).")
+        return 0
+    try:
+        n = sum(1 for fx in resp.json().get("response", []) if form.ingest_fixture(fx, only_known=True))
+    except Exception as e:
+        log.warning(f"[form] Napi frissítés hiba ({date_str}): {e}")
+        return 0
+    form.save()
+    log.info(f"[form] {n} lezárt meccs bevezetve a formatárba ({date_str})")
+    return n
+
 def get_final_report():
     tz = pytz.timezone(TIMEZONE)
     today_str = datetime.now(tz).strftime('%Y-%m-%d')
     yest      = (datetime.now(tz) - timedelta(days=1)).strftime('%Y-%m-%d')
     log.info(f"[report] Napi zárás: {yest}")
-    cache = load_json(CACHE_FILE, {}, dict)
-    matches = cache.get(yest, [])
-    if not isinstance(matches, list):
-        log.error(f"[report] Hibás matches típus: {type(matches).__name__}")
-        matches = []
+    # Másolat: a riport soronként kiegészíti a sorokat, a cache-elt partíció marad
+    matches = [dict(m) for m in master_cache.get(yest)]
     if not matches:
         log.info("[report] Nincs adat tegnap.")
         send_daily_log_summary(); return
@@ -736,7 +996,9 @@ def get_final_report():
         f"📅 Dátum: <b>{yest}</b>"
     )
     final = []
+    outcomes = {}
     gol_ok = gol_fail = 0
+    form = TeamFormStore(TEAM_FORM_FILE)
     for m in matches:
         try:
             resp = api_get_with_retry(f"{BASE_URL}/fixtures", params={"id": m['ID']})
@@ -745,12 +1007,18 @@ def get_final_report():
             r = resp.json().get("response", [])
             if r:
                 res = r[0]
-                h = clean_int(fx['goals']['home'])
-                a = clean_int(fx['goals']['away'])
-                total_goals = h + a
-
-                # FIX 1: szöglet külön API hívással
-                c_total = fetch_fixture_corners(m['ID'])
+                fi  = Fixture.from_api(res)
+                h, a = fi.home_goals, fi.away_goals
+                total_goals = fi.total_goals
+                outcomes[m['ID']] = (h, a)
+
+                # FIX 1: szöglet külön API hívással (csapatonként, a formatárnak is)
+                c_split = fetch_fixture_corner_split(m['ID'], final=fi.is_final())
+                c_total = sum(c_split.values())
+                form.ingest_fixture(res, corners={
+                    "home": c_split.get(fi.home_id),
+                    "away": c_split.get(fi.away_id),
+                } if c_split else None)
 
                 m["EREDMÉNY"]    = f"{h}-{a}"
                 tipp = m.get("TIPP JAVASLAT", "")
@@ -769,6 +1037,11 @@ def get_final_report():
         except Exception as e:
             log.error(f"[report] Meccs hiba: {e}"); continue
 
+    update_team_form_from_day(form, yest)
+    # A sweep_backtest visszajátszásához: a nap snapshotjainak végeredménye
+    snap_outcomes = snapshots.write_outcomes(yest, outcomes)
+    snapshots.prune((datetime.now(tz) - timedelta(days=SNAPSHOT_KEEP_DAYS)).strftime('%Y-%m-%d'))
+
     # FIX 2: napi tipp összesítő üzenet
     total_tips = gol_ok + gol_fail
     hit_rate   = gol_ok / total_tips * 100 if total_tips else 0
@@ -799,10 +1072,9 @@ def get_final_report():
         for lt in live_history:
             try:
                 resp = api_get_with_retry(f"{BASE_URL}/fixtures", params={"id": lt['id']})
-                if resp and (resp.json().get("response") or [{}])[0].get("goals", {}):
-                    r0 = resp.json()["response"][0]
-                    if (r0['goals']['home'] or 0) + (r0['goals']['away'] or 0) > 1.5:
-                        live_wins += 1
+                r = resp.json().get("response") if resp else None
+                if r and Fixture.from_api(r[0]).total_goals > 1.5:
+                    live_wins += 1
             except: continue
         live_msg = (
             f"📱 <b>LIVE ÖSSZESITŐ</b>\n"
@@ -827,81 +1099,123 @@ def get_final_report():
         log.info(f"[backtest] Dashboard elküldve ({len(new_entries)} új bejegyzés)")
 
     deleted_files = cleanup_old_files()
+    archived, unlinked = master_cache.archive(
+        (datetime.now(tz) - timedelta(days=MASTER_CACHE_KEEP_DAYS)).strftime('%Y-%m-%d'))
+    deleted_files += unlinked
     save_json(LIVE_HISTORY_FILE, [])
-    save_json(ODDS_DRIFT_FILE, {})
+    # Az odds idősort és a CLV fájlt minden shard maga zárja napváltáskor (roll_daily_series)
+    odds_archives = glob.glob(os.path.join(ODDS_HISTORY_DIR, f"{yest}*.csv"))
+    clv_files     = [p for p in shard_paths("clv_snapshots{}.csv") if os.path.exists(p)]
     cleanup_sent_alerts(today_str)
     send_daily_log_summary()
-    sync_to_github([fn, LIVE_HISTORY_FILE, SENT_ALERTS_FILE, ODDS_DRIFT_FILE, BACKTEST_FILE],
+    snap_files = glob.glob(os.path.join(SNAPSHOT_DIR, f"{yest}*.csv")) if snap_outcomes else []
+    sync_to_github([fn, LIVE_HISTORY_FILE, SENT_ALERTS_FILE, BACKTEST_FILE, TEAM_FORM_FILE, FIXTURE_STATS_FILE, CALIBRATION_FILE]
+                   + odds_archives + clv_files + snap_files + archived,
                    f"Final Report: {yest}", delete_files=deleted_files)
 
 # ========= FŐ CIKLUS =========
 
-def main_loop():
+def main_loop(shard_index=LIVE_SHARD_INDEX, shard_count=LIVE_SHARD_COUNT):
     tz = pytz.timezone(TIMEZONE)
+    # A napi scan és riport csak a 0. shardon fut
+    coordinator = shard_index == 0
     log.info("=" * 50)
     log.info("Bot v5.9 elindult (Poisson EV + jobb Telegram formátum).")
+    if shard_count > 1:
+        log.info(f"SHARD {shard_index}/{shard_count} | kulcs szerint: {LIVE_SHARD_BY}")
     log.info(f"LIVE_MIN_EV={LIVE_MIN_EV} | WINDOWS={LIVE_WINDOWS}")
+    log.info(f"Előfizetők: {', '.join(f'{s.name}(EV≥{s.min_ev})' for s in subscribers.subs)}")
+    log.info("Szabályterv: " + " → ".join(f"{st}[{','.join(n for n, _ in rules)}]" for st, rules in rule_engine.plan))
     log.info(f"RETRY_MAX={RETRY_MAX} | RETRY_BACKOFF={RETRY_BACKOFF}s | RETRY_TIMEOUT={RETRY_TIMEOUT}s")
     log.info("=" * 50)
+    rolled_day = None
     while True:
         now = datetime.now(tz)
-        if now.hour == 16 and now.minute == 10: scan_next_day();     time.sleep(61)
-        if now.hour == 0  and now.minute == 10: get_final_report(); time.sleep(61)
+        if rolled_day != now.strftime('%Y-%m-%d'):
+            rolled_day = now.strftime('%Y-%m-%d')
+            try:
+                roll_daily_series(rolled_day)
+            except Exception as e:
+                log.error(f"[odds] Napváltási archiválás hiba: {e}")
+        if coordinator and now.hour == 16 and now.minute == 10: scan_next_day();     time.sleep(61)
+        if coordinator and now.hour == 0  and now.minute == 10: get_final_report(); time.sleep(61)
         try:
             today_str   = now.strftime('%Y-%m-%d')
             now_str     = now.strftime('%H:%M')
-            cache_data  = load_json(CACHE_FILE, {}, dict)
-            today_m     = cache_data.get(today_str, [])
-            if not isinstance(today_m, list):
-                log.error(f"[main_loop] today_m hibás típus ({type(today_m).__name__}), kiürítve.")
-                today_m = []
+            today_m     = master_cache.get(today_str)   # csak a mai partíció, mtime szerint cache-elve
+            if shard_count > 1:
+                today_m = [m for m in today_m if shard_of(m, shard_count) == shard_index]
             sent_today  = load_sent_alerts(today_str)
             master_tips = load_master_tips_for_today(today_str)
             if today_m:
-                t_ids = [m['ID'] for m in today_m]
-                live_fixtures = fetch_live_fixtures()
-                log.debug(f"[main_loop] {len(live_fixtures)} élő meccs | {now_str}")
-                for fx in live_fixtures:
-                    mid   = fx["fixture"]["id"]
-                    min_  = fx["fixture"]["status"]["elapsed"] or 0
-                    h, a  = (fx["goals"]["home"] or 0), (fx["goals"]["away"] or 0)
-                    label = f"{fx['teams']['home']['name']} – {fx['teams']['away']['name']}"
-                    if mid not in t_ids: continue
-                    if (h + a) > 1:     continue
-                    lo = fetch_live_odds(mid)
-                    di = check_odds_drift(mid, lo, now_str)
-                    if str(mid) in sent_today and di is not None:
-                        log.info(f"[DRIFT] {label} | {di['direction']} {di['pct']:.1f}%")
-                        if di["direction"] == "drop":
-                            send_telegram(
-                                f"📉 <b>ODDS DRIFT — Smart money!</b>\n"
-                                f"⚽ {label}\n"
-                                f"💰 {di['prev']} → <b>{lo}</b> (-{di['pct']:.1f}%)\n"
-                                f"✅ A piac az Over javulását árazhatja"
-                            )
-                        else:
-                            send_telegram(
-                                f"📈 <b>ODDS DRIFT — Gyengülő piac</b>\n"
-                                f"⚽ {label}\n"
-                                f"💰 {di['prev']} → <b>{lo}</b> (+{di['pct']:.1f}%)\n"
-                                f"⚠️ Csilli-villi esemény eshet nélkül"
-                            )
-                        continue
-                    if str(mid) in sent_today: continue
-                    if not in_live_window(min_):
-                        log.debug(f"[main_loop] {label} – {min_}' – ablakból kiesett"); continue
-                    ss = get_live_shot_stats(mid)
-                    if not is_active_game(ss):
-                        log.debug(f"[main_loop] {label} – low activity, skip"); continue
-                    if not master_tips:
-                        log.warning(f"[main_loop] Nincs master tips – {today_str}"); continue
-                    ev, model_p = get_ev_for_fixture(master_tips, mid)
-                    if ev is None or ev < LIVE_MIN_EV:
-                        log.debug(f"[main_loop] {label} – EV={ev}, skip (min={LIVE_MIN_EV*100:.0f}%)"); continue
-                    fair_odds = calc_fair_odds(model_p)
-                    if lo is not None and fair_odds is not None and lo < fair_odds:
-                        log.info(f"[main_loop] {label} – odds alacsony (live={lo} < fair={fair_odds}), VALUE SZŰRÉS")
-                        continue
+                tracked = {m['ID']: m for m in today_m}
+                # Szerver oldali liga szűrés; régi (LIGA_ID nélküli) cache sornál marad a live=all
+                leagues = {m.get('LIGA_ID') for m in today_m}
+                live_fixtures = fetch_live_fixtures(None if None in leagues else leagues)
+                log.debug(f"[main_loop] {len(live_fixtures)} élő meccs ({len(leagues)} liga) | {now_str}")
+                contexts = [build_live_context(fx, master_tips, sent_today)
+                            for fx in live_fixtures if fx.id in tracked]
+                calibrate_contexts(contexts)
+                if contexts and not master_tips:
+                    log.warning(f"[main_loop] Nincs master tips – {today_str}")
+                # Odds monitorozás: már kiküldött meccsek (drift) és esedékes CLV pont
+                monitored = [c for c in contexts if c.goals_total <= 1 and
+                             (c.got_alert or (c.ev is not None and clv.due(c.id, c.minute)))]
+                fetch_odds_batch(monitored, today_str, now_str)
+                for ctx in monitored:
+                    di, lo, label = ctx.drift, ctx.live_odds, ctx.label
+                    if not ctx.got_alert or di is None: continue
+                    log.info(f"[DRIFT] {label} | {di['direction']} {di['pct']:.1f}%")
+                    if di["direction"] == "drop":
+                        drift_txt = (
+                            f"📉 <b>Smart money!</b> ⚽ {label}\n"
+                            f"💰 {di['prev']} → <b>{lo}</b> (-{di['pct']:.1f}%)\n"
+                            f"{format_drift_windows(di)}\n"
+                            f"✅ A piac az Over javulását árazhatja"
+                        )
+                    else:
+                        drift_txt = (
+                            f"📈 <b>Gyengülő piac</b> ⚽ {label}\n"
+                            f"💰 {di['prev']} → <b>{lo}</b> (+{di['pct']:.1f}%)\n"
+                            f"{format_drift_windows(di)}\n"
+                            f"⚠️ Csilli-villi esemény eshet nélkül"
+                        )
+                    # Drift csak azokra a csatornákra megy, amelyek a riasztást is megkapták
+                    for chat in {sub.chat_id for sub in ctx.got_alert}:
+                        tg.coalesce("drift", drift_txt, chat_id=chat)
+                # Szabálymotor: olcsó szűrők előbb, stat/odds csak a túlélőkre, kötegben
+                pending = [c for c in contexts if len(c.got_alert) < len(subscribers.subs)]
+                # Riasztás után is rögzítjük a meccset (a sweep szigorúbb konfigjai
+                # később riaszthatnak): a már riasztott, ablakban lévő meccsek a stat
+                # szakasz ids= kötegébe kerülnek, nem külön körben
+                alerted = [c for c in contexts if len(c.got_alert) == len(subscribers.subs)
+                           and c.goals_total <= 1 and c.ev is not None
+                           and any(s <= c.minute <= e for s, e in subscribers.windows)]
+                stats_rounds = []
+                def stats_with_alerted(cs):
+                    stats_rounds.append(len(cs))
+                    fetch_stats_batch(cs + alerted)
+                passed  = rule_engine.evaluate(pending, {
+                    "stats": stats_with_alerted,
+                    "odds":  lambda cs: fetch_odds_batch(cs, today_str, now_str),
+                })
+                if alerted and not stats_rounds:
+                    fetch_stats_batch(alerted)   # a stat szakasz nem futott (nem volt túlélő)
+                snapshots.record(today_str, pending + alerted)
+                if rule_engine.last_rejections:
+                    log.debug(f"[rules] {len(pending)} jelölt → {len(passed)} | elutasítva: "
+                              + ", ".join(f"{k}={v}" for k, v in rule_engine.last_rejections.most_common()))
+                for ctx in passed:
+                    mid, min_, label = ctx.id, ctx.minute, ctx.label
+                    h, a, ev, model_p = ctx.h, ctx.a, ctx.ev, ctx.model_p
+                    lo, di, fair_odds = ctx.live_odds, ctx.drift, ctx.fair_odds
+                    live_ev = ctx.live_ev
+                    ss = {k: getattr(ctx, k) or 0 for k in ("shots_on_goal", "shots_total", "dangerous_att")}
+                    got_alert = ctx.got_alert
+                    targets = [sub for sub in subscribers.match(ctx.league_id, ctx.league_name, min_, ev)
+                               if sub not in got_alert]
+                    if not targets:
+                        log.debug(f"[main_loop] {label} – nincs illeszkedő előfizető"); continue
                     po = get_prematch_odds_for_fixture(master_tips, mid)
                     ol = build_odds_line(lo, po, model_p, di)
                     activity_bar = "🟢" if ss['shots_on_goal'] >= 5 else ("🟡" if ss['shots_on_goal'] >= 3 else "🔴")
@@ -912,23 +1226,45 @@ def main_loop():
                         f"📍 {h}–{a} — <b>{min_}. perc</b>\n"
                         f"━━━━━━━━━━━━━━━━━━━━\n"
                         f"{activity_bar} Kapura: <b>{ss['shots_on_goal']}</b> | Össz: {ss['shots_total']} | Veszélyes: {ss['dangerous_att']}\n"
-                        f"📊 EV: <b>+{ev*100:.1f}%</b> | P(O1.5): {f'{model_p*100:.1f}%' if model_p else 'N/A'}\n"
+                        f"📊 EV: <b>+{ev*100:.1f}%</b> | P(O1.5) élő: {f'{model_p*100:.1f}%' if model_p else 'N/A'}"
+                        f"{f' | élő EV: {live_ev*100:+.1f}%' if live_ev is not None else ''}\n"
                     )
                     if ol: msg += ol
-                    send_telegram(msg)
-                    log.info(f"[ALERT] {label} | {min_}' | EV={ev*100:.1f}% | odds={lo} | fair={fair_odds}")
-                    save_sent_alert(today_str, mid)
-                    hst = load_json(LIVE_HISTORY_FILE, [], list)
-                    hst.append({"id": mid, "time": now_str, "ev": ev, "model_p": model_p,
-                                 "shots_on": ss["shots_on_goal"], "shots_tot": ss["shots_total"],
-                                 "score_live": f"{h}-{a}", "minute": min_,
-                                 "live_odds": lo, "prematch_odds": po})
-                    save_json(LIVE_HISTORY_FILE, hst)
+                    # Egy kiértékelés → minden illeszkedő csatorna (csatornánkénti dedup foglalással)
+                    sent_to = [sub.name for sub in targets if save_sent_alert(today_str, sub.dedup_key(mid))]
+                    for sub in targets:
+                        if sub.name in sent_to:
+                            send_telegram(msg, chat_id=sub.chat_id)
+                    if not sent_to: continue
+                    log.info(f"[ALERT] {label} | {min_}' | EV={ev*100:.1f}% | odds={lo} | fair={fair_odds} | → {','.join(sent_to)}")
+                    if got_alert: continue
+                    clv.snapshot(today_str, mid, min_, lo, force_kind="alert", score=f"{h}-{a}")
+                    with alert_dedup.lock():
+                        hst = load_json(LIVE_HISTORY_FILE, [], list)
+                        hst.append({"id": mid, "time": now_str, "ev": ev, "model_p": model_p,
+                                     "prematch_p": ctx.prematch_p, "live_ev": live_ev, "raw_p": ctx.raw_p,
+                                     "shots_on": ss["shots_on_goal"], "shots_tot": ss["shots_total"],
+                                     "score_live": f"{h}-{a}", "minute": min_,
+                                     "live_odds": lo, "prematch_odds": po})
+                        save_json(LIVE_HISTORY_FILE, hst)
+                        event_log.append({"time": now.strftime('%Y-%m-%d %H:%M:%S'), "league": ctx.league_name,
+                                          "match": label, "minute": min_, "score": f"{h}-{a}",
+                                          "pick": "Over 1.5", "prob": model_p, "odds": lo, "fixture_id": mid,
+                                          "details": f"EV={ev:.3f}; kapura={ss['shots_on_goal']}",
+                                          "market": "OVER"})
+                # A ciklus összes drift jelzése csatornánként egyetlen üzenetben megy ki
+                for chat in {sub.chat_id for sub in subscribers.subs}:
+                    tg.flush_group("drift", header="📊 <b>ODDS DRIFT</b>\n━━━━━━━━━━━━━━━━━━━━\n", chat_id=chat)
         except Exception as e:
             log.error(f"[main_loop] Váratlan hiba: {e}")
         time.sleep(40)
 
 if __name__ == "__main__":
+    import sys
     keep_alive()
     init_state_files()
-    main_loop()
+    if "--shards" in sys.argv:
+        run_local_shards(int(sys.argv[sys.argv.index("--shards") + 1]))
+    else:
+        use_shard_api_key(LIVE_SHARD_INDEX)
+        main_loop()
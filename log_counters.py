@@ -0,0 +1,105 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+
+# =========================================================
+# ÉLŐ LOG SZÁMLÁLÓK
+# =========================================================
+# A logger minden rekordjánál memóriában növeli a napi számlálókat
+# (szint, [ALERT]/[DRIFT] címke, [stage] bontás), és legfeljebb
+# flush_interval mp-enként kiírja őket. Így a napi összesítőhöz nem kell a
+# teljes bot.log-ot beolvasni, és napközben is lekérdezhetők.
+#
+# log_counters.json:
+#   {"2026-05-16": {"levels": {"ERROR": 3, ...}, "tags": {"ALERT": 5, "DRIFT": 2},
+#                   "stages": {"main_loop": {"DEBUG": 812, "INFO": 9}, ...}}}
+
+LOG_COUNTER_TAGS      = ("ALERT", "DRIFT")
+LOG_COUNTER_KEEP_DAYS = 14
+_STAGE_RE             = re.compile(r"^\[([^\]]+)\]")
+
+
+class LogCounterHandler(logging.Handler):
+    def __init__(self, path, tz=None, flush_interval=30):
+        super().__init__(level=logging.DEBUG)
+        self.path           = path
+        self.tz             = tz
+        self.flush_interval = flush_interval
+        self._lock          = threading.Lock()
+        self._last_flush    = time.monotonic()
+        self._data          = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    self._data = data
+            except Exception:
+                pass
+
+    def emit(self, record):
+        try:
+            date  = datetime.fromtimestamp(record.created, self.tz).strftime("%Y-%m-%d")
+            m     = _STAGE_RE.match(record.getMessage())
+            stage = m.group(1) if m else "-"
+            with self._lock:
+                day = self._data.setdefault(date, {"levels": {}, "tags": {}, "stages": {}})
+                day["levels"][record.levelname] = day["levels"].get(record.levelname, 0) + 1
+                if stage in LOG_COUNTER_TAGS:
+                    day["tags"][stage] = day["tags"].get(stage, 0) + 1
+                st = day["stages"].setdefault(stage, {})
+                st[record.levelname] = st.get(record.levelname, 0) + 1
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def get(self, date_str):
+        with self._lock:
+            day = self._data.get(date_str) or {"levels": {}, "tags": {}, "stages": {}}
+            return json.loads(json.dumps(day))
+
+    def flush(self):
+        with self._lock:
+            self._last_flush = time.monotonic()
+            for d in sorted(self._data)[:-LOG_COUNTER_KEEP_DAYS]:
+                del self._data[d]
+            payload = json.dumps(self._data, separators=(",", ":"))
+        try:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+    def close(self):
+        self.flush()
+        super().close()
+
+
+def read_day(path, date_str):
+    """Egy (akár másik folyamat által írt) számlálófájl adott napja."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get(date_str) or {"levels": {}, "tags": {}, "stages": {}}
+    except (OSError, ValueError, AttributeError):
+        return {"levels": {}, "tags": {}, "stages": {}}
+
+
+def merge_days(days):
+    """Több shard napi számlálóinak összegzése."""
+    out = {"levels": {}, "tags": {}, "stages": {}}
+    for day in days:
+        for k in ("levels", "tags"):
+            for name, n in day.get(k, {}).items():
+                out[k][name] = out[k].get(name, 0) + n
+        for stage, lv in day.get("stages", {}).items():
+            st = out["stages"].setdefault(stage, {})
+            for name, n in lv.items():
+                st[name] = st.get(name, 0) + n
+    return out
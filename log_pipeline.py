@@ -0,0 +1,157 @@
+import os
+import re
+import gzip
+import time
+import queue
+import atexit
+import shutil
+import logging
+import threading
+import logging.handlers
+from datetime import datetime, timedelta
+
+# =========================================================
+# NEM BLOKKOLÓ LOG PIPELINE
+# =========================================================
+# A hívó szálon csak egy QueueHandler fut (mintavételező szűrővel), a
+# tényleges írás, rotálás és tömörítés egy háttér QueueListener szálon.
+# A "direct" handlerek (pl. a napi számlálók) közvetlenül a loggeren ülnek,
+# a mintavétel előtt — így minden rekordot látnak, a kiritkítottakat is.
+#
+#   bot.log                    → aktuális nap
+#   bot_<YYYY-MM-DD>.log.gz    → lezárt nap (éjfélkor vagy méretlimitnél)
+#   bot_<YYYY-MM-DD>.<n>.log.gz → ugyanazon nap további darabjai
+
+LOG_MAX_BYTES      = int(os.environ.get("LOG_MAX_BYTES", 20 * 1024 * 1024))
+LOG_BACKUP_DAYS    = 7
+LOG_SAMPLE_SECONDS = int(os.environ.get("LOG_SAMPLE_SECONDS", 600))
+_DIGITS_RE         = re.compile(r"\d+")
+
+
+class SampledDebugFilter(logging.Filter):
+    """
+    Ismétlődő DEBUG sorok ritkítása: az üzenet számjegyek nélküli alakja a
+    kulcs (így ugyanannak a meccsnek a percenkénti "ablakból kiesett" sora egy
+    kulcs), és kulcsonként interval mp-enként legfeljebb egy sor megy át.
+    A kihagyott sorok számát a következő átengedett sor végére írjuk.
+    """
+
+    def __init__(self, interval=LOG_SAMPLE_SECONDS, max_keys=5000):
+        super().__init__()
+        self.interval   = interval
+        self.max_keys   = max_keys
+        self._seen      = {}
+        self._lock      = threading.Lock()
+        self.suppressed = 0
+
+    def filter(self, record):
+        if record.levelno != logging.DEBUG or self.interval <= 0:
+            return True
+        msg = record.getMessage()
+        key = _DIGITS_RE.sub("#", msg)
+        now = time.monotonic()
+        with self._lock:
+            last, skipped = self._seen.get(key, (None, 0))
+            if last is not None and now - last < self.interval:
+                self._seen[key] = (last, skipped + 1)
+                self.suppressed += 1
+                return False
+            if len(self._seen) >= self.max_keys:
+                self._seen.clear()
+            self._seen[key] = (now, 0)
+        if skipped:
+            record.msg, record.args = f"{msg} (+{skipped} hasonló kihagyva)", None
+        return True
+
+
+class CompressingRotatingFileHandler(logging.handlers.BaseRotatingHandler):
+    """Napváltáskor vagy max_bytes elérésekor gzip-pel archivál, backup_days napig őriz."""
+
+    def __init__(self, filename, max_bytes=LOG_MAX_BYTES, backup_days=LOG_BACKUP_DAYS, tz=None):
+        super().__init__(filename, "a", encoding="utf-8")
+        self.max_bytes   = max_bytes
+        self.backup_days = backup_days
+        self.tz          = tz
+        self._day        = self._today()
+        if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename):
+            self._day = datetime.fromtimestamp(os.path.getmtime(self.baseFilename), tz).strftime("%Y-%m-%d")
+
+    def _today(self):
+        return datetime.now(self.tz).strftime("%Y-%m-%d")
+
+    def shouldRollover(self, record):
+        if self._today() != self._day:
+            return True
+        if self.max_bytes and self.stream is not None:
+            self.stream.seek(0, 2)
+            return self.stream.tell() >= self.max_bytes
+        return False
+
+    def archive_paths(self, day):
+        root = os.path.splitext(self.baseFilename)[0]
+        first = f"{root}_{day}.log.gz"
+        n, paths = 1, []
+        p = first
+        while os.path.exists(p):
+            paths.append(p)
+            p = f"{root}_{day}.{n}.log.gz"; n += 1
+        return paths, p
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename):
+            _, dst = self.archive_paths(self._day)
+            with open(self.baseFilename, "rb") as src, gzip.open(dst, "wb") as out:
+                shutil.copyfileobj(src, out)
+            os.remove(self.baseFilename)
+        self._day = self._today()
+        self._cleanup()
+        self.stream = self._open()
+
+    def force_rollover_if_due(self):
+        self.acquire()
+        try:
+            if self.shouldRollover(None):
+                self.doRollover()
+        finally:
+            self.release()
+
+    def _cleanup(self):
+        d    = os.path.dirname(self.baseFilename) or "."
+        root = os.path.basename(os.path.splitext(self.baseFilename)[0]) + "_"
+        cutoff = (datetime.now(self.tz) - timedelta(days=self.backup_days)).strftime("%Y-%m-%d")
+        for fn in os.listdir(d):
+            if fn.startswith(root) and fn.endswith(".log.gz") and fn[len(root):len(root) + 10] < cutoff:
+                try:
+                    os.remove(os.path.join(d, fn))
+                except OSError:
+                    pass
+
+
+class QueueLogging:
+    """
+    QueueHandler a hívó oldalon, QueueListener háttérszállal a lassú handlerekhez.
+    direct: olcsó, memóriában dolgozó handlerek a mintavételező szűrő előtt.
+    """
+
+    def __init__(self, logger, handlers, sample_filter=None, direct=()):
+        self.queue    = queue.Queue(-1)
+        self.handler  = logging.handlers.QueueHandler(self.queue)
+        if sample_filter is not None:
+            self.handler.addFilter(sample_filter)
+        self.listener = logging.handlers.QueueListener(self.queue, *handlers, respect_handler_level=True)
+        for h in direct:
+            logger.addHandler(h)
+        logger.addHandler(self.handler)
+        self.listener.start()
+        atexit.register(self.stop)
+
+    def drain(self):
+        """Megvárja, hogy a háttérszál minden eddigi rekordot kiírjon."""
+        self.queue.join()
+
+    def stop(self):
+        if self.listener._thread is not None:
+            self.listener.stop()
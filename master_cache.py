@@ -0,0 +1,128 @@
+import os
+import shutil
+import threading
+from datetime import datetime
+
+import serialization
+
+# =========================================================
+# MASTER CACHE — napi partíciók + manifest
+# =========================================================
+# A scan napi meccslistája (a régi foci_master_cache.json egy-egy dátum
+# kulcsa) külön fájlba kerül, így a fő ciklus csak a mai, a riport csak a
+# tegnapi partíciót olvassa, a scan pedig csak az új dátumot írja.
+#
+#   master_cache/<YYYY-MM-DD>.json   → [<scan sor>, ...]   (serialization: JSON vagy msgpack)
+#   master_cache/manifest.json       → {"version": 1, "dates": {"<dátum>": {"n": <sorok>, "updated": "..."}}}
+#   master_cache/archive/<dátum>.json → archivált partíciók (nem szerepelnek a manifestben)
+#
+# A manifest mindig olvasható JSON. A get() a partíció mtime-ját figyeli:
+# változatlan fájlt a 40 mp-es ciklus nem parse-ol újra.
+
+MASTER_CACHE_DIR       = "master_cache"
+MASTER_CACHE_KEEP_DAYS = 30
+MANIFEST_NAME          = "manifest.json"
+MANIFEST_VERSION       = 1
+
+
+class MasterCache:
+    def __init__(self, directory=MASTER_CACHE_DIR):
+        self.directory     = directory
+        self.manifest_path = os.path.join(directory, MANIFEST_NAME)
+        self.archive_dir   = os.path.join(directory, "archive")
+        self._lock         = threading.Lock()
+        self._memo         = {}   # dátum -> (mtime_ns, sorok)
+        self.manifest      = self._read_manifest()
+
+    def _read_manifest(self):
+        try:
+            data = serialization.read(self.manifest_path)
+        except ValueError:
+            data = None
+        if not isinstance(data, dict) or not isinstance(data.get("dates"), dict):
+            return {"version": MANIFEST_VERSION, "dates": {}}
+        return data
+
+    def _write_manifest(self):
+        os.makedirs(self.directory, exist_ok=True)
+        serialization.write(self.manifest_path, self.manifest, binary=False, pretty=True)
+
+    def path(self, date_str):
+        return os.path.join(self.directory, f"{date_str}.json")
+
+    def dates(self):
+        return sorted(self.manifest["dates"])
+
+    def get(self, date_str):
+        """Egy nap sorai (hiányzó / sérült partíciónál üres lista)."""
+        p = self.path(date_str)
+        try:
+            mtime = os.stat(p).st_mtime_ns
+        except OSError:
+            self._memo.pop(date_str, None)
+            return []
+        hit = self._memo.get(date_str)
+        if hit and hit[0] == mtime:
+            return hit[1]
+        try:
+            rows = serialization.read(p, [])
+        except ValueError:
+            return []
+        rows = rows if isinstance(rows, list) else []
+        self._memo[date_str] = (mtime, rows)
+        return rows
+
+    def put(self, date_str, rows):
+        """Egy nap partíciójának (felül)írása; visszatér a módosított fájlokkal (sync-hez)."""
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            p = serialization.write(self.path(date_str), rows)
+            self.manifest = self._read_manifest()   # közben más folyamat is írhatott
+            self.manifest["dates"][date_str] = {
+                "n": len(rows), "updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+            self._write_manifest()
+            self._memo.pop(date_str, None)
+        return [p, self.manifest_path]
+
+    def archive(self, cutoff_date):
+        """
+        A cutoff_date előtti partíciók az archive/ alá kerülnek és kikerülnek a
+        manifestből. Visszatér: (új fájlok, eltűnt fájlok) a sync-hez.
+        """
+        moved, removed = [], []
+        with self._lock:
+            self.manifest = self._read_manifest()
+            stale = [d for d in self.manifest["dates"] if d < cutoff_date]
+            for d in stale:
+                src = self.path(d)
+                if os.path.exists(src):
+                    os.makedirs(self.archive_dir, exist_ok=True)
+                    dst = os.path.join(self.archive_dir, os.path.basename(src))
+                    shutil.move(src, dst)
+                    moved.append(dst); removed.append(src)
+                del self.manifest["dates"][d]
+                self._memo.pop(d, None)
+            if stale:
+                self._write_manifest()
+                moved.append(self.manifest_path)
+        return moved, removed
+
+    def migrate(self, legacy_path):
+        """
+        Egyszeri átállás a régi egyfájlos {dátum: [sorok]} cache-ről. Csak akkor
+        fut, ha még nincs manifest; visszatér az új fájlok listájával.
+        """
+        if os.path.exists(self.manifest_path) or not os.path.exists(legacy_path):
+            return []
+        try:
+            legacy = serialization.read(legacy_path, {})
+        except ValueError:
+            return []
+        written = []
+        for date_str, rows in sorted((legacy or {}).items()):
+            if isinstance(rows, list):
+                written.extend(p for p in self.put(date_str, rows) if p not in written)
+        if not written:   # üres régi cache: a manifest jelzi, hogy az átállás megtörtént
+            self._write_manifest()
+            written.append(self.manifest_path)
+        return written
@@ -0,0 +1,110 @@
+import os
+import time
+import threading
+from collections import deque
+
+# =========================================================
+# ODDS IDŐSOR TÁR — fixture/piac szerinti gyűrűpufferek
+# =========================================================
+# Memóriában fixture+piac kulcsonként egy korlátos deque tartja az utolsó
+# (ts, odds) pontokat; lemezre csak egy rövid sor kerül hozzáfűzéssel:
+#
+#   <epoch_ts>,<fixture_id>,<market>,<odds>
+#
+# Induláskor a fájl visszajátszásával épül fel a puffer, az éjszakai
+# zárásnál a fájl dátumozott archívumba kerül (nem törlődik).
+
+ODDS_SERIES_MAXLEN = 240          # ~2.5 óra 40 mp-es pollal
+DRIFT_WINDOWS_MIN  = (5, 15)
+
+
+class OddsSeriesStore:
+    def __init__(self, path, maxlen=ODDS_SERIES_MAXLEN):
+        self.path    = path
+        self.maxlen  = maxlen
+        self._buf    = {}
+        self._lock   = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    ts, fid, market, odds = line.rstrip("\n").split(",")
+                    self._series(fid, market).append((int(ts), float(odds)))
+                except ValueError:
+                    continue
+
+    def _series(self, fixture_id, market):
+        key = (str(fixture_id), market)
+        s = self._buf.get(key)
+        if s is None:
+            s = self._buf[key] = deque(maxlen=self.maxlen)
+        return s
+
+    def append(self, fixture_id, odds, market="over15", ts=None):
+        if odds is None:
+            return
+        ts = int(ts if ts is not None else time.time())
+        with self._lock:
+            self._series(fixture_id, market).append((ts, float(odds)))
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(f"{ts},{fixture_id},{market},{odds}\n")
+
+    def series(self, fixture_id, market="over15"):
+        return list(self._buf.get((str(fixture_id), market), ()))
+
+    def fixtures(self):
+        return {fid for fid, _ in self._buf}
+
+    def metrics(self, fixture_id, market="over15", now=None):
+        """
+        Ablakos drift metrikák az utolsó pontra vonatkoztatva.
+
+        chg_<N>m:  relatív változás az N perccel korábbi értékhez képest
+                   (ha nincs ilyen régi pont, az ablak legkorábbi pontjához)
+        velocity:  %-os változás percenként az 5 perces ablakban
+        min / max: a 15 perces ablak szélsőértékei
+        """
+        s = self._buf.get((str(fixture_id), market))
+        if not s:
+            return None
+        now = int(now if now is not None else s[-1][0])
+        last_ts, last = s[-1]
+        out = {"last": last, "prev": s[-2][1] if len(s) > 1 else None, "n": len(s)}
+        for w in DRIFT_WINDOWS_MIN:
+            start = now - w * 60
+            ref_ts, ref = None, None
+            for ts, o in reversed(s):
+                if ts >= last_ts:
+                    continue
+                ref_ts, ref = ts, o
+                if ts <= start:
+                    break
+            out[f"ref_{w}m"] = ref
+            out[f"chg_{w}m"] = (last - ref) / ref if ref else None
+            if w == DRIFT_WINDOWS_MIN[0]:
+                mins = (last_ts - ref_ts) / 60 if ref_ts is not None else 0
+                out["velocity"] = out[f"chg_{w}m"] * 100 / mins if mins > 0 else None
+        window = [o for ts, o in s if ts >= now - DRIFT_WINDOWS_MIN[-1] * 60]
+        out["min"], out["max"] = min(window), max(window)
+        return out
+
+    def rotate(self, archive_path):
+        """Az aktuális idősort archiválja és üres pufferrel kezd újra."""
+        with self._lock:
+            if os.path.exists(self.path):
+                d = os.path.dirname(archive_path)
+                if d:
+                    os.makedirs(d, exist_ok=True)
+                if os.path.exists(archive_path):
+                    with open(self.path, "r", encoding="utf-8") as src, \
+                         open(archive_path, "a", encoding="utf-8") as dst:
+                        dst.write(src.read())
+                    os.remove(self.path)
+                else:
+                    os.replace(self.path, archive_path)
+            self._buf.clear()
+        return archive_path
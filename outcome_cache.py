@@ -0,0 +1,75 @@
+import os
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from records import Fixture
+
+# =========================================================
+# MECCS VÉGEREDMÉNY CACHE — végleges, fixture-kulcsos
+# =========================================================
+# A daily_summary kiértékeléséhez: egy lezárt meccs eredménye már nem
+# változik, így fixture-önként egyszer kérjük le. A hiányzókat
+# fixtures?ids=a-b-c kötegekben (OUTCOME_BATCH / hívás), párhuzamosan.
+#
+# fixture_outcomes.jsonl (csak hozzáfűzés, soronként egy meccs):
+#   {"id": <fixture_id>, "status": "FT", "home": 2, "away": 1}
+#
+# Csak végleges státuszú meccs kerül be; a függőket a következő futás újra kéri.
+
+OUTCOME_CACHE_FILE = os.environ.get("OUTCOME_CACHE_FILE", "fixture_outcomes.jsonl")
+OUTCOME_BATCH      = 20
+OUTCOME_WORKERS    = 4
+
+
+class FixtureOutcomeCache:
+    def __init__(self, path=OUTCOME_CACHE_FILE, final_statuses=("FT", "AET", "PEN")):
+        self.path           = path
+        self.final_statuses = final_statuses
+        self._lock          = threading.Lock()
+        self._data          = {}
+        self.hits = self.misses = self.calls = 0
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                        self._data[str(rec["id"])] = Fixture(
+                            rec["id"], status=rec.get("status"),
+                            home_goals=rec.get("home") or 0, away_goals=rec.get("away") or 0)
+                    except (ValueError, KeyError, TypeError):
+                        continue
+
+    def get(self, fixture_id):
+        return self._data.get(str(fixture_id))
+
+    def _put_many(self, fixtures):
+        final = [fx for fx in fixtures if fx.is_final(self.final_statuses) and str(fx.id) not in self._data]
+        if not final:
+            return
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                for fx in final:
+                    self._data[str(fx.id)] = fx
+                    f.write(json.dumps({"id": fx.id, "status": fx.status, "home": fx.home_goals,
+                                        "away": fx.away_goals}, separators=(",", ":")) + "\n")
+
+    def resolve(self, fixture_ids, fetch_batch_fn, batch=OUTCOME_BATCH, workers=OUTCOME_WORKERS):
+        """
+        {fixture_id(str): Fixture} a kért meccsekre (a le nem kérhetők hiányoznak).
+        fetch_batch_fn(id_lista) -> [Fixture], hiba esetén None.
+        """
+        ids  = list(dict.fromkeys(str(f) for f in fixture_ids if f and str(f).lower() != "none"))
+        out  = {fid: self._data[fid] for fid in ids if fid in self._data}
+        miss = [fid for fid in ids if fid not in out]
+        self.hits += len(out); self.misses += len(miss)
+        chunks = [miss[i:i + batch] for i in range(0, len(miss), batch)]
+        if not chunks:
+            return out
+        self.calls += len(chunks)
+        with ThreadPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+            for fixtures in pool.map(fetch_batch_fn, chunks):
+                for fx in fixtures or []:
+                    out[str(fx.id)] = fx
+                self._put_many(fixtures or [])
+        return out
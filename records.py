@@ -0,0 +1,166 @@
+# =========================================================
+# TÍPUSOS REKORDOK — a válaszokból egyszer parse-olva
+# =========================================================
+# A nyers API-Football dict-ek helyett a forró ciklusokban ezek mennek
+# körbe: csak a ténylegesen használt mezők, __slots__-szal (nincs
+# példányonkénti __dict__), a beágyazott kulcsokat egyszer járjuk be.
+#
+#   Fixture        — fixtures végpont egy eleme (élő feed, scan, builder, summary)
+#   LiveSnapshot   — egy élő meccs egy ciklusban (a szabálymotor ezt értékeli)
+#   OddsQuote      — egy piaci ár (élő odds)
+#   Tip            — egy tipp a tips_<dátum>.json-ban (builder és scan közös formátum)
+#   BacktestEntry  — egy kiértékelt élő riasztás (backtest.json)
+#
+# A fájlokba továbbra is sima JSON megy (to_dict), a régi formátumot a
+# from_dict-ek olvassák.
+
+FINISHED = ("FT", "AET", "PEN")
+
+
+def _pick(d, *keys):
+    for k in keys:
+        d = d.get(k) if isinstance(d, dict) else None
+    return d
+
+
+class Fixture:
+    __slots__ = ("id", "date", "status", "elapsed", "league_id", "league_name", "country", "season",
+                 "home_id", "home_name", "away_id", "away_name", "home_goals", "away_goals")
+
+    def __init__(self, id, date=None, status=None, elapsed=0, league_id=None, league_name=None,
+                 country=None, season=None, home_id=None, home_name=None, away_id=None,
+                 away_name=None, home_goals=0, away_goals=0):
+        self.id, self.date, self.status, self.elapsed = id, date, status, elapsed
+        self.league_id, self.league_name, self.country, self.season = league_id, league_name, country, season
+        self.home_id, self.home_name, self.away_id, self.away_name = home_id, home_name, away_id, away_name
+        self.home_goals, self.away_goals = home_goals, away_goals
+
+    @classmethod
+    def from_api(cls, fx):
+        return cls(
+            id          = _pick(fx, "fixture", "id"),
+            date        = _pick(fx, "fixture", "date"),
+            status      = (_pick(fx, "fixture", "status", "short") or "").upper() or None,
+            elapsed     = _pick(fx, "fixture", "status", "elapsed") or 0,
+            league_id   = _pick(fx, "league", "id"),
+            league_name = _pick(fx, "league", "name"),
+            country     = _pick(fx, "league", "country"),
+            season      = _pick(fx, "league", "season"),
+            home_id     = _pick(fx, "teams", "home", "id"),
+            home_name   = _pick(fx, "teams", "home", "name"),
+            away_id     = _pick(fx, "teams", "away", "id"),
+            away_name   = _pick(fx, "teams", "away", "name"),
+            home_goals  = int(_pick(fx, "goals", "home") or 0),
+            away_goals  = int(_pick(fx, "goals", "away") or 0),
+        )
+
+    @property
+    def label(self):
+        return f"{self.home_name} – {self.away_name}"
+
+    @property
+    def total_goals(self):
+        return self.home_goals + self.away_goals
+
+    def is_final(self, statuses=FINISHED):
+        return self.status in statuses
+
+
+class LiveSnapshot:
+    __slots__ = ("fixture", "minute", "h", "a", "goals_total", "league_id", "league_name",
+                 "ev", "prematch_p", "model_p", "fair_odds", "raw_p", "got_alert",
+                 "shots_on_goal", "shots_total", "dangerous_att",
+                 "live_odds", "live_ev", "drift", "chg_5m", "odds_fetched", "rejected_by")
+
+    def __init__(self, fixture, ev=None, prematch_p=None, raw_p=None, got_alert=()):
+        self.fixture     = fixture
+        self.minute      = fixture.elapsed
+        self.h, self.a   = fixture.home_goals, fixture.away_goals
+        self.goals_total = self.h + self.a
+        self.league_id   = fixture.league_id
+        self.league_name = fixture.league_name
+        self.ev, self.prematch_p, self.model_p = ev, prematch_p, prematch_p
+        self.fair_odds   = None
+        self.raw_p       = raw_p or {}
+        self.got_alert   = list(got_alert)
+        self.shots_on_goal = self.shots_total = self.dangerous_att = None
+        self.live_odds = self.live_ev = self.drift = self.chg_5m = self.rejected_by = None
+        self.odds_fetched = False
+
+    @property
+    def id(self):
+        return self.fixture.id
+
+    @property
+    def label(self):
+        return self.fixture.label
+
+    @property
+    def has_stats(self):
+        return self.shots_on_goal is not None
+
+    def set_stats(self, stats):
+        self.shots_on_goal = stats["shots_on_goal"]
+        self.shots_total   = stats["shots_total"]
+        self.dangerous_att = stats["dangerous_att"]
+
+
+class OddsQuote:
+    __slots__ = ("fixture_id", "market", "odds", "bookmaker_id")
+
+    def __init__(self, fixture_id, market, odds, bookmaker_id=None):
+        self.fixture_id, self.market, self.odds, self.bookmaker_id = fixture_id, market, odds, bookmaker_id
+
+
+class Tip:
+    __slots__ = ("fixture_id", "league_id", "league", "country", "kickoff", "home_team", "away_team",
+                 "market", "model_p", "model_p_raw", "odds", "fair_odds", "ev",
+                 "lambda_home", "lambda_away", "safe_over_candidate", "match_profile")
+
+    _OPTIONAL = ("league_id", "league", "country", "kickoff", "home_team", "away_team", "model_p_raw",
+                 "fair_odds", "lambda_home", "lambda_away", "safe_over_candidate", "match_profile")
+
+    def __init__(self, fixture_id, market="over15", model_p=None, odds=None, ev=None, **kw):
+        unknown = set(kw) - set(self._OPTIONAL)
+        if unknown:
+            raise TypeError(f"Tip: ismeretlen mező(k): {', '.join(sorted(unknown))}")
+        self.fixture_id, self.market = fixture_id, market
+        self.model_p, self.odds, self.ev = model_p, odds, ev
+        for k in self._OPTIONAL:
+            setattr(self, k, kw.get(k))
+
+    @classmethod
+    def from_dict(cls, d):
+        """tips_<dátum>.json elem — a régi scan formátumot is olvassa (odds/fair_odds dict, "lambda" összeg)."""
+        market = d.get("market") or "over15"
+        odds, fair = d.get("odds"), d.get("fair_odds")
+        if isinstance(odds, dict): odds = odds.get(market)
+        if isinstance(fair, dict): fair = fair.get(market)
+        lh, la = d.get("lambda_home"), d.get("lambda_away")
+        if (lh is None or la is None) and d.get("lambda") is not None:
+            lh = la = d["lambda"] / 2
+        return cls(
+            int(d["fixture_id"]), market=market, model_p=d.get("model_p"), odds=odds, ev=d.get("ev"),
+            league_id=d.get("league_id"), league=d.get("league"), country=d.get("country"),
+            kickoff=d.get("kickoff"), home_team=d.get("home_team"), away_team=d.get("away_team"),
+            model_p_raw=d.get("model_p_raw"), fair_odds=fair, lambda_home=lh, lambda_away=la,
+            safe_over_candidate=d.get("safe_over_candidate"), match_profile=d.get("match_profile"),
+        )
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+class BacktestEntry:
+    __slots__ = ("date", "id", "minute", "ev", "model_p", "raw_p", "live_odds", "fair_odds",
+                 "value_bet", "won", "kickoff_odds", "closing_odds", "clv")
+
+    def __init__(self, date, id, minute=0, ev=0.0, model_p=None, raw_p=None, live_odds=None,
+                 fair_odds=None, value_bet=False, won=False):
+        self.date, self.id, self.minute, self.ev = date, id, minute, ev
+        self.model_p, self.raw_p = model_p, raw_p or {}
+        self.live_odds, self.fair_odds, self.value_bet, self.won = live_odds, fair_odds, value_bet, won
+        self.kickoff_odds = self.closing_odds = self.clv = None
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
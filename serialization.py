@@ -0,0 +1,176 @@
+import os
+import sys
+import json
+import struct
+import argparse
+
+try:
+    import orjson
+except ImportError:  # opcionális: nélküle a stdlib json fut
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # opcionális: nélküle a bináris formátum nem írható/olvasható
+    msgpack = None
+
+# =========================================================
+# SZERIALIZÁCIÓ — gyors JSON + opcionális bináris cache formátum
+# =========================================================
+# Belső cache-ek és állapotfájlok (master cache, backtest, formatár, ...)
+# ezen keresztül íródnak/olvasódnak:
+#
+#   JSON     → orjson, ha telepítve van (különben stdlib json, azonos kimenet)
+#   bináris  → msgpack, fejléccel:  MAGIC (4 bájt) | formátum verzió (u8) | séma verzió (u16)
+#
+# Olvasáskor a formátum a fájl elejéből derül ki, így a fájlnév marad, és a
+# CACHE_FORMAT átállítása után a régi JSON fájlok is olvashatók (az első
+# mentés már az új formátumban ír). A publikált fájlok (tips, master output,
+# riportok) mindig JSON-ok maradnak: write(..., binary=False).
+#
+# A msgpack a nem-string kulcsokat megtartja (JSON-ban str lesz) — a
+# cache-ek str kulcsokkal dolgoznak, ezért ez a gyakorlatban nem számít.
+#
+# Konverter a meglévő fájlokhoz:
+#   python serialization.py convert --to msgpack backtest.json master_cache/2026-05-16.json
+#   python serialization.py info team_form.json
+
+CACHE_FORMAT   = os.environ.get("CACHE_FORMAT", "json").lower()   # json | msgpack
+MAGIC          = b"LMBC"
+FORMAT_VERSION = 1
+_HEADER        = struct.Struct(">BH")
+HEADER_SIZE    = len(MAGIC) + _HEADER.size
+
+
+class SerializationError(ValueError):
+    pass
+
+
+# ---------- JSON ----------
+
+def dumps_json(obj, pretty=False):
+    """bytes (UTF-8); pretty=True → 2 szóközös behúzás a publikált fájlokhoz."""
+    if orjson is not None:
+        opts = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+        return orjson.dumps(obj, option=opts)
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads_json(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data.decode("utf-8") if isinstance(data, (bytes, bytearray)) else data)
+
+
+# ---------- bináris ----------
+
+def pack(obj, schema=0):
+    if msgpack is None:
+        raise SerializationError("msgpack nincs telepítve (pip install msgpack)")
+    return MAGIC + _HEADER.pack(FORMAT_VERSION, schema) + msgpack.packb(obj, use_bin_type=True)
+
+
+def unpack(data):
+    """(objektum, séma verzió) egy pack() kimenetből."""
+    if not is_binary(data):
+        raise SerializationError("hiányzó fejléc")
+    version, schema = _HEADER.unpack_from(data, len(MAGIC))
+    if version > FORMAT_VERSION:
+        raise SerializationError(f"ismeretlen formátum verzió: {version}")
+    if msgpack is None:
+        raise SerializationError("msgpack nincs telepítve (pip install msgpack)")
+    return msgpack.unpackb(data[HEADER_SIZE:], raw=False, strict_map_key=False), schema
+
+
+def is_binary(data):
+    return data[:len(MAGIC)] == MAGIC and len(data) >= HEADER_SIZE
+
+
+# ---------- közös ----------
+
+def loads(data):
+    """Formátum-független betöltés (a fejléc dönt)."""
+    return unpack(data)[0] if is_binary(data) else loads_json(data)
+
+
+def dumps(obj, binary=None, schema=0, pretty=False):
+    if binary is None:
+        binary = CACHE_FORMAT == "msgpack"
+    return pack(obj, schema) if binary else dumps_json(obj, pretty)
+
+
+def read(path, default=None):
+    """Fájl betöltése; hiányzó fájlnál default, sérült fájlnál kivétel (a hívó dönt)."""
+    if not os.path.exists(path):
+        return default
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def write(path, obj, binary=None, schema=0, pretty=False):
+    """
+    Atomikus mentés (tmp + os.replace). binary=None → CACHE_FORMAT szerint;
+    publikált fájlnál binary=False.
+    """
+    data = dumps(obj, binary, schema, pretty)
+    tmp  = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return path
+
+
+def file_format(path):
+    """("msgpack", formátum verzió, séma) vagy ("json", None, None)."""
+    with open(path, "rb") as f:
+        head = f.read(HEADER_SIZE)
+    if is_binary(head):
+        return ("msgpack",) + _HEADER.unpack_from(head, len(MAGIC))
+    return "json", None, None
+
+
+def convert(path, to, out=None, schema=0, pretty=False):
+    """Meglévő fájl átírása a másik formátumba (alapból helyben)."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    if is_binary(raw):
+        obj, old_schema = unpack(raw)
+        schema = schema or old_schema
+    else:
+        obj = loads_json(raw)
+    return write(out or path, obj, binary=(to == "msgpack"), schema=schema, pretty=pretty)
+
+
+def main(argv=None):
+    ap  = argparse.ArgumentParser(description="Cache fájlok konvertálása JSON ↔ msgpack")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    c   = sub.add_parser("convert", help="fájlok átírása a megadott formátumba (helyben)")
+    c.add_argument("--to", choices=("json", "msgpack"), required=True)
+    c.add_argument("--schema", type=int, default=0, help="séma verzió a bináris fejlécbe")
+    c.add_argument("--pretty", action="store_true", help="JSON kimenet behúzással")
+    c.add_argument("files", nargs="+")
+    i   = sub.add_parser("info", help="fájlok formátuma és mérete")
+    i.add_argument("files", nargs="+")
+    args = ap.parse_args(argv)
+
+    failed = 0
+    for path in args.files:
+        try:
+            if args.cmd == "convert":
+                before = os.path.getsize(path)
+                convert(path, args.to, schema=args.schema, pretty=args.pretty)
+                print(f"{path}: {before} → {os.path.getsize(path)} bájt ({args.to})")
+            else:
+                fmt, version, schema = file_format(path)
+                extra = f" v{version} séma={schema}" if fmt == "msgpack" else ""
+                print(f"{path}: {fmt}{extra}, {os.path.getsize(path)} bájt")
+        except (OSError, ValueError) as e:
+            failed += 1
+            print(f"{path}: HIBA — {e}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
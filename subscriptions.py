@@ -0,0 +1,103 @@
+import os
+import json
+
+# =========================================================
+# ELŐFIZETŐK — csatornánkénti szűrők, egy kiértékelés → több címzett
+# =========================================================
+# subscriptions.json (vagy SUBSCRIPTIONS env, ugyanilyen JSON):
+# [
+#   {"name": "main",  "chat_id": "-100...", "min_ev": 0.02},
+#   {"name": "top",   "chat_id": "-100...", "min_ev": 0.05,
+#    "leagues": [39, 140, "Premier League"], "windows": [[50, 65]], "markets": ["over15"]}
+# ]
+#
+# leagues:  liga ID-k vagy nevek (kis/nagybetű mindegy); hiányzik → minden liga
+# windows:  [kezdő, záró] percek; hiányzik → a bot alap LIVE_WINDOWS-a
+# markets:  hiányzik → ["over15"]
+#
+# chat_id nélküli előfizetés (és CHAT_ID nélkül az alap "main") kimarad.
+#
+# Az élő snapshotot egyszer értékeljük ki; a matcher liga szerint indexel,
+# így egy új csatorna nem jár extra API hívással.
+
+SUBSCRIPTIONS_FILE = os.environ.get("SUBSCRIPTIONS_FILE", "subscriptions.json")
+DEFAULT_MARKETS    = ("over15",)
+
+
+class Subscription:
+    __slots__ = ("name", "chat_id", "leagues", "min_ev", "windows", "markets")
+
+    def __init__(self, name, chat_id, min_ev, windows, leagues=None, markets=None):
+        self.name    = name
+        self.chat_id = str(chat_id) if chat_id is not None else None
+        self.min_ev  = float(min_ev)
+        self.windows = [tuple(w) for w in windows]
+        self.leagues = {str(l).lower() for l in leagues} if leagues else None
+        self.markets = set(markets or DEFAULT_MARKETS)
+
+    def dedup_key(self, fixture_id):
+        # Az alap csatorna kulcsa a puszta fixture ID (visszafelé kompatibilis a sent_alerts-szel)
+        return str(fixture_id) if self.name == "main" else f"{self.name}:{fixture_id}"
+
+    def in_window(self, minute):
+        return any(s <= minute <= e for s, e in self.windows)
+
+
+class SubscriptionMatcher:
+    def __init__(self, subs):
+        self.subs      = list(subs)
+        self._by_league = {}
+        self._wildcard  = []
+        for s in self.subs:
+            if s.leagues is None:
+                self._wildcard.append(s)
+            else:
+                for l in s.leagues:
+                    self._by_league.setdefault(l, []).append(s)
+        # min_ev szerint rendezve: az első túl szigorú után megállhatunk
+        self._wildcard.sort(key=lambda s: s.min_ev)
+        for lst in self._by_league.values():
+            lst.sort(key=lambda s: s.min_ev)
+        self.min_ev_floor = min((s.min_ev for s in self.subs), default=0.0)
+        self.windows      = sorted({w for s in self.subs for w in s.windows})
+
+    def in_any_window(self, minute):
+        return any(s <= minute <= e for s, e in self.windows)
+
+    def match(self, league_id, league_name, minute, ev, market="over15"):
+        """Azok az előfizetők, akiknek minden szűrőjén átmegy a snapshot."""
+        out, seen = [], set()
+        buckets = (self._by_league.get(str(league_id).lower(), ()),
+                   self._by_league.get((league_name or "").lower(), ()),
+                   self._wildcard)
+        for bucket in buckets:
+            for s in bucket:
+                if ev is None or ev < s.min_ev:
+                    break
+                if s.name in seen or market not in s.markets or not s.in_window(minute):
+                    continue
+                seen.add(s.name)
+                out.append(s)
+        return out
+
+
+def load_subscriptions(default_chat_id, default_min_ev, default_windows):
+    raw = os.environ.get("SUBSCRIPTIONS")
+    if not raw and os.path.exists(SUBSCRIPTIONS_FILE):
+        with open(SUBSCRIPTIONS_FILE, "r", encoding="utf-8") as f:
+            raw = f.read()
+    items = json.loads(raw) if raw else []
+    subs = [
+        Subscription(
+            name    = it.get("name") or f"sub{i}",
+            chat_id = it.get("chat_id") or default_chat_id,
+            min_ev  = it.get("min_ev", default_min_ev),
+            windows = it.get("windows") or default_windows,
+            leagues = it.get("leagues"),
+            markets = it.get("markets"),
+        )
+        for i, it in enumerate(items)
+    ]
+    if not subs:
+        subs = [Subscription("main", default_chat_id, default_min_ev, default_windows)]
+    return SubscriptionMatcher(s for s in subs if s.chat_id)
@@ -0,0 +1,215 @@
+import os
+import csv
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from live_snapshots import SNAPSHOT_DIR, snapshot_dates, load_day
+
+# =========================================================
+# KÜSZÖB SWEEP — élő snapshotok visszajátszása
+# =========================================================
+# A live_snapshots/ napjait (snapshot + végeredmény) egyszer tömbökbe
+# töltjük, a konfigurációkat darabokra vágva egy process pool dolgozza fel;
+# workeren belül egy konfiguráció kiértékelése néhány numpy maszk-művelet
+# az összes snapshoton.
+#
+# Szabály-lánc (mint az élő alert_rules alapértelmezés):
+#   gól ≤ 1, perc az ablakban, EV ≥ min_ev, aktív meccs, value (ha kért),
+#   opcionálisan 5 perces oddsesés ≥ drift_drop.
+#
+# A snapshot minta csonka: csak az élő ingyenes szakaszon (ablak, EV padló)
+# átment meccsek kapnak statisztikát, így csak azok kerülnek rögzítésre.
+# Ezért a rács ablakai az élő LIVE_WINDOWS-on belül maradnak, a min_ev nem
+# megy az élő padló alá (iter_configs ki is szűri a lazább konfigokat).
+# A lövés / veszélyes küszöbök lazábbak is lehetnek (a stat szakaszon
+# elbukott snapshot is rögzül). Odds csak a stat szakaszon átment meccsekre
+# jön, így a chg_5m többnyire üres — a drift_drop alapból kikapcsolva; lazább
+# lövés küszöbnél a plusz riasztások odds nélkül a ROI-ba nem számítanak.
+# Meccsenként az első átmenő snapshot a "riasztás"; nyer, ha a végén
+# összgól > 1.5. ROI: 1 egység tét a riasztáskori élő oddsra (odds nélküli
+# riasztás a ROI-ba nem számít).
+#
+#   python sweep_backtest.py --days 30 --workers 4 --top 25 --out sweep_results.csv
+
+# Az élő beállítás (livemesterbot LIVE_WINDOWS / LIVE_MIN_EV) — ezzel egyezzen
+LIVE_WINDOWS = ((33, 43), (50, 65))
+LIVE_MIN_EV  = 0.02
+
+WINDOW_PRESETS = [
+    ((33, 43), (50, 65)),
+    ((33, 43),),
+    ((50, 65),),
+    ((35, 43), (50, 60)),
+    ((33, 40), (55, 65)),
+]
+
+DEFAULT_GRID = {
+    "windows":         list(range(len(WINDOW_PRESETS))),
+    "shots_on_min":    [2, 3, 4, 5],
+    "shots_total_min": [4, 6, 8, 10],
+    "dangerous_min":   [10, 20, 30, 40],
+    "min_ev":          [0.02, 0.04, 0.06, 0.08],
+    "drift_drop":      [0.0],
+    "require_value":   [True, False],
+}
+
+RESULT_FIELDS = ["windows", "shots_on_min", "shots_total_min", "dangerous_min", "min_ev",
+                 "drift_drop", "require_value", "alerts", "wins", "hit_rate", "staked", "roi"]
+
+_DATA = None
+
+
+def _num(v):
+    return float(v) if v not in (None, "") else np.nan
+
+
+def load_arrays(dates, directory=SNAPSHOT_DIR):
+    """Az összes nap snapshotja fixture, perc szerint rendezett numpy tömbökben."""
+    cols = {k: [] for k in ("fix", "minute", "goals", "ev", "fair", "sog", "tot", "dang", "odds", "chg", "won")}
+    fix_ids = {}
+    for d in dates:
+        rows, outcomes = load_day(d, directory)
+        for r in rows:
+            res = outcomes.get(r["fixture_id"])
+            if res is None:
+                continue
+            cols["fix"].append(fix_ids.setdefault((d, r["fixture_id"]), len(fix_ids)))
+            cols["minute"].append(int(r["minute"]))
+            cols["goals"].append(int(r["h"]) + int(r["a"]))
+            cols["ev"].append(_num(r["ev"]))
+            cols["fair"].append(_num(r["fair_odds"]))
+            cols["sog"].append(int(r["shots_on"]))
+            cols["tot"].append(int(r["shots_tot"]))
+            cols["dang"].append(int(r["dangerous"]))
+            cols["odds"].append(_num(r["live_odds"]))
+            cols["chg"].append(_num(r["chg_5m"]))
+            cols["won"].append(sum(res) > 1.5)
+    arr   = {k: np.asarray(v) for k, v in cols.items()}
+    order = np.lexsort((arr["minute"], arr["fix"])) if len(arr["fix"]) else np.arange(0)
+    return {k: v[order] for k, v in arr.items()}
+
+
+def _init_worker(data):
+    global _DATA
+    _DATA = data
+
+
+def evaluate_config(cfg, data=None):
+    d = data if data is not None else _DATA
+    m = d["goals"] <= 1
+    win = np.zeros_like(m)
+    for s, e in WINDOW_PRESETS[cfg["windows"]]:
+        win |= (d["minute"] >= s) & (d["minute"] <= e)
+    m &= win
+    m &= ~np.isnan(d["ev"]) & (np.nan_to_num(d["ev"], nan=-1.0) >= cfg["min_ev"])
+    m &= ((d["sog"] >= cfg["shots_on_min"]) | (d["tot"] >= cfg["shots_total_min"]) |
+          ((d["dang"] >= cfg["dangerous_min"]) & (d["sog"] >= 1)))
+    if cfg["require_value"]:
+        m &= np.isnan(d["odds"]) | np.isnan(d["fair"]) | (d["odds"] >= d["fair"])
+    if cfg["drift_drop"] > 0:
+        m &= np.nan_to_num(d["chg"], nan=0.0) <= -cfg["drift_drop"]
+    idx = np.flatnonzero(m)
+    if idx.size:
+        # Rendezett tömbben meccsenként az első átmenő sor
+        _, first = np.unique(d["fix"][idx], return_index=True)
+        idx = idx[first]
+    won    = d["won"][idx]
+    odds   = d["odds"][idx]
+    priced = ~np.isnan(odds)
+    staked = int(priced.sum())
+    profit = float(np.where(won[priced], odds[priced] - 1.0, -1.0).sum()) if staked else 0.0
+    alerts = int(idx.size)
+    wins   = int(won.sum())
+    return {
+        **cfg,
+        "windows":  "+".join(f"{s}-{e}" for s, e in WINDOW_PRESETS[cfg["windows"]]),
+        "alerts":   alerts,
+        "wins":     wins,
+        "hit_rate": round(wins / alerts, 4) if alerts else None,
+        "staked":   staked,
+        "roi":      round(profit / staked, 4) if staked else None,
+    }
+
+
+def _evaluate_chunk(cfgs):
+    return [evaluate_config(c) for c in cfgs]
+
+
+def within_live(cfg):
+    """A rögzített mintán csak az élőnél nem lazább ablak / EV küszöb értékelhető."""
+    windows_ok = all(any(ls <= s and e <= le for ls, le in LIVE_WINDOWS)
+                     for s, e in WINDOW_PRESETS[cfg["windows"]])
+    return windows_ok and cfg["min_ev"] >= LIVE_MIN_EV
+
+
+def iter_configs(grid=DEFAULT_GRID):
+    keys = list(grid)
+    for values in itertools.product(*(grid[k] for k in keys)):
+        cfg = dict(zip(keys, values))
+        if within_live(cfg):
+            yield cfg
+
+
+def run_sweep(data, grid=DEFAULT_GRID, workers=None, chunk=256):
+    cfgs   = list(iter_configs(grid))
+    chunks = [cfgs[i:i + chunk] for i in range(0, len(cfgs), chunk)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data,)) as ex:
+        return [r for part in ex.map(_evaluate_chunk, chunks) for r in part]
+
+
+def rank(results, sort="roi", min_alerts=10):
+    keep = [r for r in results if r["alerts"] >= min_alerts]
+    key  = {"roi": lambda r: (r["roi"] if r["roi"] is not None else -9, r["hit_rate"] or 0),
+            "hit": lambda r: (r["hit_rate"] or 0, r["alerts"]),
+            "alerts": lambda r: (r["alerts"], r["hit_rate"] or 0)}[sort]
+    return sorted(keep, key=key, reverse=True)
+
+
+def print_table(rows):
+    print(f"{'#':>3} {'ablak':<22} {'kapura':>6} {'össz':>5} {'veszély':>7} {'EV≥':>5} {'drift':>5} "
+          f"{'value':>5} {'riaszt':>6} {'hit%':>6} {'ROI%':>7}")
+    for i, r in enumerate(rows, 1):
+        roi = f"{r['roi']*100:+.1f}" if r["roi"] is not None else "—"
+        hit = f"{r['hit_rate']*100:.1f}" if r["hit_rate"] is not None else "—"
+        print(f"{i:>3} {r['windows']:<22} {r['shots_on_min']:>6} {r['shots_total_min']:>5} "
+              f"{r['dangerous_min']:>7} {r['min_ev']:>5.2f} {r['drift_drop']:>5.2f} "
+              f"{'igen' if r['require_value'] else 'nem':>5} {r['alerts']:>6} "
+              f"{hit:>6} {roi:>7}")
+
+
+def write_csv(rows, path):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        w.writeheader()
+        w.writerows(rows)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Élő riasztási küszöbök sweep-je rögzített snapshotokon")
+    ap.add_argument("--dir", default=SNAPSHOT_DIR)
+    ap.add_argument("--days", type=int, default=30, help="az utolsó N rögzített nap")
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
+    ap.add_argument("--min-alerts", type=int, default=10)
+    ap.add_argument("--sort", choices=("roi", "hit", "alerts"), default="roi")
+    ap.add_argument("--top", type=int, default=25)
+    ap.add_argument("--out", default="sweep_results.csv")
+    args = ap.parse_args()
+
+    dates = snapshot_dates(args.dir)[-args.days:]
+    if not dates:
+        print(f"⚠️ Nincs visszajátszható nap: {args.dir}")
+        return
+    data = load_arrays(dates, args.dir)
+    n_cfg = sum(1 for _ in iter_configs())
+    print(f"▶ {len(dates)} nap | {len(data['fix'])} snapshot | {n_cfg} konfiguráció | {args.workers} worker")
+    ranked = rank(run_sweep(data, workers=args.workers), args.sort, args.min_alerts)
+    print_table(ranked[:args.top])
+    write_csv(ranked, args.out)
+    print(f"✅ Rangsor mentve: {args.out} ({len(ranked)} sor)")
+
+
+if __name__ == "__main__":
+    main()
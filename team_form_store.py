@@ -0,0 +1,160 @@
+import os
+import threading
+
+import serialization
+from team_history_cache import compact_match
+from fixture_stats_cache import corner_split
+
+# =========================================================
+# GÖRDÜLŐ CSAPATFORMA TÁR — inkrementális frissítés
+# =========================================================
+# team_form.json:
+#   {"<team_id>": [<tömör meccs + "corners": {"home": n, "away": n}>, ...]}
+#
+# Csapatonként a legutóbbi FORM_WINDOW lejátszott meccs (legújabb elöl).
+# Egy csapat első alkalommal a letöltött előzményből kerül be (seed), utána
+# a napi lezárt meccsekből frissül (ingest_fixture), így a következő scan
+# csak a soha nem látott csapatok előzményét tölti le.
+#
+# A builder seed-je és a napi ingest szöglet nélkül érkezik; ezeket a
+# fill_corners() pótolja a fixture statisztika cache-ből (meccsenként egyszer).
+# "corners": null = még nem próbáltuk, {"home": null, "away": null} = nincs adat.
+
+TEAM_FORM_FILE   = "team_form.json"
+FORM_WINDOW      = 15
+FORM_MIN_MATCHES = 5
+GOALS_WINDOW     = 10
+BTTS_WINDOW      = 5
+CORNERS_WINDOW   = 5
+FINISHED         = ("FT", "AET", "PEN")
+
+
+class TeamFormStore:
+    def __init__(self, path=TEAM_FORM_FILE):
+        self.path  = path
+        self._lock = threading.Lock()
+        self._data = {}
+        if os.path.exists(path):
+            try:
+                data = serialization.read(path)
+                if isinstance(data, dict):
+                    self._data = data
+            except Exception:
+                pass
+
+    def knows(self, team_id, min_matches=FORM_MIN_MATCHES):
+        return len(self._data.get(str(team_id), ())) >= min_matches
+
+    def matches(self, team_id, last_n=FORM_WINDOW):
+        return self._data.get(str(team_id), [])[:last_n]
+
+    def all_matches(self):
+        """A tár összes tömör meccse (csapatonként ismétlődhet)."""
+        with self._lock:
+            return [m for lst in self._data.values() for m in lst]
+
+    def _insert(self, team_id, m):
+        lst = self._data.setdefault(str(team_id), [])
+        fid = m["fixture"]["id"]
+        for i, old in enumerate(lst):
+            if old["fixture"]["id"] == fid:
+                if m.get("corners") is None:
+                    m["corners"] = old.get("corners")
+                lst[i] = m
+                break
+        else:
+            lst.append(m)
+        lst.sort(key=lambda x: x["fixture"].get("date") or "", reverse=True)
+        del lst[FORM_WINDOW:]
+
+    def seed(self, team_id, matches, corners=None):
+        """Letöltött előzmény betöltése. corners: {fixture_id: {"home": n, "away": n}}"""
+        with self._lock:
+            for m in matches:
+                if m.get("goals", {}).get("home") is None:
+                    continue
+                cm = compact_match(m)
+                cm["corners"] = (corners or {}).get(cm["fixture"]["id"])
+                self._insert(team_id, cm)
+
+    def ingest_fixture(self, m, corners=None, only_known=False):
+        """Egy lezárt meccs hozzáadása mindkét csapat formájához."""
+        status = ((m.get("fixture") or {}).get("status") or {}).get("short")
+        if status not in FINISHED:
+            return False
+        cm = compact_match(m)
+        cm["corners"] = corners
+        with self._lock:
+            for side in ("home", "away"):
+                tid = cm["teams"][side]["id"]
+                if only_known and str(tid) not in self._data:
+                    continue
+                self._insert(tid, dict(cm))
+        return True
+
+    def fill_corners(self, team_id, stats_cache, fetch_fn):
+        """
+        A szöglet ablak (utolsó CORNERS_WINDOW meccs) hiányzó szögleteinek
+        pótlása stats_cache.fetch()-ből. Sikertelen hívásnál a meccs marad
+        pótlandó; adat nélküli válasznál null-os szöglettel jelöljük.
+        Visszatér: pótolt meccsek száma.
+        """
+        todo = [m for m in self.matches(team_id, CORNERS_WINDOW) if m.get("corners") is None]
+        filled = 0
+        for m in todo:
+            teams = stats_cache.fetch(m["fixture"]["id"], fetch_fn, final=True)
+            if teams is None:
+                continue
+            split = corner_split(teams)
+            self.set_corners(m["fixture"]["id"], {
+                "home": split.get(m["teams"]["home"]["id"]),
+                "away": split.get(m["teams"]["away"]["id"]),
+            })
+            filled += 1
+        return filled
+
+    def set_corners(self, fixture_id, corners):
+        """Egy meccs szögletei minden csapat listájában, ahol a meccs szerepel."""
+        with self._lock:
+            for lst in self._data.values():
+                for m in lst:
+                    if m["fixture"]["id"] == fixture_id:
+                        m["corners"] = corners
+
+    def summary(self, team_id):
+        """
+        A livemesterbot scan által várt ablakos átlagok:
+        avg_scored / avg_conceded (utolsó 10), btts_trend (BTTS db az utolsó 5-ből),
+        corner_avg (utolsó 5 ismert szöglet, legalább 3 minta esetén).
+        """
+        lst = self._data.get(str(team_id))
+        if not lst:
+            return None
+        tid = int(team_id)
+        scored = conceded = btts = 0
+        corn = []
+        goals_n = min(len(lst), GOALS_WINDOW)
+        for i, m in enumerate(lst[:GOALS_WINDOW]):
+            side  = "home" if m["teams"]["home"]["id"] == tid else "away"
+            other = "away" if side == "home" else "home"
+            s, c  = m["goals"][side] or 0, m["goals"][other] or 0
+            scored += s; conceded += c
+            if i < BTTS_WINDOW and s > 0 and c > 0:
+                btts += 1
+        for m in lst:
+            side = "home" if m["teams"]["home"]["id"] == tid else "away"
+            if m.get("corners") and m["corners"].get(side) is not None:
+                corn.append(m["corners"][side])
+                if len(corn) == CORNERS_WINDOW:
+                    break
+        return {
+            "avg_scored":   scored / goals_n,
+            "avg_conceded": conceded / goals_n,
+            "btts_trend":   btts,
+            "corner_avg":   sum(corn) / len(corn) if len(corn) >= 3 else None,
+        }
+
+    def save(self):
+        with self._lock:
+            serialization.write(self.path, self._data)
+        return self.path
@@ -0,0 +1,127 @@
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+import serialization
+
+# =========================================================
+# CSAPAT-ELŐZMÉNY CACHE — napra dátumozott, lemezen megosztott
+# =========================================================
+# team_history/<YYYY-MM-DD>.json:
+#   {"<team_id>": {"n": <lekért meccsszám>, "matches": [<tömör meccs>, ...]}}
+#
+# Ugyanazon a napon a foci_master_builder és a livemesterbot scan is ebből
+# olvas, így egy csapat előzményét naponta legfeljebb egyszer töltjük le.
+# A meccsekből csak a modellhez szükséges mezők maradnak meg, az API-Football
+# szerkezetét megtartva (m["teams"]["home"]["id"], m["goals"]["home"] ...).
+
+TEAM_HISTORY_DIR       = "team_history"
+TEAM_HISTORY_KEEP_DAYS = 3
+TEAM_HISTORY_WORKERS   = int(os.environ.get("TEAM_HISTORY_WORKERS", 6))
+
+
+def compact_match(m):
+    fx = m.get("fixture", {}) or {}
+    lg = m.get("league", {}) or {}
+    tm = m.get("teams", {}) or {}
+    gl = m.get("goals", {}) or {}
+    return {
+        "fixture": {"id": fx.get("id"), "date": fx.get("date"),
+                    "status": {"short": (fx.get("status") or {}).get("short")}},
+        "league":  {"id": lg.get("id"), "season": lg.get("season")},
+        "teams":   {"home": {"id": (tm.get("home") or {}).get("id")},
+                    "away": {"id": (tm.get("away") or {}).get("id")}},
+        "goals":   {"home": gl.get("home"), "away": gl.get("away")},
+    }
+
+
+class TeamHistoryCache:
+    def __init__(self, directory=TEAM_HISTORY_DIR, date_str=None):
+        self.directory = directory
+        self.date_str  = date_str or datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        self.path      = os.path.join(directory, f"{self.date_str}.json")
+        self._lock     = threading.Lock()
+        self._dirty    = False
+        self._data     = self._read()
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            data = serialization.read(self.path)
+            return data if isinstance(data, dict) else {}
+        except Exception:
+            return {}
+
+    def get(self, team_id, last_n):
+        """A csapat utolsó last_n meccse, ha ma már legalább ennyit letöltöttünk."""
+        e = self._data.get(str(team_id))
+        if e and e.get("n", 0) >= last_n:
+            return e["matches"][:last_n]
+        return None
+
+    def put(self, team_id, matches, last_n):
+        with self._lock:
+            self._data[str(team_id)] = {"n": last_n, "matches": [compact_match(m) for m in matches]}
+            self._dirty = True
+
+    def prefetch(self, team_ids, fetch_fn, last_n, max_workers=TEAM_HISTORY_WORKERS, on_error=None):
+        """
+        A hiányzó csapatok előzményeit párhuzamosan tölti le (korlátos pool).
+        fetch_fn(team_id, last_n) -> meccslista. Visszatér: {team_id: meccsek}.
+        """
+        out, missing = {}, []
+        for tid in dict.fromkeys(team_ids):
+            cached = self.get(tid, last_n)
+            if cached is not None:
+                out[tid] = cached
+            else:
+                missing.append(tid)
+
+        def job(tid):
+            try:
+                return tid, fetch_fn(tid, last_n)
+            except Exception as e:
+                if on_error:
+                    on_error(tid, e)
+                return tid, None
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+                for tid, matches in pool.map(job, missing):
+                    if matches is None:
+                        continue
+                    self.put(tid, matches, last_n)
+                    out[tid] = self.get(tid, last_n)
+        return out
+
+    def all_matches(self):
+        """A mai cache összes tömör meccse (csapatonként ismétlődhet)."""
+        with self._lock:
+            return [m for e in self._data.values() for m in e.get("matches", [])]
+
+    def save(self):
+        """Atomikus mentés; a közben más folyamat által írt csapatok is megmaradnak."""
+        with self._lock:
+            if not self._dirty:
+                return self.path
+            os.makedirs(self.directory, exist_ok=True)
+            merged = self._read()
+            for tid, e in self._data.items():
+                if e.get("n", 0) >= merged.get(tid, {}).get("n", 0):
+                    merged[tid] = e
+            serialization.write(self.path, merged)
+            self._data, self._dirty = merged, False
+            self._cleanup()
+        return self.path
+
+    def _cleanup(self):
+        cutoff = (datetime.strptime(self.date_str, "%Y-%m-%d")
+                  - timedelta(days=TEAM_HISTORY_KEEP_DAYS)).strftime("%Y-%m-%d")
+        for fn in os.listdir(self.directory):
+            if fn.endswith(".json") and fn[:10] < cutoff:
+                try:
+                    os.remove(os.path.join(self.directory, fn))
+                except OSError:
+                    pass
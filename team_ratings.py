@@ -0,0 +1,158 @@
+import os
+import math
+from datetime import datetime
+
+import numpy as np
+
+import serialization
+
+# =========================================================
+# CSAPATERŐSSÉG — ligánkénti Dixon–Coles (idősúlyozott Poisson) fit
+# =========================================================
+# Modell meccsenként két sorral (hazai és vendég gól):
+#   log λ_hazai  = c + home + att[hazai]  + def[vendég]
+#   log λ_vendég = c        + att[vendég] + def[hazai]
+# (def = "kapott gól hajlam": nagyobb → többet kap.)
+#
+# A tervezési mátrix ritka: soronként egy att és egy def index, ezért a
+# gradiens és a diagonális Hesse-mátrix np.bincount-tal számolható. A fit
+# blokkonkénti diagonális Newton (Fisher-scoring) lépésekkel fut; az L2
+# ridge a kevés meccses csapatokat 0 felé húzza és rögzíti a szintet.
+# A súly exp(-xi · napok), mint a Dixon–Coles idősúlyozásnál.
+#
+# Tegnapi paraméterekből indul (warm start), így a napi újrafit néhány
+# iteráció. A lambda lekérés csapatonkénti dict indexből O(1).
+#
+# team_ratings.json:
+#   {"date": "...", "leagues": {"<league_id>": {"c": .., "home": .., "n": ..,
+#                                              "att": {"<tid>": ..}, "def": {"<tid>": ..}}}}
+
+TEAM_RATINGS_FILE  = "team_ratings.json"
+RATING_XI          = 0.0065   # idősúlyozás (napra) — ~100 napos felezési idő
+RATING_RIDGE       = 2.0
+RATING_MIN_MATCHES = 20       # ligánként ennyi meccs alatt nincs fit
+RATING_MAX_ITER    = 200
+RATING_TOL         = 1e-4
+FINISHED           = ("FT", "AET", "PEN")
+
+
+def collect_matches(*sources):
+    """Lezárt tömör meccsek fixture ID szerint deduplikálva (form tár, előzmény cache ...)."""
+    out = {}
+    for src in sources:
+        if src is None:
+            continue
+        for m in src.all_matches():
+            fid = (m.get("fixture") or {}).get("id")
+            st  = ((m.get("fixture") or {}).get("status") or {}).get("short")
+            g   = m.get("goals") or {}
+            if fid is None or g.get("home") is None or g.get("away") is None:
+                continue
+            if st and st not in FINISHED:
+                continue
+            out[fid] = m
+    return list(out.values())
+
+
+def _fit_league(matches, today, prev=None):
+    teams = sorted({m["teams"][s]["id"] for m in matches for s in ("home", "away")})
+    tix   = {t: i for i, t in enumerate(teams)}
+    n     = len(teams)
+    hi = np.array([tix[m["teams"]["home"]["id"]] for m in matches])
+    ai = np.array([tix[m["teams"]["away"]["id"]] for m in matches])
+    age = np.array([max((today - datetime.fromisoformat(m["fixture"]["date"][:10])).days, 0)
+                    if m["fixture"].get("date") else 0 for m in matches], dtype=float)
+    w   = np.exp(-RATING_XI * age)
+    # Sorok: előbb az összes hazai, utána az összes vendég gól
+    att_ix  = np.concatenate([hi, ai])
+    def_ix  = np.concatenate([ai, hi])
+    is_home = np.concatenate([np.ones(len(matches)), np.zeros(len(matches))])
+    y  = np.array([m["goals"]["home"] for m in matches] + [m["goals"]["away"] for m in matches], dtype=float)
+    ww = np.concatenate([w, w])
+
+    att, dfn = np.zeros(n), np.zeros(n)
+    c, home  = np.log(max(y.mean(), 0.1)), 0.1
+    if prev:
+        c, home = prev.get("c", c), prev.get("home", home)
+        for t, i in tix.items():
+            att[i] = prev.get("att", {}).get(str(t), 0.0)
+            dfn[i] = prev.get("def", {}).get(str(t), 0.0)
+
+    def eta():
+        return c + home * is_home + att[att_ix] + dfn[def_ix]
+
+    it = 0
+    for it in range(1, RATING_MAX_ITER + 1):
+        # Blokkonkénti (Gauss–Seidel) Newton lépések: c, home, att, def
+        lam = np.exp(eta()); r, hw = ww * (y - lam), ww * lam
+        d_c = r.sum() / hw.sum(); c += d_c
+        lam = np.exp(eta()); r, hw = ww * (y - lam), ww * lam
+        d_home = (r * is_home).sum() / (hw * is_home).sum(); home += d_home
+        lam = np.exp(eta()); r, hw = ww * (y - lam), ww * lam
+        d_att = (np.bincount(att_ix, r, n) - RATING_RIDGE * att) / (np.bincount(att_ix, hw, n) + RATING_RIDGE)
+        att += d_att
+        lam = np.exp(eta()); r, hw = ww * (y - lam), ww * lam
+        d_def = (np.bincount(def_ix, r, n) - RATING_RIDGE * dfn) / (np.bincount(def_ix, hw, n) + RATING_RIDGE)
+        dfn += d_def
+        if max(abs(d_c), abs(d_home), np.abs(d_att).max(), np.abs(d_def).max()) < RATING_TOL:
+            break
+    return {
+        "c": round(float(c), 5), "home": round(float(home), 5), "n": len(matches), "iter": it,
+        "att": {str(t): round(float(att[i]), 5) for t, i in tix.items()},
+        "def": {str(t): round(float(dfn[i]), 5) for t, i in tix.items()},
+    }
+
+
+class TeamRatings:
+    def __init__(self, path=TEAM_RATINGS_FILE):
+        self.path    = path
+        self.date    = None
+        self.leagues = {}
+        if os.path.exists(path):
+            try:
+                data = serialization.read(path)
+                self.date, self.leagues = data.get("date"), data.get("leagues", {})
+            except (OSError, ValueError, AttributeError):
+                pass
+        self._reindex()
+
+    def _reindex(self):
+        # csapat → (liga paraméterek, att, def); több ligás csapatnál a több meccses liga nyer
+        self._team = {}
+        for lid, p in sorted(self.leagues.items(), key=lambda kv: kv[1].get("n", 0)):
+            for t, a in p["att"].items():
+                self._team[t] = (p, a, p["def"][t])
+
+    def fit(self, matches, today=None):
+        """Ligánkénti újrafit a megadott meccsekre, az előző paraméterekből indulva."""
+        today = today or datetime.now()
+        by_league = {}
+        for m in matches:
+            lid = (m.get("league") or {}).get("id")
+            if lid is not None:
+                by_league.setdefault(str(lid), []).append(m)
+        fitted = {}
+        for lid, ms in by_league.items():
+            if len(ms) < RATING_MIN_MATCHES:
+                continue
+            fitted[lid] = _fit_league(ms, today, self.leagues.get(lid))
+        self.leagues.update(fitted)
+        self.date = today.strftime("%Y-%m-%d")
+        self._reindex()
+        return fitted
+
+    def lambdas(self, home_id, away_id, league_id=None):
+        """(λ_hazai, λ_vendég) vagy None, ha valamelyik csapat ismeretlen."""
+        p = self.leagues.get(str(league_id)) if league_id is not None else None
+        if p is not None and str(home_id) in p["att"] and str(away_id) in p["att"]:
+            ah, dh, aa, da = p["att"][str(home_id)], p["def"][str(home_id)], p["att"][str(away_id)], p["def"][str(away_id)]
+        else:
+            h, a = self._team.get(str(home_id)), self._team.get(str(away_id))
+            if h is None or a is None:
+                return None
+            p, ah, dh = h
+            _, aa, da = a
+        return math.exp(p["c"] + p["home"] + ah + da), math.exp(p["c"] + aa + dh)
+
+    def save(self):
+        return serialization.write(self.path, {"date": self.date, "leagues": self.leagues})
@@ -0,0 +1,237 @@
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+from collections import deque
+
+import requests
+
+# =========================================================
+# TELEGRAM KIMENŐ SOR — közös a livemesterbot, a foci_master_builder
+# és a daily_summary számára
+# =========================================================
+# A küldés egy háttérszálon fut, így egy lassú Telegram API vagy egy
+# dokumentum-feltöltés nem tartja fel a hívót (pl. az élő ciklust).
+#
+# Telegram limitek (Bot API FAQ):
+#   - globálisan ~30 üzenet / mp
+#   - ugyanabba a chatbe ~1 üzenet / mp
+#   - csoportba / csatornába max. 20 üzenet / perc
+
+TG_API_URL            = "https://api.telegram.org/bot{token}/{method}"
+TG_GLOBAL_PER_SEC     = float(os.environ.get("TG_GLOBAL_PER_SEC", 25))
+TG_CHAT_MIN_INTERVAL  = float(os.environ.get("TG_CHAT_MIN_INTERVAL", 1.0))
+TG_GROUP_PER_MIN      = int(os.environ.get("TG_GROUP_PER_MIN", 20))
+TG_MAX_RETRIES        = 4
+TG_BACKOFF            = 2
+TG_MAX_TEXT_LEN       = 4096
+TG_LATENCY_SAMPLES    = 500
+
+log = logging.getLogger("livemester.telegram")
+
+
+class TelegramQueue:
+    """
+    Aszinkron, rate-limit tudatos Telegram küldő.
+
+    send()       -> sorba teszi az üzenetet, azonnal visszatér
+    coalesce()   -> egy csoportba gyűjt több rövid üzenetet (pl. drift jelzések)
+    flush_group() -> a csoport tartalmát egyetlen üzenetként sorba teszi
+    flush()      -> megvárja, amíg a sor kiürül (scriptek végén)
+    metrics()    -> kézbesítési késleltetés és hibaszámok
+    """
+
+    def __init__(self, token, default_chat_id=None):
+        self.token           = token
+        self.default_chat_id = default_chat_id
+        self._q              = queue.Queue()
+        self._groups         = {}
+        self._groups_lock    = threading.Lock()
+        self._thread         = None
+        self._start_lock     = threading.Lock()
+        self._last_global    = 0.0
+        self._last_per_chat  = {}
+        self._group_window   = {}
+        self._latencies      = deque(maxlen=TG_LATENCY_SAMPLES)
+        self._counts         = {"sent": 0, "failed": 0, "retried": 0, "coalesced": 0}
+
+    # ---------- publikus API ----------
+
+    def send(self, text, chat_id=None, file_path=None, parse_mode="HTML", disable_preview=True):
+        chat_id = chat_id or self.default_chat_id
+        if not self.token or not chat_id:
+            log.warning("[telegram] Token vagy chat_id hiányzik → nem küldtem el.")
+            return False
+        doc = None
+        if file_path:
+            # A fájl tartalmát most olvassuk be: a hívó utána átnevezheti/törölheti
+            # (pl. a napi bot.log archiválás), a háttérszál ettől még elküldi.
+            try:
+                with open(file_path, "rb") as f:
+                    doc = (os.path.basename(file_path), f.read())
+            except OSError as e:
+                log.error(f"[telegram] Csatolmány nem olvasható ({file_path}): {e}")
+        self._ensure_started()
+        self._q.put({
+            "chat_id":     chat_id,
+            "text":        text,
+            "doc":         doc,
+            "parse_mode":  parse_mode,
+            "no_preview":  disable_preview,
+            "enqueued_at": time.monotonic(),
+        })
+        return True
+
+    def coalesce(self, group, text, chat_id=None):
+        """Szöveg hozzáadása egy összevonandó csoporthoz (még nem küld)."""
+        key = (group, chat_id or self.default_chat_id)
+        with self._groups_lock:
+            self._groups.setdefault(key, []).append(text)
+
+    def flush_group(self, group, header="", chat_id=None, separator="\n━━━━━━━━━━━━━━━━━━━━\n"):
+        """Az összegyűjtött csoportot egy (vagy méret miatt néhány) üzenetként sorba teszi."""
+        key = (group, chat_id or self.default_chat_id)
+        with self._groups_lock:
+            items = self._groups.pop(key, [])
+        if not items:
+            return 0
+        if len(items) == 1:
+            self.send(items[0], chat_id=key[1])
+            return 1
+        self._counts["coalesced"] += len(items) - 1
+        chunk = header
+        for item in items:
+            part = (separator if chunk != header else "") + item
+            if len(chunk) + len(part) > TG_MAX_TEXT_LEN and chunk != header:
+                self.send(chunk, chat_id=key[1])
+                chunk, part = header, item
+            chunk += part
+        self.send(chunk, chat_id=key[1])
+        return len(items)
+
+    def flush(self, timeout=60):
+        """Megvárja a sor kiürülését (legfeljebb timeout mp-ig)."""
+        if self._thread is None:
+            return True
+        deadline = time.monotonic() + timeout
+        while self._q.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.1)
+        return not self._q.unfinished_tasks
+
+    def metrics(self):
+        lat = sorted(self._latencies)
+        def pct(p):
+            return round(lat[min(len(lat) - 1, int(p * len(lat)))], 2) if lat else None
+        return {
+            **self._counts,
+            "queued":  self._q.qsize(),
+            "lat_avg": round(sum(lat) / len(lat), 2) if lat else None,
+            "lat_p95": pct(0.95),
+            "lat_max": round(lat[-1], 2) if lat else None,
+        }
+
+    # ---------- háttérszál ----------
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name="tg-sender", daemon=True)
+                self._thread.start()
+
+    def _worker(self):
+        while True:
+            msg = self._q.get()
+            try:
+                self._deliver(msg)
+            except Exception as e:
+                self._counts["failed"] += 1
+                log.error(f"[telegram] Váratlan küldési hiba: {e}")
+            finally:
+                self._q.task_done()
+
+    def _wait_for_slot(self, chat_id):
+        now = time.monotonic()
+        wait = max(0.0, self._last_global + 1.0 / TG_GLOBAL_PER_SEC - now)
+        wait = max(wait, self._last_per_chat.get(chat_id, 0.0) + TG_CHAT_MIN_INTERVAL - now)
+        # Csoport / csatorna (negatív chat_id): percenkénti limit
+        if str(chat_id).startswith("-"):
+            window = self._group_window.setdefault(chat_id, deque())
+            while window and now - window[0] > 60:
+                window.popleft()
+            if len(window) >= TG_GROUP_PER_MIN:
+                wait = max(wait, 60 - (now - window[0]))
+        if wait > 0:
+            time.sleep(wait)
+        now = time.monotonic()
+        self._last_global = now
+        self._last_per_chat[chat_id] = now
+        if str(chat_id).startswith("-"):
+            self._group_window[chat_id].append(now)
+
+    def _post(self, msg):
+        if msg["doc"]:
+            url  = TG_API_URL.format(token=self.token, method="sendDocument")
+            data = {"chat_id": msg["chat_id"], "caption": msg["text"][:1024], "parse_mode": msg["parse_mode"]}
+            return requests.post(url, data=data, files={"document": msg["doc"]}, timeout=45)
+        url  = TG_API_URL.format(token=self.token, method="sendMessage")
+        data = {"chat_id": msg["chat_id"], "text": msg["text"], "parse_mode": msg["parse_mode"],
+                "disable_web_page_preview": msg["no_preview"]}
+        return requests.post(url, data=data, timeout=20)
+
+    def _deliver(self, msg):
+        attempt = 0
+        while attempt <= TG_MAX_RETRIES:
+            self._wait_for_slot(msg["chat_id"])
+            try:
+                r = self._post(msg)
+            except requests.exceptions.RequestException as e:
+                wait = TG_BACKOFF * (2 ** attempt)
+                log.warning(f"[telegram] Hálózati hiba ({attempt+1}/{TG_MAX_RETRIES+1}): {e} — vár {wait}s")
+                self._counts["retried"] += 1
+                time.sleep(wait); attempt += 1; continue
+            if r.status_code == 200:
+                self._counts["sent"] += 1
+                self._latencies.append(time.monotonic() - msg["enqueued_at"])
+                return True
+            if r.status_code == 429:
+                try:
+                    retry_after = int(r.json().get("parameters", {}).get("retry_after", 0))
+                except Exception:
+                    retry_after = 0
+                retry_after = retry_after or TG_BACKOFF * (2 ** attempt)
+                log.warning(f"[telegram] 429 Rate limit — vár {retry_after}s")
+                self._counts["retried"] += 1
+                time.sleep(retry_after); attempt += 1; continue
+            if r.status_code >= 500:
+                wait = TG_BACKOFF * (2 ** attempt)
+                log.warning(f"[telegram] {r.status_code} szerver hiba — vár {wait}s")
+                self._counts["retried"] += 1
+                time.sleep(wait); attempt += 1; continue
+            log.error(f"[telegram] {r.status_code} kliens hiba — nincs retry: {r.text[:200]}")
+            break
+        self._counts["failed"] += 1
+        return False
+
+
+# =========================================================
+# MEGOSZTOTT PÉLDÁNYOK
+# =========================================================
+_queues = {}
+_queues_lock = threading.Lock()
+
+def get_queue(token, default_chat_id=None):
+    """Tokenenként egy közös sor (egy folyamaton belül)."""
+    with _queues_lock:
+        q = _queues.get(token)
+        if q is None:
+            q = _queues[token] = TelegramQueue(token, default_chat_id)
+        elif default_chat_id and not q.default_chat_id:
+            q.default_chat_id = default_chat_id
+        return q
+
+@atexit.register
+def _flush_all():
+    for q in list(_queues.values()):
+        q.flush(timeout=30)